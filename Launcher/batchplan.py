@@ -0,0 +1,137 @@
+import itertools
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from runhistory import format_duration
+
+KEEP_GOING = 'keep-going'
+FAIL_FAST = 'fail-fast'
+POLICIES = (KEEP_GOING, FAIL_FAST)
+# State shown for targets skipped because they already succeeded with identical inputs
+SKIPPED = 'skipped'
+
+
+class MatrixEntry(NamedTuple):
+	"""One cell of a plan's matrix: option values and the targets to run with them."""
+	values: Dict[str, str]
+	targets: List[str]
+
+	@property
+	def label(self) -> str:
+		return ', '.join(f'{name}={value}' for name, value in self.values.items())
+
+	def job_name(self, target: str) -> str:
+		"""Name of a target's job, unique across the matrix."""
+		return f'{target} ({self.label})' if self.values else target
+
+
+class SummaryRow(NamedTuple):
+	"""Outcome of one job of a plan."""
+	name: str
+	state: str
+	exit_code: Optional[int] = None
+	duration: Optional[float] = None
+	worker: Optional[str] = None
+
+
+def option_text(value: Any) -> str:
+	"""Convert a JSON value to the text an option holds, e.g. true to 'true'."""
+	if isinstance(value, bool):
+		return 'true' if value else 'false'
+	return str(value)
+
+
+def load_plan(path: str) -> Dict[str, Any]:
+	"""Read and check a plan file.
+
+	A plan is a JSON object with 'targets', a list of target names that may
+	use {Option} placeholders; 'matrix', mapping option names to the list of
+	values to run with; optional 'set', option values shared by every run;
+	'include' and 'exclude', lists of option values adding or removing matrix
+	cells; 'max_jobs'; and 'policy', 'keep-going' or 'fail-fast'.
+
+	Raises:
+		ValueError: If the file can't be read or is not a valid plan
+	"""
+	try:
+		with open(path, encoding='utf-8') as fp:
+			plan = json.load(fp)
+	except (OSError, ValueError) as e:
+		raise ValueError(f"Can't read plan {path}: {e}")
+	if not isinstance(plan, dict):
+		raise ValueError(f"{path}: expected a JSON object")
+	targets = plan.get('targets')
+	if not isinstance(targets, list) or not targets or not all(isinstance(t, str) for t in targets):
+		raise ValueError(f"{path}: 'targets' must be a non-empty list of target names")
+	matrix = plan.get('matrix', {})
+	if not isinstance(matrix, dict) or not all(isinstance(v, list) and v for v in matrix.values()):
+		raise ValueError(f"{path}: 'matrix' must map option names to non-empty lists of values")
+	if not isinstance(plan.get('set', {}), dict):
+		raise ValueError(f"{path}: 'set' must map option names to values")
+	for key in ('include', 'exclude'):
+		if not isinstance(plan.get(key, []), list) or not all(isinstance(e, dict) for e in plan.get(key, [])):
+			raise ValueError(f"{path}: '{key}' must be a list of objects mapping option names to values")
+	if plan.get('policy', KEEP_GOING) not in POLICIES:
+		raise ValueError(f"{path}: 'policy' must be one of {', '.join(POLICIES)}")
+	if 'max_jobs' in plan and (not isinstance(plan['max_jobs'], int) or plan['max_jobs'] < 1):
+		raise ValueError(f"{path}: 'max_jobs' must be a positive number")
+	return plan
+
+
+def expand_matrix(plan: Dict[str, Any]) -> List[MatrixEntry]:
+	"""Expand a plan into one entry per combination of matrix values.
+
+	Combinations matching every value of an 'exclude' object are dropped and
+	each 'include' object not already in the matrix is added as a further
+	combination. A plan without a matrix runs its targets once. Placeholders
+	in the target names are filled in from each combination.
+
+	Raises:
+		ValueError: If a target uses a placeholder that is not an option of the combination, or every
+			combination is excluded
+	"""
+	matrix = plan.get('matrix', {})
+	names = list(matrix)
+	combinations = [{name: option_text(value) for name, value in zip(names, values)}
+					for values in itertools.product(*(matrix[name] for name in names))]
+	excludes = [{name: option_text(value) for name, value in e.items()} for e in plan.get('exclude', [])]
+	combinations = [c for c in combinations
+					if not any(all(c.get(name) == value for name, value in e.items()) for e in excludes)]
+	for include in plan.get('include', []):
+		values = {name: option_text(value) for name, value in include.items()}
+		# An include equal to a remaining cell would run its targets twice under the same job names
+		if values not in combinations:
+			combinations.append(values)
+	if not combinations:
+		if matrix or plan.get('include'):
+			raise ValueError("The plan's exclusions remove every combination of the matrix")
+		combinations = [{}]
+	entries = []
+	for values in combinations:
+		try:
+			targets = [target.format_map(values) for target in plan['targets']]
+		except (KeyError, ValueError) as e:
+			raise ValueError(f"Can't name the targets for {values}: unknown placeholder {e}")
+		entries.append(MatrixEntry(values, targets))
+	return entries
+
+
+def summary_table(rows: Sequence[SummaryRow], elapsed: Optional[float] = None) -> str:
+	"""Format the outcome of a plan's jobs as a text table, followed by the totals."""
+	show_workers = any(row.worker for row in rows)
+	header = ['Job', 'Result', 'Exit', 'Duration'] + (['Worker'] if show_workers else [])
+	lines = [header]
+	for row in rows:
+		line = [row.name, row.state, '' if row.exit_code is None else str(row.exit_code),
+				'' if row.duration is None else format_duration(row.duration)]
+		lines.append(line + ([row.worker or 'local'] if show_workers else []))
+	widths = [max(len(line[column]) for line in lines) for column in range(len(header))]
+	text = ['  '.join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in lines]
+	text.insert(1, '  '.join('-' * width for width in widths))
+	counts = {}
+	for row in rows:
+		counts[row.state] = counts.get(row.state, 0) + 1
+	totals = f"{len(rows)} jobs: " + ', '.join(f'{count} {state}' for state, count in counts.items())
+	if elapsed is not None:
+		totals += f' in {format_duration(elapsed)}'
+	return '\n'.join(text + ['', totals])
@@ -1,12 +1,65 @@
+import glob
+import os
 import re
+import sys
 import xml.etree.ElementTree as et
-from typing import List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import profiler
 
 ns = {'BuildGraph': 'http://www.epicgames.com/BuildGraph'}
+OPTION_TAG = '{%s}Option' % ns['BuildGraph']
+AGGREGATE_TAG = '{%s}Aggregate' % ns['BuildGraph']
+INCLUDE_TAG = '{%s}Include' % ns['BuildGraph']
+AGENT_TAG = '{%s}Agent' % ns['BuildGraph']
+NODE_TAG = '{%s}Node' % ns['BuildGraph']
+# Scripts to parse must add up to this many bytes before starting worker processes pays off,
+# which is slow on Windows, rather than parsing them on threads
+PROCESS_POOL_BYTES = 4 * 1024 * 1024
+
+
+TAG_RE = re.compile(r'\[(.*?)\]')
+
+
+def split_tags(text: str) -> Tuple[List[str], str]:
+	"""Extract bracketed tags from a description in a single pass.
+	
+	Args:
+		text: Description such as '[Category][Type] Description text'
+		
+	Returns:
+		tuple: The tag contents in order and the text with all tags removed
+	"""
+	tags = []
+	parts = []
+	pos = 0
+	for match in TAG_RE.finditer(text):
+		tags.append(match.group(1))
+		parts.append(text[pos:match.start()])
+		pos = match.end()
+	if not tags:
+		return tags, text
+	parts.append(text[pos:])
+	return tags, ''.join(parts)
+
+
+def split_list(value: Optional[str]) -> Tuple[str, ...]:
+	"""Split a semicolon separated attribute such as Requires into its entries."""
+	if not value:
+		return ()
+	return tuple(v.strip() for v in value.split(';') if v.strip())
+
+
+def intern_tag(tag: Optional[str]) -> Optional[str]:
+	"""Intern a category or type tag so repeated values share one string."""
+	return sys.intern(tag) if tag is not None else None
 
 
 class BuildGraphOption:
 	"""Represents a BuildGraph option with metadata."""
+
+	__slots__ = ('name', 'default', 'restrict', 'description', 'category', 'type', 'extra')
 	
 	def __init__(self, opt) -> None:
 		"""Initialize a BuildGraph option.
@@ -21,27 +74,37 @@ class BuildGraphOption:
 			self.restrict = tuple(r.split('|'))
 		else:
 			self.restrict = None
-		self.description = opt.get('Description')
-		parsed = re.findall('\[.*?\]', self.description)
-
-		self.category = None
-		if len(parsed) >= 1:
-			self.category = parsed[0].replace('[', '').replace(']', '')
+		parsed, self.description = split_tags(opt.get('Description') or '')
 
-		self.type = None
-		if len(parsed) >= 2:
-			self.type = parsed[1].replace('[', '').replace(']', '')
+		self.category = intern_tag(parsed[0]) if len(parsed) >= 1 else None
+		self.type = intern_tag(parsed[1]) if len(parsed) >= 2 else None
+		self.extra = parsed[2] if len(parsed) >= 3 else None
 
-		self.extra = None
-		if len(parsed) >= 3:
-			self.extra = parsed[2].replace('[', '').replace(']', '')
+	def to_record(self) -> Dict[str, Any]:
+		"""Return the extracted option data as a JSON serializable dict."""
+		return {'name': self.name, 'default': self.default,
+				'restrict': list(self.restrict) if self.restrict else None,
+				'description': self.description, 'category': self.category,
+				'type': self.type, 'extra': self.extra}
 
-		for p in parsed:
-			self.description = self.description.replace(p, '')
+	@classmethod
+	def from_record(cls, record: Dict[str, Any]) -> 'BuildGraphOption':
+		"""Rebuild an option from data produced by to_record."""
+		option = cls.__new__(cls)
+		option.name = record['name']
+		option.default = record['default']
+		option.restrict = tuple(record['restrict']) if record['restrict'] else None
+		option.description = record['description']
+		option.category = intern_tag(record['category'])
+		option.type = intern_tag(record['type'])
+		option.extra = record['extra']
+		return option
 
 
 class BuildGraphAggregate:
 	"""Represents a BuildGraph aggregate (action/target)."""
+
+	__slots__ = ('name', 'description', 'category', 'requires')
 	
 	def __init__(self, item) -> None:
 		"""Initialize a BuildGraph aggregate.
@@ -51,63 +114,509 @@ class BuildGraphAggregate:
 		"""
 		self.name = item.get('Name')
 		self.description = item.get('Label')
+		self.category = None
+		self.requires = split_list(item.get('Requires'))
 		if not self.description:
 			return
 
-		parsed = re.findall('\[.*?\]', self.description)
-
-		self.category = None
+		parsed, self.description = split_tags(self.description)
 		if len(parsed) >= 1:
-			self.category = parsed[0].replace('[', '').replace(']', '')
+			self.category = intern_tag(parsed[0])
+
+	def to_record(self) -> Dict[str, Any]:
+		"""Return the extracted aggregate data as a JSON serializable dict."""
+		return {'name': self.name, 'description': self.description, 'category': self.category,
+				'requires': list(self.requires)}
+
+	@classmethod
+	def from_record(cls, record: Dict[str, Any]) -> 'BuildGraphAggregate':
+		"""Rebuild an aggregate from data produced by to_record."""
+		item = cls.__new__(cls)
+		item.name = record['name']
+		item.description = record['description']
+		item.category = intern_tag(record['category'])
+		item.requires = tuple(record['requires'])
+		return item
+
+
+class BuildGraphNode:
+	"""A node or aggregate in the BuildGraph dependency graph."""
+
+	__slots__ = ('name', 'requires', 'produces', 'agent')
+
+	def __init__(self, name: str, requires: Tuple[str, ...], produces: Tuple[str, ...] = (),
+				 agent: Optional[str] = None) -> None:
+		"""Initialize a graph node.
+		
+		Args:
+			name: Node or aggregate name
+			requires: Names of required nodes and aggregates, and #tags of required outputs
+			produces: #tags of the outputs the node produces
+			agent: Name of the agent running the node, None for aggregates
+		"""
+		self.name = name
+		self.requires = requires
+		self.produces = produces
+		self.agent = agent
+
+	@property
+	def is_aggregate(self) -> bool:
+		"""True for aggregates, which only group other nodes."""
+		return self.agent is None
+
+	@classmethod
+	def from_element(cls, elem, agent: Optional[str] = None) -> 'BuildGraphNode':
+		"""Create a graph node from a Node or Aggregate element."""
+		return cls(elem.get('Name'), split_list(elem.get('Requires')), split_list(elem.get('Produces')), agent)
+
+	def to_record(self) -> List[Any]:
+		"""Return the node data as a compact JSON serializable list."""
+		return [self.name, list(self.requires), list(self.produces), self.agent]
+
+	@classmethod
+	def from_record(cls, record: List[Any]) -> 'BuildGraphNode':
+		"""Rebuild a node from data produced by to_record."""
+		return cls(record[0], tuple(record[1]), tuple(record[2]), record[3])
+
+
+class ScriptData(NamedTuple):
+	"""Data extracted from a single BuildGraph script."""
+	options: List[BuildGraphOption]
+	actions: List[BuildGraphAggregate]
+	# (script path, options before the include, actions before the include)
+	includes: List[Tuple[str, int, int]]
+	# Every Node and Aggregate, including aggregates not shown in the launcher
+	nodes: List[BuildGraphNode]
+
+
+def resolve_include(script: str, including_file: str) -> List[str]:
+	"""Resolve the Script attribute of an Include element to file paths.
+	
+	Args:
+		script: Value of the Script attribute
+		including_file: Path of the script containing the Include
+		
+	Returns:
+		list: Matching script paths, relative to the including script's directory
+	"""
+	if '$(' in script:
+		print(f"Skipping include {script} in {including_file}: properties are not supported")
+		return []
+	path = os.path.normpath(os.path.join(os.path.dirname(including_file), script))
+	if glob.has_magic(path):
+		return sorted(glob.glob(path))
+	return [path]
+
 
-		for p in parsed:
-			self.description = self.description.replace(p, '')
+def parse_script(path: str) -> ScriptData:
+	"""Extract the UI options, runnable aggregates, includes and graph nodes from a BuildGraph script.
+	
+	The script is streamed with iterparse and each top level element is
+	discarded once handled, so memory stays flat regardless of file size.
+	Only top level aggregates and the nodes of top level agents are read.
+	
+	Args:
+		path: Path to the BuildGraph XML file
+		
+	Returns:
+		ScriptData: Options with a type, aggregates with a category, includes and graph nodes
+	"""
+	options = []
+	actions = []
+	includes = []
+	nodes = []
+	root = None
+	depth = 0
+	for event, elem in et.iterparse(path, events=('start', 'end')):
+		if event == 'start':
+			if root is None:
+				root = elem
+			depth += 1
+			continue
+		depth -= 1
+		if depth != 1:
+			continue
+		if elem.tag == OPTION_TAG:
+			option = BuildGraphOption(elem)
+			if option.type:
+				options.append(option)
+		elif elem.tag == AGGREGATE_TAG:
+			item = BuildGraphAggregate(elem)
+			if item.description and item.category:
+				actions.append(item)
+			nodes.append(BuildGraphNode(item.name, item.requires))
+		elif elem.tag == AGENT_TAG:
+			agent = elem.get('Name')
+			for node in elem.iter(NODE_TAG):
+				nodes.append(BuildGraphNode.from_element(node, agent))
+		elif elem.tag == INCLUDE_TAG:
+			script = elem.get('Script')
+			if script:
+				for include in resolve_include(script, path):
+					includes.append((include, len(options), len(actions)))
+		root.clear()
+	return ScriptData(options, actions, includes, nodes)
+
+
+def discover_platform_scripts(script_dir: str) -> List[str]:
+	"""Find the platform scripts in a script directory.
+	
+	Args:
+		script_dir: Directory containing BuildGraph scripts
+		
+	Returns:
+		list: Paths of Platform_*.xml files in sorted order
+	"""
+	return sorted(glob.glob(os.path.join(script_dir, 'Platform_*.xml')))
+
+
+def script_key(path: str) -> str:
+	"""Return the normalized path used to identify a script."""
+	return os.path.normcase(os.path.abspath(path))
 
 
 class BuildGraph:
 	"""Main BuildGraph parser and configuration manager."""
 	
-	def __init__(self, var_file: str, action_file: str, platform_files: List[str]) -> None:
+	def __init__(self, var_file: str, action_file: str, platform_files: Sequence[str] = (),
+				 cache: Optional[Any] = None, jobs: int = 1, use_processes: Optional[bool] = None) -> None:
 		"""Initialize BuildGraph parser.
 		
+		Scripts referenced through Include elements are loaded recursively and
+		merged at the point of inclusion. Each script is loaded only once.
+		
 		Args:
 			var_file: Path to global variables XML file
 			action_file: Path to main actions XML file
-			platform_files: List of platform-specific XML files
+			platform_files: Extra platform-specific XML files not reached through includes
+			cache: Optional ParseCache used to skip re-parsing unchanged files
+			jobs: Number of scripts to parse concurrently, 1 parses serially
+			use_processes: Parse in a process pool rather than a thread pool, None to use processes only
+				when the scripts to parse add up to PROCESS_POOL_BYTES
+		"""
+		self.cache = cache
+		self.jobs = jobs
+		self.use_processes = use_processes
+		self.roots = [var_file, action_file, *platform_files]
+		self.loaded = {}
+		self.load()
+
+	def load(self, stale: Set[str] = frozenset()) -> None:
+		"""Load every script not already loaded, then merge and index them.
+		
+		Args:
+			stale: Normalized paths of loaded scripts to parse again
 		"""
 		self.options = []
 		self.actions = []
+		self.nodes = []
+		self.scripts = []
+		with profiler.span('BuildGraph.load_all'):
+			self.loaded = self.load_all(self.roots, self.loaded, stale)
+
+		with profiler.span('BuildGraph.merge_tree'):
+			visited = set()
+			for file in self.roots:
+				self.merge_tree(file, self.loaded, visited, [])
+		with profiler.span('BuildGraph.build_indexes'):
+			self.build_indexes()
+
+		if self.cache is not None:
+			with profiler.span('ParseCache.save'):
+				self.cache.save()
+
+	def reload(self, changed: Optional[Iterable[str]] = None, platform_files: Optional[Sequence[str]] = None) -> None:
+		"""Re-parse changed scripts and rebuild the merged options, actions and graph.
 		
-		try:
-			# Parse global variables
-			tree = et.parse(var_file)
-			root = tree.getroot()
-			for child in root.findall('BuildGraph:Option', ns):
-				option = BuildGraphOption(child)
-				if option.type:
-					self.options.append(option)
-		except Exception as e:
-			print(f"Error parsing variables file {var_file}: {e}")
+		Unchanged scripts are reused from memory. Scripts that are no longer
+		included are dropped and newly included ones are loaded. A changed
+		script that fails to parse, e.g. while it is half saved, keeps its
+		previous contents.
+		
+		Args:
+			changed: Paths of scripts that changed, None to re-parse every script
+			platform_files: New list of extra platform scripts, None to keep the current list
+		"""
+		if platform_files is not None:
+			self.roots = self.roots[:2] + list(platform_files)
+		if changed is None:
+			stale = set(self.loaded)
+		else:
+			stale = {script_key(path) for path in changed}
+		self.load(stale)
+
+	def build_indexes(self) -> None:
+		"""Index options and actions by name, category and type."""
+		self.option_index = {}
+		self.option_categories = {}
+		self.option_types = {}
+		for option in self.options:
+			self.option_index.setdefault(option.name, option)
+			self.option_categories.setdefault(option.category, []).append(option)
+			self.option_types.setdefault(option.type, []).append(option)
+
+		self.action_index = {}
+		self.action_categories = {}
+		for action in self.actions:
+			self.action_index.setdefault(action.name, action)
+			self.action_categories.setdefault(action.category, []).append(action)
+
+		self.node_index = {}
+		self.tag_producers = {}
+		for node in self.nodes:
+			self.node_index.setdefault(node.name, node)
+			for tag in node.produces:
+				self.tag_producers.setdefault(tag, []).append(node.name)
+		self.closures = {}
+
+	def get_node(self, name: str) -> Optional[BuildGraphNode]:
+		"""Return the node or aggregate with the given name, or None."""
+		return self.node_index.get(name)
+
+	def requirements(self, name: str) -> List[str]:
+		"""Return the names of the nodes and aggregates a node or aggregate directly requires.
+		
+		Required #tags resolve to the nodes producing them. References to
+		unknown names are ignored.
+		"""
+		node = self.node_index.get(name)
+		if node is None:
+			return []
+		names = []
+		for ref in node.requires:
+			if ref.startswith('#'):
+				names.extend(self.tag_producers.get(ref, ()))
+			elif ref in self.node_index:
+				names.append(ref)
+		return names
+
+	def target_nodes(self, target: str) -> FrozenSet[str]:
+		"""Return the names of every node that running a target executes.
+		
+		Args:
+			target: Aggregate or node name
+			
+		Returns:
+			frozenset: Node names, without aggregates, empty for unknown targets
+		"""
+		closure = self.closures.get(target)
+		if closure is not None:
+			return closure
+		nodes = set()
+		visited = {target}
+		stack = [target]
+		while stack:
+			name = stack.pop()
+			node = self.node_index.get(name)
+			if node is not None and not node.is_aggregate:
+				nodes.add(name)
+			for required in self.requirements(name):
+				if required not in visited:
+					visited.add(required)
+					stack.append(required)
+		closure = self.closures[target] = frozenset(nodes)
+		return closure
+
+	def schedule(self, targets: Sequence[str]) -> List[Tuple[str, List[str]]]:
+		"""Order targets so independent ones can run in parallel without building a node twice at once.
+		
+		A target waits for the selected targets whose nodes it contains, and
+		reuses the nodes they completed. It also waits for any earlier target
+		that would build one of its remaining nodes, so shared nodes are built
+		once. Targets are considered smallest first, which keeps the plan acyclic.
+		
+		Args:
+			targets: Target names, duplicates are ignored
+			
+		Returns:
+			list: (target, prerequisite targets) with prerequisites listed before their dependents
+		"""
+		closures = {target: self.target_nodes(target) for target in dict.fromkeys(targets)}
+		order = sorted(closures, key=lambda t: len(closures[t]))
+		plan = []
+		for i, target in enumerate(order):
+			nodes = closures[target]
+			earlier = order[:i]
+			prerequisites = [other for other in earlier if closures[other] and closures[other] <= nodes]
+			remaining = nodes.difference(*(closures[p] for p in prerequisites))
+			prerequisites += [other for other in earlier
+							  if other not in prerequisites and closures[other] & remaining]
+			plan.append((target, prerequisites))
+		return plan
+
+	def get_option(self, name: str) -> Optional[BuildGraphOption]:
+		"""Return the option with the given name, or None."""
+		return self.option_index.get(name)
+
+	def get_action(self, name: str) -> Optional[BuildGraphAggregate]:
+		"""Return the aggregate with the given name, or None."""
+		return self.action_index.get(name)
+
+	def options_by_category(self, category: str) -> List[BuildGraphOption]:
+		"""Return the options in a UI category, in script order."""
+		return self.option_categories.get(category, [])
+
+	def options_by_type(self, option_type: str) -> List[BuildGraphOption]:
+		"""Return the options of a UI type such as 'Dropdown', in script order."""
+		return self.option_types.get(option_type, [])
+
+	def actions_by_category(self, category: str) -> List[BuildGraphAggregate]:
+		"""Return the aggregates in a button category, in script order."""
+		return self.action_categories.get(category, [])
+
+	def load_all(self, roots: Sequence[str], previous: Optional[Dict[str, ScriptData]] = None,
+				 stale: Set[str] = frozenset()) -> Dict[str, ScriptData]:
+		"""Load the root scripts and every script they include.
+		
+		Scripts in previous are reused unless stale, cached scripts are read
+		directly and the rest are parsed concurrently when jobs is greater
+		than one. Includes are scheduled as soon as the script that
+		references them has been loaded.
 		
+		Args:
+			roots: Scripts to start loading from
+			previous: Script data already loaded, keyed by normalized path
+			stale: Keys of previous data to load again, falling back to the previous data on errors
+			
+		Returns:
+			dict: Loaded script data keyed by normalized path, only for scripts reachable from roots
+		"""
+		previous = previous or {}
+		loaded = {}
+		requested = set()
+		queued = []
+		pending = {}
+		executor = None
+
+		def request(path):
+			key = script_key(path)
+			if key in requested:
+				return
+			requested.add(key)
+
+			data = previous.get(key) if key not in stale else None
+			if data is None:
+				data = self.load_cached(path)
+			if data is None and self.jobs > 1:
+				queued.append(path)
+				return
+			if data is None:
+				try:
+					data = self.parse(path)
+				except Exception as e:
+					data = failed(path, e)
+					if data is None:
+						return
+			loaded[key] = data
+			for include in data.includes:
+				request(include[0])
+
+		def failed(path, e):
+			print(f"Error parsing script {path}: {e}")
+			data = previous.get(script_key(path))
+			if data is not None:
+				print(f"Keeping the previous version of {path}")
+			return data
+
+		def submit_queued():
+			nonlocal executor
+			if queued and executor is None:
+				executor = self.create_executor(queued)
+			for path in queued:
+				pending[executor.submit(parse_script, path)] = path
+			queued.clear()
+
+		for root in roots:
+			request(root)
+
 		try:
-			# Parse main actions
-			tree = et.parse(action_file)
-			root = tree.getroot()
-			for child in root.findall('BuildGraph:Aggregate', ns):
-				item = BuildGraphAggregate(child)
-				if item.description and item.category:
-					self.actions.append(item)
-		except Exception as e:
-			print(f"Error parsing actions file {action_file}: {e}")
-		
-		# Parse platform files
-		for file in platform_files:
-			try:
-				tree = et.parse(file)
-				root = tree.getroot()
-				for child in root.findall('BuildGraph:Aggregate', ns):
-					item = BuildGraphAggregate(child)
-					if item.description and item.category:
-						self.actions.append(item)
-			except Exception as e:
-				print(f"Error parsing platform file {file}: {e}")
+			submit_queued()
+			while pending:
+				done, _ = wait(pending, return_when=FIRST_COMPLETED)
+				for future in done:
+					path = pending.pop(future)
+					try:
+						data = future.result()
+						self.store_cached(path, data)
+					except Exception as e:
+						data = failed(path, e)
+						if data is None:
+							continue
+					loaded[script_key(path)] = data
+					for include in data.includes:
+						request(include[0])
+				submit_queued()
+		finally:
+			if executor is not None:
+				executor.shutdown()
+		return loaded
+
+	def create_executor(self, paths: Sequence[str]) -> Any:
+		"""Create the pool parsing the scripts, using processes as use_processes says or for large first batches."""
+		use_processes = self.use_processes
+		if use_processes is None:
+			use_processes = sum(os.path.getsize(path) for path in paths if os.path.isfile(path)) >= PROCESS_POOL_BYTES
+		pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+		return pool(max_workers=self.jobs)
+
+	def merge_tree(self, path: str, loaded: Dict[str, ScriptData], visited: Set[str], stack: List[str]) -> None:
+		"""Merge a loaded script and everything it includes, in document order.
+		
+		Args:
+			path: Path to the BuildGraph XML file
+			loaded: Loaded script data keyed by normalized path
+			visited: Normalized paths of scripts already merged
+			stack: Normalized paths of the scripts currently being included
+		"""
+		key = script_key(path)
+		if key in visited:
+			if key in stack:
+				chain = ' -> '.join(stack[stack.index(key):] + [key])
+				print(f"Include cycle ignored: {chain}")
+			return
+		visited.add(key)
+
+		data = loaded.get(key)
+		if data is None:
+			return
+		self.scripts.append(path)
+
+		stack.append(key)
+		opt_pos = 0
+		act_pos = 0
+		for include, opt_idx, act_idx in data.includes:
+			self.options.extend(data.options[opt_pos:opt_idx])
+			self.actions.extend(data.actions[act_pos:act_idx])
+			opt_pos, act_pos = opt_idx, act_idx
+			self.merge_tree(include, loaded, visited, stack)
+		self.options.extend(data.options[opt_pos:])
+		self.actions.extend(data.actions[act_pos:])
+		self.nodes.extend(data.nodes)
+		stack.pop()
+
+	def load_cached(self, path: str) -> Optional[ScriptData]:
+		"""Return a script's data from the cache, or None on a miss."""
+		if self.cache is None:
+			return None
+		data = self.cache.get(path)
+		if data is None:
+			return None
+		return ScriptData([BuildGraphOption.from_record(r) for r in data['options']],
+						  [BuildGraphAggregate.from_record(r) for r in data['actions']],
+						  [tuple(i) for i in data['includes']],
+						  [BuildGraphNode.from_record(r) for r in data['nodes']])
+
+	def store_cached(self, path: str, data: ScriptData) -> None:
+		"""Store a freshly parsed script's data in the cache."""
+		if self.cache is not None:
+			self.cache.put(path, {'options': [o.to_record() for o in data.options],
+								  'actions': [a.to_record() for a in data.actions],
+								  'includes': data.includes,
+								  'nodes': [n.to_record() for n in data.nodes]})
+
+	def parse(self, path: str) -> ScriptData:
+		"""Parse a single script on the calling thread and cache the result."""
+		with profiler.span('parse_script', path=os.path.basename(path)):
+			data = parse_script(path)
+		self.store_cached(path, data)
+		return data
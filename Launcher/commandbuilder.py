@@ -0,0 +1,92 @@
+import subprocess
+from typing import Any, Iterable, List
+
+# Longest command line accepted by cmd.exe, which RunUAT.bat runs under
+MAX_COMMAND_LINE = 8191
+
+
+def warn_if_too_long(target: str, argv: List[str]) -> None:
+	"""Print a warning if a command line is longer than cmd.exe accepts."""
+	length = len(subprocess.list2cmdline(argv))
+	if length > MAX_COMMAND_LINE:
+		print(f"Warning: the command line of {target} is {length} characters, cmd.exe only accepts {MAX_COMMAND_LINE}")
+
+
+class CommandBuilder:
+	"""Builds RunUAT command lines from option models, caching each option's argument per target.
+
+	An option's cached arguments are dropped when the option changes, and
+	every cached argument is dropped when the map data is reloaded, so
+	launching again only re-evaluates the options that changed.
+	"""
+
+	def __init__(self, project: Any, options: Iterable) -> None:
+		"""Initialize the builder and start following option changes.
+
+		Args:
+			project: Launcher project providing the command prefix and map data
+			options: Option value models, see optionmodel
+		"""
+		self.project = project
+		self.options = []
+		# Option name -> target -> '-set:' argument, or None if the value is empty
+		self.cache = {}
+		self.track(options)
+		project.map_data.add_listener(self.on_map_data_changed)
+
+	def track(self, options: Iterable) -> None:
+		"""Include more option models in built commands."""
+		for opt in options:
+			self.options.append(opt)
+			opt.add_listener(self.on_option_changed)
+
+	def untrack(self, name: str) -> None:
+		"""Stop including an option in built commands."""
+		self.options = [opt for opt in self.options if opt.name != name]
+		self.cache.pop(name, None)
+
+	def replace(self, model: Any) -> None:
+		"""Use a new model for an option, or include it if it is new."""
+		self.cache.pop(model.name, None)
+		for index, opt in enumerate(self.options):
+			if opt.name == model.name:
+				self.options[index] = model
+				model.add_listener(self.on_option_changed)
+				return
+		self.track([model])
+
+	def on_option_changed(self, opt: Any) -> None:
+		self.cache.pop(opt.name, None)
+
+	def on_map_data_changed(self, map_data: Any) -> None:
+		self.cache.clear()
+
+	def option_args(self, target: str) -> List[str]:
+		"""Return the -set: arguments of every option with a value for a target."""
+		args = []
+		for opt in self.options:
+			values = self.cache.setdefault(opt.name, {})
+			if target in values:
+				arg = values[target]
+			else:
+				val = opt.get_value(target)
+				arg = values[target] = f'-set:{opt.name}={val}' if len(val) > 0 else None
+			if arg is not None:
+				args.append(arg)
+		return args
+
+	def build(self, target: str, debug: bool = False) -> List[str]:
+		"""Build the RunUAT command line for a target.
+
+		Args:
+			target: Name of the build target to execute
+			debug: Only list the graph instead of running it
+
+		Returns:
+			list: RunUAT executable followed by its arguments
+		"""
+		proc = self.project.command_prefix(target) + self.option_args(target)
+		if debug:
+			proc.append('-listonly')
+		warn_if_too_long(target, proc)
+		return proc
@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from iniscanner import apply_ops, scan_ini
+
+# Launcher platform names that differ from the name of their config directory
+CONFIG_PLATFORMS = {'Win64': 'Windows'}
+
+
+def config_platform(platform: Optional[str]) -> Optional[str]:
+	"""Return the config directory name for a launcher platform name."""
+	if not platform:
+		return None
+	return CONFIG_PLATFORMS.get(platform, platform)
+
+
+class ConfigHierarchy:
+	"""Resolves Unreal's stack of config layers into merged per-platform views.
+
+	Each layer is scanned once for the keys of interest and cached by its
+	modification time, and each merged view is cached by the fingerprint of
+	all of its layers, so switching platforms only stats the layer files.
+	"""
+
+	def __init__(self, engine_dir: str, game_dir: str, keys: Dict[str, Tuple[Iterable[str], Optional[Iterable[str]]]],
+				 saved_platform: str = 'WindowsEditor', use_mmap: bool = False, jobs: int = 4) -> None:
+		"""Initialize the resolver.
+
+		Args:
+			engine_dir: Directory containing the Engine folder
+			game_dir: Project directory containing Config and Saved
+			keys: Keys and sections of interest per config type, e.g. {'Game': (['MapsToCook'], None)}
+			saved_platform: Saved/Config subdirectory holding local overrides
+			use_mmap: Read layers through a memory map
+			jobs: Number of layers to parse in parallel
+		"""
+		self.engine_config = os.path.join(engine_dir, 'Engine', 'Config')
+		self.engine_platforms = os.path.join(engine_dir, 'Engine', 'Platforms')
+		self.game_dir = game_dir
+		self.keys = keys
+		self.saved_platform = saved_platform
+		self.use_mmap = use_mmap
+		self.jobs = jobs
+		self.layers = {}
+		self.views = {}
+
+	def layer_paths(self, config_type: str, platform: Optional[str] = None) -> List[str]:
+		"""List the layer files for a config type, lowest priority first.
+
+		Args:
+			config_type: Config type such as 'Game' or 'Editor'
+			platform: Config platform name, None for the platform independent view
+
+		Returns:
+			list: Candidate layer paths, which may not exist
+		"""
+		t = config_type
+		project_config = os.path.join(self.game_dir, 'Config')
+		paths = [os.path.join(self.engine_config, 'Base.ini'),
+				 os.path.join(self.engine_config, f'Base{t}.ini')]
+		if platform:
+			paths += [os.path.join(self.engine_config, platform, f'Base{platform}{t}.ini'),
+					  os.path.join(self.engine_platforms, platform, 'Config', f'Base{platform}{t}.ini')]
+		paths.append(os.path.join(project_config, f'Default{t}.ini'))
+		if platform:
+			paths += [os.path.join(self.engine_config, platform, f'{platform}{t}.ini'),
+					  os.path.join(self.engine_platforms, platform, 'Config', f'{platform}{t}.ini'),
+					  os.path.join(project_config, platform, f'{platform}{t}.ini'),
+					  os.path.join(self.game_dir, 'Platforms', platform, 'Config', f'{platform}{t}.ini')]
+		paths.append(os.path.join(self.game_dir, 'Saved', 'Config', self.saved_platform, f'{t}.ini'))
+		return paths
+
+	def is_layer(self, path: str, platform: Optional[str] = None) -> bool:
+		"""True if a file is a layer of any config type of interest for a platform.
+
+		Args:
+			path: Changed file
+			platform: Config platform name, None for the platform independent view
+		"""
+		path = os.path.normcase(os.path.abspath(path))
+		return any(path == os.path.normcase(os.path.abspath(layer))
+				   for config_type in self.keys for layer in self.layer_paths(config_type, platform))
+
+	def watch_directories(self) -> List[str]:
+		"""List the existing directories that hold layers of any platform."""
+		project_config = os.path.join(self.game_dir, 'Config')
+		directories = [os.path.join(self.game_dir, 'Saved', 'Config', self.saved_platform)]
+		for config_dir in (self.engine_config, project_config):
+			directories.append(config_dir)
+			if os.path.isdir(config_dir):
+				directories += [entry.path for entry in os.scandir(config_dir) if entry.is_dir()]
+		for platforms_dir in (self.engine_platforms, os.path.join(self.game_dir, 'Platforms')):
+			if os.path.isdir(platforms_dir):
+				directories += [os.path.join(entry.path, 'Config') for entry in os.scandir(platforms_dir)
+								if entry.is_dir()]
+		return [d for d in directories if os.path.isdir(d)]
+
+	def merged(self, config_type: str, platform: Optional[str] = None) -> Dict[str, Dict[str, List[str]]]:
+		"""Return the merged values of a config type for a platform.
+
+		Args:
+			config_type: Config type such as 'Game' or 'Editor'
+			platform: Config platform name, None for the platform independent view
+
+		Returns:
+			dict: Values by section name and lower case key, as from iniscanner.apply_ops
+		"""
+		fingerprint = []
+		for path in self.layer_paths(config_type, platform):
+			try:
+				st = os.stat(path)
+			except OSError:
+				continue
+			fingerprint.append((path, st.st_mtime_ns, st.st_size))
+		fingerprint = tuple(fingerprint)
+
+		view = self.views.get((config_type, platform))
+		if view is not None and view[0] == fingerprint:
+			return view[1]
+
+		stale = [fp for fp in fingerprint if self.layers.get((config_type, fp[0]), (None,))[0] != fp]
+		if len(stale) > 1 and self.jobs > 1:
+			with ThreadPoolExecutor(max_workers=min(self.jobs, len(stale))) as executor:
+				list(executor.map(lambda fp: self.load_layer(config_type, fp), stale))
+		else:
+			for fp in stale:
+				self.load_layer(config_type, fp)
+
+		values = {}
+		for fp in fingerprint:
+			apply_ops(self.layers[(config_type, fp[0])][1], values)
+		self.views[(config_type, platform)] = (fingerprint, values)
+		return values
+
+	def load_layer(self, config_type: str, fp: Tuple[str, int, int]) -> None:
+		"""Scan a layer file and cache its assignments under its fingerprint."""
+		keys, sections = self.keys[config_type]
+		try:
+			ops = scan_ini(fp[0], keys, sections, use_mmap=self.use_mmap)
+		except Exception as e:
+			print(f"Error loading config layer {fp[0]}: {e}")
+			ops = []
+		self.layers[(config_type, fp[0])] = (fp, ops)
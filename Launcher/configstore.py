@@ -0,0 +1,205 @@
+import io
+import os
+import stat
+import tempfile
+import threading
+import time
+from configparser import ConfigParser
+from typing import Callable, Optional, Tuple
+
+# Read once at import, since reading the umask means briefly changing it for every thread
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_atomic(path: str, text: str) -> None:
+	"""Replace a file with new contents so readers see either the old or the new file, never a partial one.
+
+	The file keeps its permissions, and a new file gets the permissions open() would give it.
+
+	Args:
+		path: File to write
+		text: New contents
+	"""
+	directory = os.path.dirname(os.path.abspath(path))
+	os.makedirs(directory, exist_ok=True)
+	try:
+		mode = stat.S_IMODE(os.stat(path).st_mode)
+	except FileNotFoundError:
+		mode = 0o666 & ~_UMASK
+	fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+	try:
+		with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+			fp.write(text)
+			fp.flush()
+			os.fsync(fp.fileno())
+		# mkstemp creates the file readable by its owner only, keep the mode of the file being replaced
+		os.chmod(temp_path, mode)
+		os.replace(temp_path, path)
+	except BaseException:
+		try:
+			os.remove(temp_path)
+		except OSError:
+			pass
+		raise
+
+
+class ConfigStore:
+	"""Persists the launcher settings from a background thread.
+
+	Changes only mark the store dirty. Once no change has been made for
+	delay seconds the writer thread asks the thread owning the settings for a
+	snapshot, serialized there so it never reads them while they change, and,
+	if the text differs from the file, replaces the file atomically.
+	"""
+
+	def __init__(self, path: str, snapshot: Callable[[], ConfigParser], delay: float = 1.0,
+				 post: Optional[Callable[[Callable[[], None]], None]] = None) -> None:
+		"""Initialize the store. The writer thread starts with the first change.
+
+		Args:
+			path: Settings file, e.g. Saved/Launcher.ini
+			snapshot: Returns the current settings, called on the thread owning them
+			delay: Seconds without changes before writing
+			post: Runs a function on the thread owning the settings, None to take snapshots on the writer thread
+		"""
+		self.path = path
+		self.snapshot = snapshot
+		self.delay = delay
+		self.post = post
+		self.written = None
+		# Number of changes made, and the number included in the last snapshot written
+		self.changes = 0
+		self.saved = 0
+		self.last_change = 0.0
+		# Serialized snapshot waiting for the writer thread, with the number of changes it includes
+		self.pending = None
+		self.requested = False
+		self.closed = False
+		self.condition = threading.Condition()
+		# Held while writing, so flush and the writer thread never overlap
+		self.write_lock = threading.Lock()
+		self.thread = None
+
+	def load(self) -> Optional[ConfigParser]:
+		"""Read the settings file.
+
+		Returns:
+			ConfigParser: The saved settings, or None if there is no settings file
+		"""
+		try:
+			with open(self.path, encoding='utf-8') as fp:
+				text = fp.read()
+		except FileNotFoundError:
+			return None
+		config_parser = ConfigParser()
+		config_parser.read_string(text, self.path)
+		self.written = text
+		return config_parser
+
+	def mark_dirty(self, *args) -> None:
+		"""Note that a setting changed. Cheap and safe to call from any thread or as a listener."""
+		with self.condition:
+			if self.closed:
+				return
+			self.changes += 1
+			self.last_change = time.monotonic()
+			if self.thread is None:
+				self.thread = threading.Thread(target=self.run, name='ConfigStore', daemon=True)
+				self.thread.start()
+			self.condition.notify()
+
+	def serialize(self) -> Optional[Tuple[str, int]]:
+		"""Serialize the current settings.
+
+		Returns:
+			tuple: The settings text and the number of changes it includes, or None if the snapshot failed
+		"""
+		with self.condition:
+			changes = self.changes
+		try:
+			buffer = io.StringIO()
+			self.snapshot().write(buffer)
+			return buffer.getvalue(), changes
+		except Exception as e:
+			print(f"Error saving configuration: {e}")
+			return None
+
+	def capture(self) -> None:
+		"""Hand a snapshot to the writer thread. Runs on the thread owning the settings."""
+		pending = self.serialize()
+		with self.condition:
+			self.requested = False
+			if pending is None:
+				# Retry once the delay has passed again
+				self.last_change = time.monotonic()
+			else:
+				self.pending = pending
+			self.condition.notify()
+
+	def run(self) -> None:
+		while True:
+			with self.condition:
+				while self.changes == self.saved and self.pending is None and not self.closed:
+					self.condition.wait()
+				if self.closed:
+					return
+				if self.pending is None:
+					# Debounce: wait until no change was made for delay seconds
+					quiet = self.last_change + self.delay - time.monotonic()
+					if quiet > 0 or self.requested:
+						self.condition.wait(quiet if quiet > 0 else None)
+						continue
+					if self.post is not None:
+						self.requested = True
+						self.post(self.capture)
+						continue
+				pending, self.pending = self.pending, None
+			if pending is None:
+				pending = self.serialize()
+			if pending is None or not self.save(*pending):
+				with self.condition:
+					self.last_change = time.monotonic()
+
+	def save(self, text: str, changes: int) -> bool:
+		"""Write serialized settings if they changed and no later snapshot was written already.
+
+		Args:
+			text: Serialized settings
+			changes: Number of changes the settings include
+
+		Returns:
+			bool: False if the settings could not be saved and should be retried
+		"""
+		with self.write_lock:
+			with self.condition:
+				if changes <= self.saved:
+					return True
+			try:
+				if text != self.written:
+					write_atomic(self.path, text)
+					self.written = text
+			except Exception as e:
+				print(f"Error saving configuration: {e}")
+				return False
+			with self.condition:
+				self.saved = changes
+			return True
+
+	def flush(self) -> None:
+		"""Write pending changes now. Called on the thread owning the settings."""
+		with self.condition:
+			if self.changes == self.saved:
+				return
+		pending = self.serialize()
+		if pending is not None:
+			self.save(*pending)
+
+	def close(self) -> None:
+		"""Write pending changes and stop the writer thread."""
+		self.flush()
+		with self.condition:
+			self.closed = True
+			self.condition.notify()
+		if self.thread is not None:
+			self.thread.join()
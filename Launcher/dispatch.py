@@ -0,0 +1,281 @@
+import asyncio
+import hmac
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from supervisor import CANCELLED, FAILED, RUNNING, SUCCEEDED
+
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 7820
+# Environment variable holding the shared secret workers and launchers authenticate with
+TOKEN_ENV = 'BGLAUNCHER_WORKER_TOKEN'
+# Seconds between heartbeats sent by a worker
+HEARTBEAT_INTERVAL = 2.0
+# A worker that sent no heartbeat for this many seconds is disconnected
+HEARTBEAT_TIMEOUT = 10.0
+# Seconds between attempts to connect to an unreachable worker
+RECONNECT_DELAY = 5.0
+# Longest message line, large enough for any command line
+MESSAGE_LIMIT = 16 * 1024 * 1024
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+	"""Encode a protocol message as one line of JSON."""
+	return json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+	"""Read the next protocol message.
+
+	Returns:
+		dict: The message, or None once the connection is closed
+	"""
+	line = await reader.readline()
+	if not line:
+		return None
+	return json.loads(line)
+
+
+def parse_address(address: str, default_port: int = DEFAULT_PORT) -> Tuple[str, int]:
+	"""Split 'host:port' into host and port, using the default port if none is given."""
+	host, sep, port = address.rpartition(':')
+	if not sep:
+		return address, default_port
+	return host.strip('[]'), int(port)
+
+
+def check_token(expected: Optional[str], given: Optional[str]) -> bool:
+	"""True if a connection presented the expected token, or none is required."""
+	if not expected:
+		return True
+	return hmac.compare_digest(expected.encode('utf-8'), (given or '').encode('utf-8'))
+
+
+class WorkerConnection:
+	"""The launcher's connection to one worker agent."""
+
+	def __init__(self, address: str) -> None:
+		self.address = address
+		self.name = address
+		self.slots = 0
+		self.running = 0
+		self.load = None
+		self.last_heartbeat = 0.0
+		self.writer = None
+		# True until the first connection attempt is answered, so jobs wait for it instead of running locally
+		self.connecting = True
+		# Job id -> (job, future receiving the exit message)
+		self.jobs = {}
+
+	@property
+	def healthy(self) -> bool:
+		"""True if the worker is connected and its heartbeats are current."""
+		return (self.writer is not None and self.slots > 0
+				and time.monotonic() - self.last_heartbeat <= HEARTBEAT_TIMEOUT)
+
+	@property
+	def free(self) -> int:
+		return self.slots - self.running
+
+	def send(self, message: Dict[str, Any]) -> None:
+		if self.writer is not None:
+			self.writer.write(encode(message))
+
+	def describe(self) -> str:
+		load = '' if self.load is None else f', load {self.load:.1f}'
+		state = 'up' if self.healthy else 'down'
+		return f'{self.name} ({self.address}): {state}, {self.running}/{self.slots} slots busy{load}'
+
+
+class Dispatcher:
+	"""Runs supervisor jobs on worker agents, see worker.py.
+
+	The dispatcher keeps a connection to every registered worker and sends
+	each job to the healthy worker with the lowest share of busy slots,
+	waiting while every worker is full. Output is streamed back into the
+	job's log as the worker reads it. Workers report their slots and load in
+	heartbeats, and a worker whose heartbeats stop is disconnected, failing
+	the jobs it was running. Jobs run with the worker's own environment.
+	Runs on the supervisor's event loop.
+	"""
+
+	def __init__(self, addresses: Iterable[str], token: Optional[str] = None) -> None:
+		"""Initialize the dispatcher.
+
+		Args:
+			addresses: 'host:port' of each worker
+			token: Shared secret the workers expect, defaults to the BGLAUNCHER_WORKER_TOKEN variable
+		"""
+		self.workers = [WorkerConnection(address) for address in addresses]
+		self.token = token if token is not None else os.environ.get(TOKEN_ENV)
+		self.changed = None
+		self.tasks = []
+
+	async def start(self) -> None:
+		"""Start connecting to the workers. Called on the supervisor loop."""
+		self.changed = asyncio.Condition()
+		loop = asyncio.get_running_loop()
+		self.tasks = [loop.create_task(self.connect(worker)) for worker in self.workers]
+		self.tasks.append(loop.create_task(self.monitor()))
+
+	async def close(self) -> None:
+		for task in self.tasks:
+			task.cancel()
+		for worker in self.workers:
+			if worker.writer is not None:
+				worker.writer.close()
+
+	async def notify_changed(self) -> None:
+		async with self.changed:
+			self.changed.notify_all()
+
+	async def connect(self, worker: WorkerConnection) -> None:
+		"""Keep a worker connected, reconnecting whenever the connection drops."""
+		reported = False
+		while True:
+			try:
+				host, port = parse_address(worker.address)
+				reader, writer = await asyncio.open_connection(host, port, limit=MESSAGE_LIMIT)
+			except (OSError, ValueError) as e:
+				if not reported:
+					print(f"Error connecting to worker {worker.address}: {e}")
+					reported = True
+				if worker.connecting:
+					worker.connecting = False
+					await self.notify_changed()
+				await asyncio.sleep(RECONNECT_DELAY)
+				continue
+			reported = False
+			writer.write(encode({'type': 'hello', 'version': PROTOCOL_VERSION, 'token': self.token}))
+			worker.writer = writer
+			try:
+				await self.receive(worker, reader)
+			except (OSError, ValueError) as e:
+				print(f"Error talking to worker {worker.name}: {e}")
+			finally:
+				await self.disconnected(worker, writer)
+			await asyncio.sleep(RECONNECT_DELAY)
+
+	async def receive(self, worker: WorkerConnection, reader: asyncio.StreamReader) -> None:
+		while True:
+			message = await read_message(reader)
+			if message is None:
+				return
+			kind = message.get('type')
+			if kind == 'hello':
+				worker.name = message.get('name') or worker.address
+				worker.slots = message.get('slots', 0)
+				worker.last_heartbeat = time.monotonic()
+				worker.connecting = False
+				print(f"Connected to worker {worker.name} with {worker.slots} slots")
+				await self.notify_changed()
+			elif kind == 'heartbeat':
+				worker.slots = message.get('slots', worker.slots)
+				worker.running = message.get('running', worker.running)
+				worker.load = message.get('load')
+				worker.last_heartbeat = time.monotonic()
+				await self.notify_changed()
+			elif kind == 'output':
+				entry = worker.jobs.get(message.get('id'))
+				if entry is not None:
+					entry[0].log.add_lines(message.get('lines', []))
+			elif kind == 'exit':
+				entry = worker.jobs.get(message.get('id'))
+				if entry is not None and not entry[1].done():
+					entry[1].set_result(message)
+			elif kind == 'error':
+				print(f"Error from worker {worker.name}: {message.get('message')}")
+
+	async def disconnected(self, worker: WorkerConnection, writer: asyncio.StreamWriter) -> None:
+		worker.writer = None
+		worker.slots = 0
+		worker.connecting = False
+		writer.close()
+		for job, future in list(worker.jobs.values()):
+			if not future.done():
+				future.set_result({'code': None, 'error': f'Lost connection to worker {worker.name}'})
+		print(f"Disconnected from worker {worker.name}")
+		await self.notify_changed()
+
+	async def monitor(self) -> None:
+		"""Disconnect workers whose heartbeats stopped, so their jobs fail instead of hanging."""
+		while True:
+			await asyncio.sleep(HEARTBEAT_INTERVAL)
+			for worker in self.workers:
+				if worker.writer is not None and worker.slots and not worker.healthy:
+					print(f"Worker {worker.name} missed its heartbeats")
+					worker.writer.close()
+			await self.notify_changed()
+
+	def least_loaded(self) -> Optional[WorkerConnection]:
+		"""Return the healthy worker with the smallest share of busy slots that has a free slot."""
+		candidates = [worker for worker in self.workers if worker.healthy and worker.free > 0]
+		if not candidates:
+			return None
+		return min(candidates, key=lambda worker: (worker.running / worker.slots, -worker.free))
+
+	async def acquire(self) -> Optional[WorkerConnection]:
+		"""Wait for a worker with a free slot.
+
+		Returns:
+			WorkerConnection: The chosen worker, or None if no worker is healthy or being connected to
+		"""
+		async with self.changed:
+			while True:
+				worker = self.least_loaded()
+				if worker is not None:
+					worker.running += 1
+					return worker
+				if not any(worker.healthy or worker.connecting for worker in self.workers):
+					return None
+				await self.changed.wait()
+
+	async def execute(self, job: Any, supervisor: Any) -> bool:
+		"""Run a job on a worker and finish it with the worker's exit code.
+
+		Args:
+			job: supervisor.Job, queued with its prerequisites met
+			supervisor: ProcessSupervisor the job belongs to
+
+		Returns:
+			bool: False if no worker is healthy and the job should run locally
+		"""
+		worker = await self.acquire()
+		if worker is None:
+			return False
+		future = asyncio.get_running_loop().create_future()
+		worker.jobs[job.id] = (job, future)
+		job.worker = worker.name
+		job.state = RUNNING
+		job.started_at = time.time()
+		try:
+			worker.send({'type': 'run', 'id': job.id, 'name': job.name, 'argv': job.argv, 'cwd': job.cwd})
+			job.log.add_lines([f'Running on worker {worker.name}'])
+			supervisor.notify(job)
+			result = await future
+		finally:
+			worker.jobs.pop(job.id, None)
+			# Free the slot taken in acquire now rather than at the worker's next heartbeat
+			worker.running = max(worker.running - 1, 0)
+			await self.notify_changed()
+		job.returncode = result.get('code')
+		if result.get('error'):
+			job.error = result['error']
+			job.log.add_lines([result['error']])
+		if job.cancel_requested:
+			supervisor.finish(job, CANCELLED)
+		else:
+			supervisor.finish(job, SUCCEEDED if job.returncode == 0 else FAILED)
+		return True
+
+	def cancel(self, job: Any) -> None:
+		"""Ask the worker running a job to stop it. Called on the supervisor loop."""
+		for worker in self.workers:
+			if job.id in worker.jobs:
+				worker.send({'type': 'cancel', 'id': job.id})
+
+	def status(self) -> List[str]:
+		"""Describe every registered worker."""
+		return [worker.describe() for worker in self.workers]
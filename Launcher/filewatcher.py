@@ -0,0 +1,203 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def load_inotify():
+	"""Return libc if it provides inotify, otherwise None."""
+	if not sys.platform.startswith('linux'):
+		return None
+	try:
+		libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+		libc.inotify_init1.argtypes = [ctypes.c_int]
+		libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+		libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+		return libc
+	except (OSError, AttributeError):
+		return None
+
+
+class FileWatcher:
+	"""Reports changed files in a set of directories on a background thread.
+
+	Uses inotify on Linux and compares directory listings at a fixed interval
+	elsewhere. Changes are collected until the directories are quiet for
+	debounce seconds, so an editor saving several files, or one file in
+	several writes, produces a single callback.
+	"""
+
+	def __init__(self, directories: Iterable[str], callback: Callable[[Optional[Set[str]]], None],
+				 match: Optional[Callable[[str], bool]] = None, interval: float = 1.0, debounce: float = 0.3,
+				 use_inotify: bool = True) -> None:
+		"""Initialize the watcher. Nothing is watched until start is called.
+
+		Args:
+			directories: Directories to watch, not recursively. Missing directories are skipped.
+			callback: Called on the watcher thread with the changed paths, or None if changes were lost
+				and everything should be reloaded
+			match: Only report paths for which this returns True
+			interval: Seconds between directory scans when polling
+			debounce: Seconds without changes before reporting them
+			use_inotify: Use inotify where available instead of polling
+		"""
+		self.directories = self.existing(directories)
+		self.callback = callback
+		self.match = match or (lambda path: True)
+		self.interval = interval
+		self.debounce = debounce
+		self.libc = load_inotify() if use_inotify else None
+		self.backend = 'inotify' if self.libc else 'polling'
+		self.stopped = threading.Event()
+		self.thread = None
+
+	@staticmethod
+	def existing(directories: Iterable[str]) -> List[str]:
+		return sorted({os.path.abspath(d) for d in directories if os.path.isdir(d)})
+
+	def set_directories(self, directories: Iterable[str]) -> None:
+		"""Watch a new set of directories, e.g. after a reload. Safe to call from any thread.
+
+		The watcher thread picks the new set up within half a second. Files in
+		directories that were added or dropped are not reported as changed.
+		"""
+		self.directories = self.existing(directories)
+
+	def start(self) -> None:
+		"""Start watching on a background thread."""
+		target = self.run_inotify if self.libc else self.run_polling
+		self.thread = threading.Thread(target=target, name='FileWatcher', daemon=True)
+		self.thread.start()
+
+	def stop(self) -> None:
+		"""Stop watching and wait for the thread to finish."""
+		self.stopped.set()
+		if self.thread is not None:
+			self.thread.join()
+
+	def report(self, paths: Optional[Set[str]]) -> None:
+		try:
+			self.callback(paths)
+		except Exception as e:
+			print(f"Error handling changed files: {e}")
+
+	def run_inotify(self) -> None:
+		fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+		if fd < 0:
+			print(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling for changes")
+			self.run_polling()
+			return
+		try:
+			watches = {}
+			watched = None
+			changed = set()
+			overflow = False
+			while not self.stopped.is_set():
+				if watched is not self.directories:
+					watched = self.directories
+					self.update_watches(fd, watches, watched)
+				# Once something changed, report it after the debounce period passes without events
+				timeout = self.debounce if changed or overflow else 0.5
+				ready, _, _ = select.select([fd], [], [], timeout)
+				if ready:
+					overflow |= self.read_events(fd, watches, changed)
+				elif overflow:
+					changed.clear()
+					overflow = False
+					self.report(None)
+				elif changed:
+					paths, changed = changed, set()
+					self.report(paths)
+		finally:
+			os.close(fd)
+
+	def update_watches(self, fd: int, watches: Dict[int, str], directories: List[str]) -> None:
+		"""Add and remove inotify watches so exactly the given directories are watched."""
+		for wd, directory in list(watches.items()):
+			if directory not in directories:
+				self.libc.inotify_rm_watch(fd, wd)
+				del watches[wd]
+		current = set(watches.values())
+		for directory in directories:
+			if directory not in current:
+				wd = self.libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+				if wd >= 0:
+					watches[wd] = directory
+
+	def read_events(self, fd: int, watches: Dict[int, str], changed: Set[str]) -> bool:
+		"""Add the paths of pending inotify events to changed.
+
+		Returns:
+			bool: True if the kernel queue overflowed and events were lost
+		"""
+		try:
+			data = os.read(fd, 65536)
+		except BlockingIOError:
+			return False
+		overflow = False
+		offset = 0
+		while offset < len(data):
+			wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+			offset += EVENT_HEADER.size
+			name = data[offset:offset + length].rstrip(b'\0')
+			offset += length
+			if mask & IN_Q_OVERFLOW:
+				overflow = True
+			elif wd in watches and name:
+				path = os.path.join(watches[wd], os.fsdecode(name))
+				if self.match(path):
+					changed.add(path)
+		return overflow
+
+	def scan(self, directories: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+		"""Return the modification time and size of every matching file."""
+		state = {}
+		for directory in directories:
+			try:
+				with os.scandir(directory) as entries:
+					for entry in entries:
+						if entry.is_file() and self.match(entry.path):
+							st = entry.stat()
+							state[entry.path] = (st.st_mtime_ns, st.st_size)
+			except OSError:
+				continue
+		return state
+
+	def run_polling(self) -> None:
+		scanned = self.directories
+		previous = self.scan(scanned)
+		changed = set()
+		last_change = 0.0
+		while not self.stopped.wait(self.interval):
+			directories = self.directories
+			current = self.scan(directories)
+			found = {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+			if directories is not scanned:
+				moved = set(directories).symmetric_difference(scanned)
+				found = {path for path in found if os.path.dirname(path) not in moved}
+				scanned = directories
+			previous = current
+			if found:
+				changed |= found
+				last_change = time.monotonic()
+			elif changed and time.monotonic() - last_change >= self.debounce:
+				paths, changed = changed, set()
+				self.report(paths)
@@ -0,0 +1,278 @@
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from configstore import write_atomic
+
+# Claims by launchers on other machines are considered abandoned after this many seconds
+CLAIM_MAX_AGE = 24 * 3600
+# A lock on the fingerprint file this many seconds old was left behind by a launcher that exited while writing
+LOCK_MAX_AGE = 30.0
+
+
+def pid_alive(pid: int) -> bool:
+	"""True if a process with this id is running on this machine."""
+	if pid <= 0:
+		return False
+	if sys.platform == 'win32':
+		import ctypes
+		kernel32 = ctypes.windll.kernel32
+		# PROCESS_QUERY_LIMITED_INFORMATION, STILL_ACTIVE
+		handle = kernel32.OpenProcess(0x1000, False, pid)
+		if not handle:
+			return False
+		try:
+			code = ctypes.c_ulong()
+			return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259
+		finally:
+			kernel32.CloseHandle(handle)
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		return True
+	return True
+
+
+@contextlib.contextmanager
+def file_lock(path: str, timeout: float = 10.0):
+	"""Hold a lock shared with other processes and machines by creating a lock file exclusively.
+
+	Args:
+		path: Lock file, removed again when the lock is released
+		timeout: Seconds to wait for another holder before giving up with TimeoutError
+	"""
+	os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+	deadline = time.monotonic() + timeout
+	while True:
+		try:
+			os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+			break
+		except FileExistsError:
+			pass
+		try:
+			if time.time() - os.stat(path).st_mtime > LOCK_MAX_AGE:
+				os.remove(path)
+				continue
+		except OSError:
+			continue
+		if time.monotonic() > deadline:
+			raise TimeoutError(f"Timed out waiting for {path}")
+		time.sleep(0.01)
+	try:
+		yield
+	finally:
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+
+
+class FileHasher:
+	"""Content hashes of files, recomputed only when a file's modification time or size changes."""
+
+	def __init__(self) -> None:
+		self.hashes = {}
+		self.lock = threading.Lock()
+
+	def hash(self, path: str) -> Optional[str]:
+		"""Return the SHA-256 of a file's contents, or None if it can't be read."""
+		try:
+			st = os.stat(path)
+		except OSError:
+			return None
+		key = (st.st_mtime_ns, st.st_size)
+		with self.lock:
+			cached = self.hashes.get(path)
+		if cached is not None and cached[0] == key:
+			return cached[1]
+		digest = hashlib.sha256()
+		try:
+			with open(path, 'rb') as fp:
+				for chunk in iter(lambda: fp.read(1 << 20), b''):
+					digest.update(chunk)
+		except OSError:
+			return None
+		with self.lock:
+			self.hashes[path] = (key, digest.hexdigest())
+		return digest.hexdigest()
+
+
+class FingerprintStore:
+	"""Fingerprints launches and remembers which ones succeeded or are running.
+
+	A fingerprint covers the target, the resolved command line, the contents
+	of the BuildGraph scripts and config files and, optionally, a source
+	control changelist. The last successful fingerprint of each target is
+	kept in a JSON file, and running launches are claimed with one small
+	file each, so launchers sharing a Saved directory see each other's jobs.
+	"""
+
+	def __init__(self, path: str, running_dir: str) -> None:
+		"""Initialize the store.
+
+		Args:
+			path: JSON file holding the last successful fingerprint of each target
+			running_dir: Directory holding a claim file per running launch
+		"""
+		self.path = path
+		self.running_dir = running_dir
+		self.hasher = FileHasher()
+		self.host = socket.gethostname()
+		self.lock = threading.Lock()
+		self.claims = 0
+		# (modification time, size) and contents of the fingerprint file as last read
+		self.records = None
+		# Modification time and file names of the running directory as last listed
+		self.listing = None
+
+	def fingerprint(self, target: str, argv: Sequence[str], files: Iterable[str],
+					changelist: Optional[str] = None) -> str:
+		"""Return the fingerprint of a launch.
+
+		Args:
+			target: Name of the build target
+			argv: Resolved RunUAT command line
+			files: Input files whose contents the result depends on
+			changelist: Source control changelist or revision, if known
+
+		Returns:
+			str: Hex digest identifying the launch inputs
+		"""
+		digest = hashlib.sha256()
+		digest.update(json.dumps([target, list(argv), changelist]).encode('utf-8'))
+		for path in sorted(set(files)):
+			digest.update(f'\0{path}\0{self.hasher.hash(path)}'.encode('utf-8'))
+		return digest.hexdigest()
+
+	def load(self) -> Dict[str, Dict[str, Any]]:
+		"""Return the last successes, reading the file only when it changed. The result must not be modified."""
+		try:
+			st = os.stat(self.path)
+			key = (st.st_mtime_ns, st.st_size)
+			cached = self.records
+			if cached is not None and cached[0] == key:
+				return cached[1]
+			with open(self.path, encoding='utf-8') as fp:
+				records = json.load(fp)
+		except (OSError, ValueError):
+			return {}
+		self.records = (key, records)
+		return records
+
+	def last_success(self, target: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+		"""Return the record of the target's last success if it had this fingerprint.
+
+		Returns:
+			dict: 'fingerprint', 'finished' time and 'duration' in seconds, or None
+		"""
+		record = self.load().get(target)
+		if record and record.get('fingerprint') == fingerprint:
+			return record
+		return None
+
+	def record_success(self, target: str, fingerprint: str, duration: float) -> None:
+		"""Remember that a launch succeeded. Safe to call from any thread or process.
+
+		The file is read again under a lock file and the record merged into it,
+		so launchers finishing at the same time don't drop each other's records.
+		"""
+		with self.lock:
+			try:
+				with file_lock(self.path + '.lock'):
+					try:
+						with open(self.path, encoding='utf-8') as fp:
+							records = json.load(fp)
+					except (FileNotFoundError, ValueError):
+						records = {}
+					records[target] = {'fingerprint': fingerprint, 'finished': time.time(), 'duration': duration}
+					write_atomic(self.path, json.dumps(records, indent=1, sort_keys=True))
+			except Exception as e:
+				print(f"Error saving fingerprints: {e}")
+
+	def claim(self, target: str, fingerprint: str) -> Optional[str]:
+		"""Mark a launch as running.
+
+		Returns:
+			str: Claim to pass to release, or None if it could not be written
+		"""
+		with self.lock:
+			self.claims += 1
+			name = f'{fingerprint[:32]}-{self.host}-{os.getpid()}-{self.claims}.json'
+		claim = os.path.join(self.running_dir, name)
+		try:
+			write_atomic(claim, json.dumps({'target': target, 'host': self.host, 'pid': os.getpid(),
+											'started': time.time()}))
+		except OSError as e:
+			print(f"Error claiming launch: {e}")
+			return None
+		return claim
+
+	def release(self, claim: Optional[str]) -> None:
+		"""Remove the mark of a finished launch."""
+		if claim is None:
+			return
+		try:
+			os.remove(claim)
+		except OSError:
+			pass
+
+	def running(self, fingerprint: str) -> List[Dict[str, Any]]:
+		"""Return the live claims of launches with this fingerprint, deleting abandoned ones.
+
+		The directory is only listed again once its modification time changes,
+		which claiming or releasing a launch does.
+		"""
+		found = []
+		prefix = fingerprint[:32] + '-'
+		try:
+			mtime = os.stat(self.running_dir).st_mtime_ns
+			listing = self.listing
+			if listing is None or listing[0] != mtime:
+				with os.scandir(self.running_dir) as entries:
+					listing = self.listing = (mtime, [entry.name for entry in entries])
+		except OSError:
+			return found
+		for path in [os.path.join(self.running_dir, name) for name in listing[1] if name.startswith(prefix)]:
+			try:
+				with open(path, encoding='utf-8') as fp:
+					info = json.load(fp)
+			except (OSError, ValueError):
+				continue
+			if self.abandoned(info):
+				self.release(path)
+			else:
+				found.append(info)
+		return found
+
+	def abandoned(self, info: Dict[str, Any]) -> bool:
+		if info.get('host') == self.host:
+			return not pid_alive(info.get('pid', 0))
+		return time.time() - info.get('started', 0) > CLAIM_MAX_AGE
+
+
+def describe_claim(info: Dict[str, Any]) -> str:
+	"""Describe a running launch for a message."""
+	started = time.strftime('%H:%M', time.localtime(info.get('started', 0)))
+	return f"{info.get('target')} on {info.get('host')} (pid {info.get('pid')}) since {started}"
+
+
+def describe_success(record: Dict[str, Any]) -> str:
+	"""Describe a successful launch for a message."""
+	finished = time.strftime('%Y-%m-%d %H:%M', time.localtime(record.get('finished', 0)))
+	return f"{finished}, taking {record.get('duration', 0) / 60:.0f} min"
+
+
+def skip_targets(plan: Sequence[Tuple[str, Any, Sequence[str]]], skipped: Iterable[str]
+			   ) -> List[Tuple[str, Any, List[str]]]:
+	"""Drop skipped targets from a plan, along with the prerequisites on them."""
+	skipped = set(skipped)
+	return [(name, argv, [p for p in prerequisites if p not in skipped])
+			for name, argv, prerequisites in plan if name not in skipped]
@@ -0,0 +1,309 @@
+import subprocess
+import time
+from configparser import ConfigParser
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import batchplan
+import optionmodel
+import profiler
+from commandbuilder import warn_if_too_long
+from dispatch import Dispatcher
+from fingerprint import FingerprintStore, describe_claim, describe_success, skip_targets
+from procstats import ProcessSampler
+from project import LauncherProject
+from runhistory import RunHistory
+from supervisor import FAILED, SUCCEEDED, ProcessSupervisor
+
+
+class HeadlessApp:
+	"""Builds and runs RunUAT commands from Launcher.ini without creating any UI."""
+
+	def __init__(self, project: LauncherProject, changelist: Optional[str] = None,
+				 skip_unchanged: bool = False, workers: Sequence[str] = (), worker_token: Optional[str] = None) -> None:
+		"""Create option models for the project and load saved values.
+
+		Args:
+			project: Loaded launcher project
+			changelist: Source control changelist of the workspace, part of each launch fingerprint
+			skip_unchanged: Skip targets whose last successful run had identical inputs
+			workers: 'host:port' of the worker agents to run targets on, empty to run them locally
+			worker_token: Shared secret of the worker agents
+		"""
+		self.project = project
+		self.fingerprints = FingerprintStore(project.fingerprint_file, project.running_dir)
+		self.changelist = changelist
+		self.skip_unchanged = skip_unchanged
+		self.workers = list(workers)
+		self.worker_token = worker_token
+		self.history = RunHistory(project.history_file)
+		self.options = []
+		self.option_index = {}
+		self.extra_sets = []
+		self.create_options()
+
+	def create_options(self) -> None:
+		"""Create fresh option models holding the values saved by the launcher window."""
+		for opt in self.options:
+			opt.dispose()
+		self.options = []
+		for elm in self.project.build_graph.options:
+			model = optionmodel.create_option_value(elm, self.project.map_data)
+			if model:
+				self.options.append(model)
+		self.option_index = {opt.name: opt for opt in self.options}
+		self.extra_sets = []
+		self.load_config()
+		self.project.bind_platform_option(self.options)
+
+	def load_config(self) -> None:
+		"""Load option values saved by the launcher window."""
+		try:
+			config_parser = ConfigParser()
+			if config_parser.read(self.project.config_ini):
+				for opt in self.options:
+					opt.load_config(config_parser)
+		except Exception as e:
+			print(f"Error loading configuration: {e}")
+
+	def set_values(self, assignments: List[str]) -> None:
+		"""Override option values from Name=Value assignments.
+
+		Names that are not launcher options are passed straight to BuildGraph.
+
+		Args:
+			assignments: Strings of the form Name=Value
+		"""
+		for assignment in assignments:
+			name, sep, value = assignment.partition('=')
+			if not sep:
+				raise ValueError(f"Expected Name=Value, got '{assignment}'")
+			opt = self.option_index.get(name)
+			if opt:
+				opt.set_value(value)
+			else:
+				self.extra_sets.append(f'-set:{name}={value}')
+
+	def build_command(self, target: str, debug: bool = False) -> List[str]:
+		"""Build the RunUAT command line for a target."""
+		proc = self.project.build_command(target, self.options, debug)
+		if debug:
+			proc = proc[:-1] + self.extra_sets + proc[-1:]
+		else:
+			proc = proc + self.extra_sets
+		warn_if_too_long(target, proc)
+		return proc
+
+	def fingerprint(self, target: str, proc: List[str]) -> str:
+		"""Return the fingerprint of launching a target with a command line."""
+		return self.fingerprints.fingerprint(target, proc, self.project.input_files(), self.changelist)
+
+	def up_to_date(self, target: str, fingerprint: str) -> bool:
+		"""True if the target should be skipped because it already succeeded with the same inputs."""
+		if not self.skip_unchanged:
+			return False
+		record = self.fingerprints.last_success(target, fingerprint)
+		if record:
+			print(f"Skipping {target}, it last succeeded with identical inputs on {describe_success(record)}")
+		return record is not None
+
+	def warn_running(self, fingerprint: str) -> None:
+		for info in self.fingerprints.running(fingerprint):
+			print(f"Warning: already running with identical inputs: {describe_claim(info)}")
+
+	def run(self, target: str, debug: bool = False, print_only: bool = False) -> int:
+		"""Print and optionally run the command for a target.
+
+		Args:
+			target: Name of the build target to execute
+			debug: Only list the graph instead of running it
+			print_only: Print the command without running it
+
+		Returns:
+			int: Exit code of RunUAT, or 0 when only printing
+		"""
+		proc = self.build_command(target, debug)
+		fingerprint = self.fingerprint(target, proc)
+		if self.up_to_date(target, fingerprint):
+			return 0
+		print(subprocess.list2cmdline(proc))
+		if print_only:
+			return 0
+		self.warn_running(fingerprint)
+		claim = self.fingerprints.claim(target, fingerprint)
+		try:
+			start = time.time()
+			code = subprocess.call(proc)
+		finally:
+			self.fingerprints.release(claim)
+		self.history.record(target, start, time.time(), SUCCEEDED if code == 0 else FAILED, code, fingerprint,
+							argv=proc)
+		if code == 0:
+			self.fingerprints.record_success(target, fingerprint, time.time() - start)
+		return code
+
+	def run_all(self, targets: List[str], max_jobs: int, sample_interval: float = 1.0, debug: bool = False,
+				print_only: bool = False, fail_fast: bool = False) -> int:
+		"""Run several targets, in parallel where they don't depend on each other.
+
+		Args:
+			targets: Names of the build targets to execute
+			max_jobs: Maximum number of RunUAT processes running at once
+			sample_interval: Seconds between resource usage samples, 0 disables sampling
+			debug: Only list the graph instead of running it
+			print_only: Print the plan without running it
+			fail_fast: Cancel the remaining targets once one fails
+
+		Returns:
+			int: 0 if every target succeeded, otherwise 1
+		"""
+		plan = []
+		fingerprints = {}
+		for target, prerequisites in self.project.build_graph.schedule(targets):
+			proc = self.build_command(target, debug)
+			fingerprints[target] = self.fingerprint(target, proc)
+			plan.append((target, proc, prerequisites))
+		jobs = self.execute(plan, fingerprints, max_jobs, sample_interval, print_only, fail_fast)
+		for job in jobs:
+			code = '' if job.returncode is None else f' ({job.returncode})'
+			worker = '' if job.worker is None else f' on {job.worker}'
+			print(f'{job.name}: {job.state}{code}{worker}')
+		return 0 if all(job.state == SUCCEEDED for job in jobs) else 1
+
+	def run_matrix(self, plan: Dict[str, Any], max_jobs: int, sample_interval: float = 1.0, debug: bool = False,
+				   print_only: bool = False, fail_fast: bool = False, assignments: Sequence[str] = ()) -> int:
+		"""Run every target of a plan file with every combination of its matrix values.
+
+		Each combination starts from the values saved in Launcher.ini, applies
+		the plan's shared values, the assignments and then its own values, and
+		resolves the command lines through the same option models as the
+		launcher window.
+
+		Args:
+			plan: Plan read by batchplan.load_plan
+			max_jobs: Maximum number of RunUAT processes running at once, unless the plan sets max_jobs
+			sample_interval: Seconds between resource usage samples, 0 disables sampling
+			debug: Only list the graphs instead of running them
+			print_only: Print the commands without running them
+			fail_fast: Cancel the remaining jobs once one fails, also set by the plan's fail-fast policy
+			assignments: Name=Value strings applied to every combination, see set_values
+
+		Returns:
+			int: 0 if every job succeeded or was skipped, otherwise 1
+		"""
+		entries = batchplan.expand_matrix(plan)
+		shared = [f'{name}={batchplan.option_text(value)}' for name, value in plan.get('set', {}).items()]
+		shared += list(assignments)
+		steps = []
+		fingerprints = {}
+		# Jobs are named after their combination, but their runs are recorded under the target
+		targets = {}
+		for entry in entries:
+			self.create_options()
+			self.set_values(shared + [f'{name}={value}' for name, value in entry.values.items()])
+			for target in entry.targets:
+				if not self.project.build_graph.get_action(target):
+					print(f"Warning: {target} is not a launcher target")
+			for target, prerequisites in self.project.build_graph.schedule(entry.targets):
+				name = entry.job_name(target)
+				proc = self.build_command(target, debug)
+				fingerprints[name] = self.fingerprint(name, proc)
+				targets[name] = target
+				steps.append((name, proc, [entry.job_name(p) for p in prerequisites]))
+		print(f'{len(entries)} combinations, {len(steps)} jobs')
+		start = time.time()
+		jobs = {job.name: job for job in self.execute(steps, fingerprints, plan.get('max_jobs', max_jobs),
+													  sample_interval, print_only,
+													  fail_fast or plan.get('policy') == batchplan.FAIL_FAST, targets)}
+		if print_only:
+			return 0
+		rows = []
+		for name, _, _ in steps:
+			job = jobs.get(name)
+			if job is None:
+				rows.append(batchplan.SummaryRow(name, batchplan.SKIPPED))
+			else:
+				rows.append(batchplan.SummaryRow(name, job.state, job.returncode, job.duration, job.worker))
+		print()
+		print(batchplan.summary_table(rows, time.time() - start))
+		return 0 if all(row.state in (SUCCEEDED, batchplan.SKIPPED) for row in rows) else 1
+
+	def execute(self, plan: List[Tuple[str, List[str], List[str]]], fingerprints: Dict[str, str], max_jobs: int,
+				sample_interval: float = 1.0, print_only: bool = False, fail_fast: bool = False,
+				targets: Optional[Dict[str, str]] = None) -> List[Any]:
+		"""Run a plan of jobs, skipping the ones already up to date, and wait for them to finish.
+
+		Args:
+			plan: (job name, command line, names of prerequisite jobs) with prerequisites listed first
+			fingerprints: Fingerprint of each job by name
+			max_jobs: Maximum number of RunUAT processes running at once
+			sample_interval: Seconds between resource usage samples, 0 disables sampling
+			print_only: Print the plan without running it
+			fail_fast: Cancel the remaining jobs once one fails
+			targets: Build target of each job by name, for jobs whose name is not the target
+
+		Returns:
+			list: The finished supervisor jobs, empty if nothing ran
+		"""
+		plan = skip_targets(plan, [name for name in fingerprints if self.up_to_date(name, fingerprints[name])])
+		for target, proc, prerequisites in plan:
+			after = f" (after {', '.join(prerequisites)})" if prerequisites else ''
+			print(f'{target}{after}: {subprocess.list2cmdline(proc)}')
+		if print_only or not plan:
+			return []
+		for target, _, _ in plan:
+			self.warn_running(fingerprints[target])
+
+		sampler = ProcessSampler(sample_interval) if sample_interval > 0 else None
+		dispatcher = Dispatcher(self.workers, self.worker_token) if self.workers else None
+		supervisor = ProcessSupervisor(max_jobs, max_queued=len(plan), sampler=sampler, dispatcher=dispatcher)
+		supervisor.add_output_listener(lambda job, lines: print('\n'.join(f'[{job.name}] {line}' for line in lines)))
+		supervisor.add_listener(lambda job: print(f'[{job.name}] {job.state}'))
+		supervisor.add_listener(lambda job: self.history.record_job(job) if job.finished else None)
+		if fail_fast:
+			supervisor.add_listener(lambda job: supervisor.cancel_all() if job.state == FAILED else None)
+		claims = {target: self.fingerprints.claim(target, fingerprints[target]) for target, _, _ in plan}
+		try:
+			jobs = supervisor.submit_plan(plan, fingerprints, targets)
+			supervisor.wait_idle()
+		except KeyboardInterrupt:
+			supervisor.cancel_all()
+			supervisor.wait_idle(supervisor.kill_timeout + 1)
+			raise
+		finally:
+			supervisor.shutdown()
+			for claim in claims.values():
+				self.fingerprints.release(claim)
+		for job in jobs:
+			if job.state == SUCCEEDED:
+				self.fingerprints.record_success(job.name, job.fingerprint, job.duration or 0.0)
+		return jobs
+
+
+def main(args: Any) -> int:
+	"""Run headless mode from parsed launcher arguments.
+
+	Returns:
+		int: Process exit code
+	"""
+	with profiler.span('LauncherProject'):
+		project = LauncherProject(args.script_directory, args.project_directory, use_cache=not args.no_cache,
+								  clear_cache=args.clear_cache, cache_hash=args.cache_hash,
+								  parse_jobs=args.parse_jobs, parse_processes=args.parse_processes)
+	for target in args.target or []:
+		if not project.build_graph.get_action(target):
+			print(f"Warning: {target} is not a launcher target")
+	with profiler.span('HeadlessApp'):
+		app = HeadlessApp(project, args.changelist, args.skip_unchanged, args.worker or (), args.worker_token)
+	try:
+		if args.plan:
+			plan = batchplan.load_plan(args.plan)
+			return app.run_matrix(plan, args.max_jobs, args.sample_interval, debug=args.listonly,
+								  print_only=args.print_only, fail_fast=args.fail_fast, assignments=args.set or [])
+		app.set_values(args.set or [])
+	except ValueError as e:
+		print(e)
+		return 2
+	if len(args.target) > 1 or args.worker:
+		return app.run_all(args.target, args.max_jobs, args.sample_interval, debug=args.listonly,
+						   print_only=args.print_only, fail_fast=args.fail_fast)
+	return app.run(args.target[0], debug=args.listonly, print_only=args.print_only)
@@ -0,0 +1,153 @@
+import codecs
+import mmap
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# Unreal array operators: add unique, add, remove, clear. No operator sets the value.
+ARRAY_OPS = '+.-!'
+
+
+class IniOp(NamedTuple):
+	"""A single key assignment read from an Unreal INI file."""
+	section: str
+	key: str
+	op: str
+	value: str
+
+
+def _detect_encoding(head: bytes) -> Optional[str]:
+	"""Return the text encoding implied by a byte order mark, or None for UTF-8."""
+	if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+		return 'utf-16'
+	return None
+
+
+class _Tokens(NamedTuple):
+	space: object
+	tab: object
+	open_bracket: object
+	close_bracket: object
+	comments: tuple
+	equals: object
+	array_ops: object
+
+
+_TEXT_TOKENS = _Tokens(' ', '\t', '[', ']', (';', '#'), '=', ARRAY_OPS)
+_BYTES_TOKENS = _Tokens(b' ', b'\t', b'[', b']', (b';', b'#'), b'=', ARRAY_OPS.encode())
+
+
+def _scan_lines(lines: Iterable, wanted: set, sections: Optional[set], binary: bool = False) -> List[IniOp]:
+	"""Scan str lines, or UTF-8 bytes lines that are only decoded when kept."""
+	t = _BYTES_TOKENS if binary else _TEXT_TOKENS
+	if binary:
+		wanted = {k.encode('utf-8') for k in wanted}
+	ops = []
+	section = None
+	keep = False
+	for line in lines:
+		c = line[:1]
+		if c == t.space or c == t.tab:
+			line = line.lstrip()
+			c = line[:1]
+		if c == t.open_bracket:
+			end = line.find(t.close_bracket)
+			if end > 0:
+				section = line[1:end]
+				if binary:
+					section = section.decode('utf-8', errors='replace')
+				keep = sections is None or section in sections
+			continue
+		if not keep or c in t.comments:
+			continue
+		key, sep, value = line.partition(t.equals)
+		if not sep:
+			continue
+		op = c if c and c in t.array_ops else c[:0]
+		key = key[len(op):].strip().lower()
+		if key in wanted:
+			value = value.strip()
+			if binary:
+				key, op, value = key.decode('utf-8'), op.decode('utf-8'), value.decode('utf-8', errors='replace')
+			ops.append(IniOp(section, key, op, value))
+	return ops
+
+
+def scan_ini(path: str, keys: Iterable[str], sections: Optional[Iterable[str]] = None,
+			 use_mmap: bool = False) -> List[IniOp]:
+	"""Read the assignments of interest from an Unreal INI file in one pass.
+
+	Lines for other keys, comments and sections that are not wanted are
+	discarded as they are read. Keys are matched case-insensitively and
+	returned lower case.
+
+	Args:
+		path: INI file to scan
+		keys: Key names of interest, without array operators
+		sections: Section names of interest, None for all sections
+		use_mmap: Read the file through a memory map instead of buffered reads
+
+	Returns:
+		list: Assignments in file order
+	"""
+	wanted = {k.lower() for k in keys}
+	section_set = set(sections) if sections is not None else None
+	with open(path, 'rb') as fp:
+		head = fp.read(3)
+		encoding = _detect_encoding(head)
+		if use_mmap and encoding is None:
+			try:
+				mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+			except ValueError:
+				# Empty files can't be mapped
+				return []
+			with mm:
+				if head == codecs.BOM_UTF8:
+					mm.seek(len(codecs.BOM_UTF8))
+				return _scan_lines(iter(mm.readline, b''), wanted, section_set, binary=True)
+
+	with open(path, 'r', encoding=encoding or 'utf-8-sig', errors='replace') as fp:
+		return _scan_lines(fp, wanted, section_set)
+
+
+def apply_ops(ops: Iterable[IniOp], values: Optional[Dict[str, Dict[str, List[str]]]] = None
+			  ) -> Dict[str, Dict[str, List[str]]]:
+	"""Apply assignments in order using Unreal's array semantics.
+
+	'+' adds a value unless already present, '.' always adds it, '-' removes
+	it, '!' clears the key and a plain assignment replaces every value.
+
+	Args:
+		ops: Assignments, usually from scan_ini
+		values: Existing values to update, for layering several files
+
+	Returns:
+		dict: Values by section name and lower case key
+	"""
+	if values is None:
+		values = {}
+	# Value counts per key so '+' doesn't scan the whole list
+	counts = {}
+	for section, key, op, value in ops:
+		current = values.setdefault(section, {}).setdefault(key, [])
+		count = counts.get((section, key))
+		if count is None:
+			count = counts[(section, key)] = Counter(current)
+		if op == '+':
+			if not count[value]:
+				current.append(value)
+				count[value] += 1
+		elif op == '.':
+			current.append(value)
+			count[value] += 1
+		elif op == '-':
+			if count[value]:
+				current.remove(value)
+				count[value] -= 1
+		elif op == '!':
+			current.clear()
+			count.clear()
+		else:
+			current[:] = [value]
+			count.clear()
+			count[value] = 1
+	return values
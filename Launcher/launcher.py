@@ -1,72 +1,131 @@
 import argparse
 import os
-import signal
-import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
-from typing import List, Callable
+from typing import List, Callable, Optional, Sequence, Set
 
-import buildgraphapi
-from launcherwindow import LauncherWindow
-from mapconfigdata import MapIniData
+import optionmodel
+import profiler
+from commandbuilder import CommandBuilder
+from configstore import ConfigStore
+from dispatch import TOKEN_ENV, Dispatcher
+from filewatcher import FileWatcher
+from fingerprint import FingerprintStore, describe_claim, describe_success, skip_targets
+from project import LauncherProject, is_watched
+from runhistory import RunHistory
+from procstats import ProcessSampler
+from supervisor import SUCCEEDED, ProcessSupervisor, QueueFull
 
 parser = argparse.ArgumentParser()
 parser.add_argument('script_directory', help="Base directory where scripts are held")
 parser.add_argument('project_directory', help="Base checkout directory")
-args = parser.parse_args()
+parser.add_argument('--no-cache', action='store_true', help="Parse every BuildGraph script without the parse cache")
+parser.add_argument('--clear-cache', action='store_true', help="Invalidate the parse cache before loading scripts")
+parser.add_argument('--cache-hash', action='store_true',
+					help="Validate cached scripts by content hash instead of modification time and size")
+parser.add_argument('--parse-jobs', type=int, default=os.cpu_count() or 1,
+					help="Number of BuildGraph scripts to parse concurrently, 1 parses serially")
+parser.add_argument('--parse-processes', action='store_true', default=None,
+					help="Parse BuildGraph scripts in a process pool even when there is little to parse")
+parser.add_argument('--max-jobs', type=int, default=2, help="Maximum number of RunUAT processes running at once")
+parser.add_argument('--max-queued', type=int, default=16,
+					help="Maximum number of launches waiting for a free job slot")
+parser.add_argument('--log-lines', type=int, default=10000, help="Number of output lines kept per job")
+parser.add_argument('--sample-interval', type=float, default=1.0,
+					help="Seconds between samples of each job's CPU, memory and I/O, 0 disables sampling")
+parser.add_argument('--no-watch', action='store_true',
+					help="Don't reload BuildGraph scripts and config files when they change")
+parser.add_argument('--changelist', help="Source control changelist of the workspace, part of each launch fingerprint")
+parser.add_argument('--skip-unchanged', action='store_true',
+					help="Skip headless targets whose last successful run had identical inputs")
+parser.add_argument('--worker', action='append', metavar='HOST:PORT',
+					help="Run targets on this worker agent instead of locally, may be given several times")
+parser.add_argument('--worker-token', help=f"Shared secret of the worker agents, defaults to the {TOKEN_ENV} variable")
+parser.add_argument('--profile', nargs='?', const=profiler.DEFAULT_TRACE, metavar='TRACE',
+					help="Profile startup and write a Chrome trace (default %(const)s) and a text summary at exit")
+parser.add_argument('--headless', action='store_true', help="Run a target without opening the launcher window")
+parser.add_argument('--target', action='append',
+					help="Target to run in headless mode, may be repeated to run several targets as a graph")
+parser.add_argument('--set', action='append', metavar='NAME=VALUE',
+					help="Override an option value in headless mode, may be repeated")
+parser.add_argument('--plan', metavar='FILE',
+					help="Run the target and option matrix of a JSON plan file without opening the launcher window")
+parser.add_argument('--fail-fast', action='store_true',
+					help="Cancel the remaining targets of --target or --plan runs once one fails")
+parser.add_argument('--listonly', action='store_true', help="Only list the graph in headless mode")
+parser.add_argument('--print-only', action='store_true', help="Print the headless command without running it")
 
 
 class MainApp:
 	"""Main application class for the BuildGraph launcher."""
 	
-	def __init__(self, in_script_dir: str, in_project_dir: str):
+	def __init__(self, project: LauncherProject, max_jobs: int = 2, max_queued: int = 16, log_lines: int = 10000,
+				 sample_interval: float = 1.0, watch: bool = True, changelist: Optional[str] = None,
+				 workers: Sequence[str] = (), worker_token: Optional[str] = None):
 		"""Initialize the main application.
 		
 		Args:
-			in_script_dir: Directory containing BuildGraph scripts
-			in_project_dir: Base project directory
+			project: Loaded launcher project
+			max_jobs: Maximum number of RunUAT processes running at once
+			max_queued: Maximum number of launches waiting for a free job slot
+			log_lines: Number of output lines kept per job
+			sample_interval: Seconds between resource usage samples, 0 disables sampling
+			watch: Reload the project when its scripts or config files change
+			changelist: Source control changelist of the workspace, part of each launch fingerprint
+			workers: 'host:port' of the worker agents to run targets on, empty to run them locally
+			worker_token: Shared secret of the worker agents
 		"""
-		self.threads = []
-		self.script_dir = in_script_dir
-		self.project_dir = in_project_dir
-		self.game_dir = os.path.join(self.project_dir, 'unreal', 'Game')
-		self.engine_dir = os.path.join(self.project_dir, 'unreal')
-		self.graph_script = os.path.join(self.script_dir, 'CPG_Builds.xml')
-		self.platform_scripts = [
-			os.path.join(self.script_dir, 'Platform_PS4.xml'),
-			os.path.join(self.script_dir, 'Platform_PS5.xml'),
-			os.path.join(self.script_dir, 'Platform_XBoxOne.xml'),
-			os.path.join(self.script_dir, 'Platform_XSX.xml'),
-		]
-		self.config_ini = os.path.join(self.game_dir, 'Saved', 'Launcher.ini')
-		self.launcher_window = LauncherWindow(self.on_exit, self.on_key_pressed)
-
-		bg = buildgraphapi.BuildGraph(os.path.join(self.script_dir, 'GlobalVariables.xml'),
-									  self.graph_script, self.platform_scripts)
-
-		map_data = MapIniData(os.path.join(self.game_dir, 'Config', 'DefaultGame.ini'),
-							  os.path.join(self.game_dir, 'Config', 'DefaultEditor.ini'))
-
-		for elm in bg.options:
-			if elm.type == 'TextEntry':
-				self.launcher_window.add_entry(elm)
-			elif elm.type == 'Dropdown':
-				self.launcher_window.add_dropdown(elm)
-			elif elm.type == 'Checkbox':
-				self.launcher_window.add_checkbox(elm)
-			elif elm.type == 'DirectoryChooser':
-				self.launcher_window.add_directory_choice(elm)
-			elif elm.type == 'MapSelect':
-				self.launcher_window.add_map_select(elm, map_data)
-			elif elm.type == 'MapSectionSelect':
-				self.launcher_window.add_map_section_select(elm, map_data)
-			elif elm.type == 'MultiSelect':
-				self.launcher_window.add_multi_select(elm)
-
-		for node in bg.actions:
-			self.launcher_window.add_button(node, self.on_button_pressed)
-
-		self.launcher_window.position_all()
-		self.load_config()
+		# Imported here so headless runs never load tkinter
+		with profiler.span('import launcherwindow'):
+			from launcherwindow import LauncherWindow
+
+		self.project = project
+		self.config_ini = project.config_ini
+		with profiler.span('LauncherWindow'):
+			self.launcher_window = LauncherWindow(self.on_exit, self.on_key_pressed)
+		self.config_store = ConfigStore(self.config_ini, self.snapshot_config, post=self.launcher_window.post)
+		sampler = ProcessSampler(sample_interval) if sample_interval > 0 else None
+		dispatcher = Dispatcher(workers, worker_token) if workers else None
+		self.supervisor = ProcessSupervisor(max_jobs, max_queued, log_lines=log_lines, sampler=sampler,
+											dispatcher=dispatcher)
+		self.supervisor.add_listener(lambda job: self.launcher_window.post(self.launcher_window.update_job, job))
+		self.fingerprints = FingerprintStore(project.fingerprint_file, project.running_dir)
+		self.changelist = changelist
+		# Job id -> claim file marking the launch as running, only used on the recorder thread
+		self.claims = {}
+		# Claims, history and successes are written in order on one thread, keeping file I/O off the loop
+		self.recorder = ThreadPoolExecutor(1, thread_name_prefix='JobRecorder')
+		self.supervisor.add_listener(lambda job: self.recorder.submit(self.on_job_changed, job, job.finished))
+		self.history = RunHistory(project.history_file)
+		self.launcher_window.add_jobs_panel(self.supervisor.cancel, self.on_run_selected, self.history)
+
+		bg = project.build_graph
+		with profiler.span('LauncherWindow.add_option'):
+			for elm in bg.options:
+				model = optionmodel.create_option_value(elm, project.map_data)
+				if model:
+					self.launcher_window.add_option(model)
+
+		with profiler.span('LauncherWindow.add_button'):
+			for node in bg.actions:
+				self.launcher_window.add_button(node, self.on_button_pressed)
+
+		with profiler.span('LauncherWindow.position_all'):
+			self.launcher_window.position_all()
+		with profiler.span('load_config'):
+			self.load_config()
+		with profiler.span('bind_platform_option'):
+			project.bind_platform_option(self.launcher_window.ui_list)
+		self.track_changes(self.launcher_window.ui_list)
+		self.command_builder = CommandBuilder(project, self.launcher_window.ui_list)
+
+		self.watcher = None
+		if watch:
+			self.watcher = FileWatcher(project.watch_directories(),
+									   lambda paths: self.launcher_window.post(self.on_files_changed, paths),
+									   match=is_watched)
+			self.watcher.start()
 
 	def on_key_pressed(self, key) -> None:
 		"""Handle key press events.
@@ -78,71 +137,228 @@ class MainApp:
 			self.kill_all_proc()
 
 	def on_button_pressed(self, name: str) -> None:
-		"""Handle button press events to start build processes.
+		"""Handle button press events to queue build processes.
 		
 		Args:
 			name: Name of the build target to execute
 		"""
 		try:
-			self.save_config()
-			proc = [f'{self.engine_dir}/Engine/Build/BatchFiles/RunUAT.bat',
-					'BuildGraph',
-					f'-set:CheckoutPath={self.project_dir}',
-					f'-set:ProjectDir={self.game_dir}',
-					f'-script={self.graph_script}',
-					f'-target={name}']
-			for opt in self.launcher_window.ui_list:
-				val = opt.get_value(name)
-				if len(val) > 0:
-					param = f'-set:{opt.name}={val}'
-					proc.append(param)
-
-			if self.launcher_window.debug:
-				proc.append('-listonly')
-
-			self.threads.append(subprocess.Popen(proc, shell=True))
+			proc = self.command_builder.build(name, self.launcher_window.debug)
+			fingerprint = self.fingerprint(name, proc)
+			if not self.confirm_launch(name, fingerprint):
+				return
+			self.supervisor.submit(name, proc, fingerprint=fingerprint)
+		except QueueFull as e:
+			self.launcher_window.show_error('Job Queue Full', f"Can't queue {name}: {e}")
 		except Exception as e:
 			print(f"Error starting build process: {e}")
-			# Could add a message box here to inform the user
+
+	def on_run_selected(self, names: List[str]) -> None:
+		"""Queue several targets, letting independent ones run in parallel.
+		
+		Args:
+			names: Names of the build targets to execute
+		"""
+		try:
+			plan = [(name, self.command_builder.build(name, self.launcher_window.debug), prerequisites)
+					for name, prerequisites in self.project.build_graph.schedule(names)]
+			fingerprints = {name: self.fingerprint(name, proc) for name, proc, _ in plan}
+			running = [line for name in fingerprints for line in self.running_duplicates(fingerprints[name])]
+			if running and not self.launcher_window.ask_question(
+					'Already Running', 'Targets with identical inputs are already running:\n' + '\n'.join(running) +
+					'\n\nQueue the selected targets anyway?'):
+				return
+			current = [name for name in fingerprints if self.fingerprints.last_success(name, fingerprints[name])]
+			if current and self.launcher_window.ask_question(
+					'Up To Date', 'These targets last succeeded with identical inputs:\n' + '\n'.join(current) +
+					'\n\nSkip them?'):
+				plan = skip_targets(plan, current)
+			self.supervisor.submit_plan(plan, fingerprints)
+		except QueueFull as e:
+			self.launcher_window.show_error('Job Queue Full', f"Can't queue the selected targets: {e}")
+		except Exception as e:
+			print(f"Error starting build processes: {e}")
+
+	def fingerprint(self, name: str, proc: List[str]) -> str:
+		"""Return the fingerprint of launching a target with a command line."""
+		return self.fingerprints.fingerprint(name, proc, self.project.input_files(), self.changelist)
+
+	def running_duplicates(self, fingerprint: str) -> List[str]:
+		"""Describe the queued or running launches with the same fingerprint, here and in other launchers."""
+		found = [f'{job.name} (job #{job.id}) in this launcher'
+				 for job in self.supervisor.active_jobs() if job.fingerprint == fingerprint]
+		found += [describe_claim(info) for info in self.fingerprints.running(fingerprint)
+				  if (info.get('host'), info.get('pid')) != (self.fingerprints.host, os.getpid())]
+		return found
+
+	def confirm_launch(self, name: str, fingerprint: str) -> bool:
+		"""Ask before starting a launch that is already running or already succeeded with the same inputs.
+		
+		Returns:
+			bool: True if the launch should go ahead
+		"""
+		running = self.running_duplicates(fingerprint)
+		if running:
+			return self.launcher_window.ask_question(
+				'Already Running', f"{name} is already running with identical inputs:\n" + '\n'.join(running) +
+				'\n\nStart it again anyway?')
+		record = self.fingerprints.last_success(name, fingerprint)
+		if record:
+			return self.launcher_window.ask_question(
+				'Up To Date', f"{name} last succeeded with identical inputs on {describe_success(record)}.\n\n"
+				'Run it again anyway?')
+		return True
+
+	def on_job_changed(self, job, finished: bool) -> None:
+		"""Claim launches while they are queued or running, and record finished ones in the history.
+		
+		Called on the recorder thread.
+		
+		Args:
+			job: Job that changed state
+			finished: Whether the job had finished when it changed
+		"""
+		if finished:
+			self.history.record_job(job)
+		if job.fingerprint is None:
+			return
+		if finished:
+			self.fingerprints.release(self.claims.pop(job.id, None))
+			if job.state == SUCCEEDED:
+				self.fingerprints.record_success(job.name, job.fingerprint, job.duration or 0.0)
+		elif job.id not in self.claims:
+			self.claims[job.id] = self.fingerprints.claim(job.name, job.fingerprint)
+
+	def on_files_changed(self, paths: Optional[Set[str]]) -> None:
+		"""Reload the project and update only the widgets whose options or actions changed.
+		
+		Args:
+			paths: Changed files, None if changes were missed and everything should be reloaded
+		"""
+		print(f"Reloading {', '.join(sorted(os.path.basename(p) for p in paths))}" if paths else 'Reloading project')
+		try:
+			with profiler.span('reload', 'reload'):
+				changes = self.project.reload(paths)
+				self.apply_changes(changes)
+			# Scripts included from new directories and new config layers are watched from now on
+			if self.watcher is not None:
+				self.watcher.set_directories(self.project.watch_directories())
+		except Exception as e:
+			print(f"Error reloading project: {e}")
+
+	def apply_changes(self, changes) -> None:
+		"""Add, remove and replace widgets for the differences found by a reload.
+		
+		Replaced options keep their current value and added options load
+		their saved value, so a reload never loses what the user entered.
+		"""
+		window = self.launcher_window
+		for name in changes.removed_options:
+			window.remove_option(name)
+			self.command_builder.untrack(name)
+		models = []
+		for option in changes.changed_options:
+			model = optionmodel.create_option_value(option, self.project.map_data)
+			old = window.get_option(option.name)
+			if model is None:
+				window.remove_option(option.name)
+				self.command_builder.untrack(option.name)
+				continue
+			if old is not None:
+				model.set_value(old.get_value('self'))
+			window.replace_option(model)
+			self.command_builder.replace(model)
+			models.append(model)
+		added = []
+		for option in changes.added_options:
+			model = optionmodel.create_option_value(option, self.project.map_data)
+			if model:
+				window.add_option(model)
+				added.append(model)
+		if added:
+			self.load_config(added)
+			self.command_builder.track(added)
+		self.project.bind_platform_option(models + added)
+		self.track_changes(models + added)
+		self.config_store.mark_dirty()
+
+		for name in changes.removed_actions:
+			window.remove_button(name)
+		for node in changes.changed_actions:
+			window.replace_button(node, self.on_button_pressed)
+		for node in changes.added_actions:
+			window.add_button(node, self.on_button_pressed)
 
 	def launch(self) -> None:
 		"""Start the launcher window."""
+		self.launcher_window.window.after_idle(profiler.instant, 'window idle')
 		self.launcher_window.start()
 
 	def kill_all_proc(self) -> None:
-		"""Terminate all running build processes."""
-		print('terminating threads')
-		for t in self.threads:
-			t.send_signal(signal.CTRL_C_EVENT)
-		self.threads = []
+		"""Cancel queued jobs and terminate the process trees of running ones."""
+		print('terminating jobs')
+		self.supervisor.cancel_all()
 
 	def on_exit(self) -> None:
 		"""Handle application exit."""
-		self.save_config()
-		if len(self.threads) > 0:
+		self.config_store.close()
+		if self.watcher is not None:
+			self.watcher.stop()
+		if self.supervisor.active_jobs():
 			if self.launcher_window.ask_question('Exit Program', 'Would you like to end all spawned processes?'):
 				self.kill_all_proc()
+				self.supervisor.wait_idle(self.supervisor.kill_timeout + 1)
+		self.supervisor.shutdown()
+		self.recorder.shutdown()
+		self.history.close()
 		self.launcher_window.exit()
 
-	def save_config(self) -> None:
-		"""Save current configuration to file."""
-		try:
-			config_parser = ConfigParser()
-			self.launcher_window.save_config(config_parser)
-			with open(self.config_ini, 'w') as fp:
-				config_parser.write(fp)
-		except Exception as e:
-			print(f"Error saving configuration: {e}")
+	def track_changes(self, models) -> None:
+		"""Save the configuration in the background whenever one of the option values changes."""
+		for model in models:
+			model.add_listener(self.config_store.mark_dirty)
+
+	def snapshot_config(self) -> ConfigParser:
+		"""Return the current option values. Called on the Tk thread, which owns the option models."""
+		config_parser = ConfigParser()
+		self.launcher_window.save_config(config_parser)
+		return config_parser
 
-	def load_config(self) -> None:
-		"""Load configuration from file."""
+	def load_config(self, models=None) -> None:
+		"""Load configuration from file.
+		
+		Args:
+			models: Option value models to load, defaults to every option in the window
+		"""
 		try:
-			config_parser = ConfigParser()
-			if config_parser.read(self.config_ini):
+			config_parser = self.config_store.load()
+			if config_parser is None:
+				return
+			if models is None:
 				self.launcher_window.load_config(config_parser)
+			else:
+				for model in models:
+					model.load_config(config_parser)
 		except Exception as e:
 			print(f"Error loading configuration: {e}")
 
 
-main_app = MainApp(args.script_directory, args.project_directory)
-main_app.launch()
+if __name__ == '__main__':
+	args = parser.parse_args()
+	if args.profile:
+		profiler.profiler.enable(args.profile)
+	if args.headless or args.plan:
+		if not args.target and not args.plan:
+			parser.error('--headless requires --target')
+		import headless
+		sys.exit(headless.main(args))
+
+	with profiler.span('startup'):
+		main_app = MainApp(LauncherProject(args.script_directory, args.project_directory,
+										   use_cache=not args.no_cache, clear_cache=args.clear_cache,
+										   cache_hash=args.cache_hash, parse_jobs=args.parse_jobs,
+										   parse_processes=args.parse_processes),
+						   max_jobs=args.max_jobs, max_queued=args.max_queued, log_lines=args.log_lines,
+						   sample_interval=args.sample_interval, watch=not args.no_watch, changelist=args.changelist,
+						   workers=args.worker or (), worker_token=args.worker_token)
+	main_app.launch()
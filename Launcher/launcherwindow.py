@@ -1,12 +1,37 @@
+import queue
+import time
 import tkinter as tk
 import tkinter.ttk as ttk
 from tkinter import messagebox
 
+import profiler
+import runhistory
+import supervisor
+import tooltip
 import uicomponent
+from procstats import format_bytes
+from runhistory import format_duration
+
+# Sections with more children than this scroll, creating only the rows in view
+VIRTUAL_THRESHOLD = 60
+# Rows a scrolling section shows at once
+VIRTUAL_ROWS = 20
+# Rows scrolled per mouse wheel step
+WHEEL_ROWS = 3
 
 
 class Section:
-	"""UI section container for organizing related controls."""
+	"""UI section container for organizing related controls.
+	
+	The section frame and its decorations are drawn immediately, while the
+	child widgets are only created once the frame is first shown. Children
+	are keyed, so they can be added, removed or replaced later on.
+	
+	Sections with more than VIRTUAL_THRESHOLD children scroll instead: only
+	the rows in view are created and placed on a canvas, and rows scrolled
+	out of view are destroyed, or kept for reuse if their factory can rebind
+	an existing component.
+	"""
 	
 	def __init__(self, window, in_name, num_col=1):
 		"""Initialize a UI section.
@@ -19,10 +44,77 @@ class Section:
 		self.name = in_name
 		self.num_col = num_col
 		self.ui = tk.Frame(window)
-		self.ui_list = []
+		self.factories = {}
+		self.widgets = {}
+		self.decorations = []
+		self.cells = []
+		self.positioned = False
+		self.built = False
+		self.build_pending = False
+		self.virtual = False
+		self.viewport = None
+		self.canvas = None
+		self.scrollbar = None
+		self.keys = []
+		self.pool = []
+		self.offset = 0
+		self.row_height = 0
+		self.col_width = 0
+		self.render_pending = False
+		self.measure_pending = False
+		self.scroll_tag = f'SectionScroll{id(self)}'
+
+	@property
+	def ui_list(self):
+		"""Child components created so far, in layout order."""
+		return [self.widgets[key] for key in self.factories if key in self.widgets]
+
+	def add(self, key, factory):
+		"""Register a child widget, created when the section is built or right away if it already is.
+		
+		Args:
+			key: Name identifying the child within the section
+			factory: Callable taking the parent frame and returning a component with a ui widget.
+				It may have a recycle attribute, a callable that rebinds an existing component to
+				this child and returns True, or returns False if the component can't be reused.
+		"""
+		self.factories[key] = factory
+		if self.built and not self.virtual:
+			self.widgets[key] = factory(self.ui)
+		if self.positioned:
+			self.position_all()
+
+	def remove(self, key):
+		"""Remove a child widget, destroying it if it was created."""
+		self.factories.pop(key, None)
+		widget = self.widgets.pop(key, None)
+		if widget is not None:
+			widget.destroy()
+		if self.positioned:
+			self.position_all()
+
+	def replace(self, key, factory):
+		"""Replace a child widget in place, keeping its position."""
+		if key not in self.factories:
+			self.add(key, factory)
+			return
+		self.factories[key] = factory
+		widget = self.widgets.pop(key, None)
+		if widget is not None:
+			widget.destroy()
+			if not self.virtual:
+				self.widgets[key] = factory(self.ui)
+			self.position_all()
 
 	def position_all(self):
-		rows_per_col = int(len(self.ui_list) / self.num_col)
+		for widget in self.decorations:
+			widget.destroy()
+		self.decorations = []
+		virtual = len(self.factories) > VIRTUAL_THRESHOLD
+		if virtual != self.virtual:
+			self.set_virtual(virtual)
+		self.keys = list(self.factories)
+		rows_per_col = 0 if self.virtual else int(len(self.factories) / self.num_col)
 		total_rows = 2 + 1 + rows_per_col + 1
 		total_col = self.num_col + 2
 		cur_row = 0
@@ -31,11 +123,13 @@ class Section:
 		row_span = total_rows
 		sep = ttk.Separator(self.ui, orient='vertical')
 		sep.grid(row=cur_row, column=cur_col, columnspan=col_span, rowspan=row_span, sticky='nwse')
+		self.decorations.append(sep)
 
 		col_span = total_col
 		row_span = 1
 		sep = ttk.Separator(self.ui, orient='horizontal')
 		sep.grid(row=cur_row, column=cur_col, columnspan=col_span, rowspan=row_span, sticky='nwse')
+		self.decorations.append(sep)
 
 		cur_row = 1
 		cur_col = 1
@@ -43,17 +137,21 @@ class Section:
 		row_span = 1
 		lbl = tk.Label(self.ui, text=self.name)
 		lbl.grid(row=cur_row, column=cur_col, columnspan=col_span, rowspan=row_span, sticky='nwse')
+		self.decorations.append(lbl)
 
 		cur_row += 1
 		col_span = self.num_col
 		sep = ttk.Separator(self.ui, orient='horizontal')
 		sep.grid(row=cur_row, column=cur_col, columnspan=col_span, rowspan=row_span, sticky='nwse')
+		self.decorations.append(sep)
 
 		cur_row += 1
-		col_span = 1
+		self.cells = []
 		list_row = 0
-		for ui_elem in self.ui_list:
-			ui_elem.ui.grid(row=cur_row+list_row, column=cur_col, columnspan=col_span, rowspan=row_span, sticky='nwse')
+		if self.virtual:
+			self.viewport.grid(row=cur_row, column=cur_col, columnspan=self.num_col, rowspan=1, sticky='nwse')
+		for _ in [] if self.virtual else self.factories:
+			self.cells.append((cur_row + list_row, cur_col))
 			list_row += 1
 			if list_row > rows_per_col:
 				cur_col += 1
@@ -65,6 +163,7 @@ class Section:
 		row_span = total_rows
 		sep = ttk.Separator(self.ui, orient='vertical')
 		sep.grid(row=cur_row, column=cur_col, columnspan=col_span, rowspan=row_span, sticky='nwse')
+		self.decorations.append(sep)
 
 		cur_row = total_rows
 		cur_col = 0
@@ -72,6 +171,437 @@ class Section:
 		row_span = 1
 		sep = ttk.Separator(self.ui, orient='horizontal')
 		sep.grid(row=cur_row, column=cur_col, columnspan=col_span, rowspan=row_span, sticky='nwse')
+		self.decorations.append(sep)
+
+		if self.built:
+			self.grid_widgets()
+		elif not self.positioned:
+			self.ui.bind('<Map>', self.on_map, add='+')
+		self.positioned = True
+
+	def grid_widgets(self):
+		if self.virtual:
+			self.render()
+			return
+		for key, (row, col) in zip(self.factories, self.cells):
+			self.widgets[key].ui.grid(row=row, column=col, columnspan=1, rowspan=1, sticky='nwse')
+
+	def on_map(self, event=None):
+		"""Schedule creation of the child widgets once the section is on screen."""
+		if not self.built and not self.build_pending:
+			self.build_pending = True
+			self.ui.after_idle(self.build)
+
+	def build(self):
+		"""Create and grid the child widgets."""
+		if self.built:
+			return
+		self.built = True
+		with profiler.span(f'Section.build {self.name}', 'widgets'):
+			if not self.virtual:
+				for key, factory in self.factories.items():
+					self.widgets[key] = factory(self.ui)
+			self.grid_widgets()
+
+	def set_virtual(self, virtual):
+		"""Switch between gridding every child and scrolling through the rows in view."""
+		for widget in list(self.widgets.values()) + self.pool:
+			widget.destroy()
+		self.widgets = {}
+		self.pool = []
+		self.virtual = virtual
+		if virtual:
+			self.offset = 0
+			self.viewport = tk.Frame(self.ui)
+			self.viewport.rowconfigure(0, weight=1)
+			self.viewport.columnconfigure(0, weight=1)
+			self.canvas = tk.Canvas(self.viewport, highlightthickness=0, borderwidth=0)
+			self.canvas.grid(row=0, column=0, sticky='nwse')
+			self.scrollbar = ttk.Scrollbar(self.viewport, orient='vertical', command=self.yview)
+			self.scrollbar.grid(row=0, column=1, sticky='ns')
+			self.canvas.bind('<Configure>', lambda event: self.schedule_render())
+			self.add_scroll_tag(self.canvas)
+			self.add_scroll_tag(self.scrollbar)
+			self.ui.bind_class(self.scroll_tag, '<MouseWheel>', self.on_wheel)
+			self.ui.bind_class(self.scroll_tag, '<Button-4>', self.on_wheel)
+			self.ui.bind_class(self.scroll_tag, '<Button-5>', self.on_wheel)
+		else:
+			self.viewport.destroy()
+			self.viewport = self.canvas = self.scrollbar = None
+			if self.built:
+				for key, factory in self.factories.items():
+					self.widgets[key] = factory(self.ui)
+
+	def add_scroll_tag(self, widget):
+		"""Make the mouse wheel scroll the section while the pointer is over a widget or its children."""
+		widget.bindtags((self.scroll_tag,) + widget.bindtags())
+		for child in widget.winfo_children():
+			self.add_scroll_tag(child)
+
+	def row_count(self):
+		return -(-len(self.keys) // self.num_col)
+
+	def view_height(self):
+		"""Height of the scrolled area in pixels."""
+		height = min(self.row_count(), VIRTUAL_ROWS) * (self.row_height or 1)
+		if self.row_height:
+			height = max(height, self.canvas.winfo_height())
+		return height
+
+	def on_wheel(self, event):
+		"""Scroll the section, or page the long tooltip shown over it.
+		
+		The scroll tag comes first in the bindtags, so this runs before the
+		tooltip's own wheel bindings and stops them once it has paged.
+		"""
+		step = -1 if event.num == 4 or event.delta > 0 else 1
+		manager = tooltip.TooltipManager.of(self.ui)
+		if manager.pageable():
+			manager.scroll(manager.current, step)
+			return 'break'
+		if manager.current is not None:
+			manager.leave(manager.current)
+		self.yview('scroll', step * WHEEL_ROWS, 'units')
+
+	def yview(self, *args):
+		"""Scroll the section, following the scrollbar protocol."""
+		total = self.row_count() * (self.row_height or 1)
+		if args[0] == 'moveto':
+			self.offset = int(float(args[1]) * total)
+		elif args[0] == 'scroll':
+			if args[2] == 'pages':
+				amount = max(self.view_height() - (self.row_height or 1), 1)
+			else:
+				amount = self.row_height or 1
+			self.offset += int(args[1]) * amount
+		self.schedule_render()
+
+	def schedule_render(self):
+		"""Render once the pending events are handled, so a burst of scroll events renders once."""
+		if not self.render_pending and self.canvas is not None:
+			self.render_pending = True
+			self.ui.after_idle(self.render)
+
+	def render(self):
+		"""Create and place the rows in view, releasing the rows scrolled out of it."""
+		self.render_pending = False
+		if self.canvas is None or not self.built:
+			return
+		with profiler.span(f'Section.render {self.name}', 'widgets'):
+			row_height = self.row_height or 1
+			view = self.view_height()
+			total = self.row_count() * row_height
+			self.offset = min(max(self.offset, 0), max(total - view, 0))
+			first = self.offset // row_height
+			last = min(self.row_count(), (self.offset + view) // row_height + 1)
+			visible = self.keys[first * self.num_col:last * self.num_col]
+			shown = set(visible)
+			for key in [key for key in self.widgets if key not in shown]:
+				self.release(key)
+			created = False
+			for index, key in enumerate(visible, first * self.num_col):
+				widget = self.widgets.get(key)
+				if widget is None:
+					widget = self.widgets[key] = self.acquire(key)
+					created = True
+				row, col = divmod(index, self.num_col)
+				widget.ui.place(x=col * self.col_width, y=row * row_height - self.offset,
+								width=self.col_width or None, height=self.row_height or None)
+			if total:
+				self.scrollbar.set(self.offset / total, min((self.offset + view) / total, 1.0))
+			else:
+				self.scrollbar.set(0.0, 1.0)
+		if created and not self.measure_pending:
+			self.measure_pending = True
+			self.ui.after_idle(self.measure)
+
+	def acquire(self, key):
+		"""Return a component for a child, rebinding a released one when its factory allows."""
+		factory = self.factories[key]
+		recycle = getattr(factory, 'recycle', None)
+		if recycle is not None:
+			for index, widget in enumerate(self.pool):
+				if recycle(widget):
+					del self.pool[index]
+					return widget
+		widget = factory(self.canvas)
+		self.add_scroll_tag(widget.ui)
+		return widget
+
+	def release(self, key):
+		widget = self.widgets.pop(key)
+		if hasattr(widget, 'rebind') and len(self.pool) < VIRTUAL_ROWS * self.num_col:
+			widget.ui.place_forget()
+			self.pool.append(widget)
+		else:
+			widget.destroy()
+
+	def measure(self):
+		"""Grow the rows and columns to fit the widgets in view, which all share one size."""
+		self.measure_pending = False
+		if self.canvas is None:
+			return
+		height = max((widget.ui.winfo_reqheight() for widget in self.widgets.values()), default=0)
+		width = max((widget.ui.winfo_reqwidth() for widget in self.widgets.values()), default=0)
+		if height > self.row_height or width > self.col_width:
+			self.row_height = max(height, self.row_height)
+			self.col_width = max(width, self.col_width)
+			self.canvas.configure(width=self.col_width * self.num_col,
+								  height=min(self.row_count(), VIRTUAL_ROWS) * self.row_height)
+			self.render()
+
+
+class JobsPanel:
+	"""Table of supervised jobs with their state, exit code, run time and predicted time left.
+	
+	Only the most recent finished jobs are kept; older rows are removed and
+	their logs released, so a long session doesn't accumulate output.
+	"""
+
+	def __init__(self, window, on_cancel, on_run_selected, estimate=None, on_history=None, max_finished=100):
+		"""Initialize the jobs panel.
+		
+		Args:
+			window: Parent window
+			on_cancel: Callback taking the id of the job to cancel
+			on_run_selected: Callback running the selected targets
+			estimate: Callback returning the predicted seconds a target takes, or None if unknown
+			on_history: Callback showing the run history, None to hide the History button
+			max_finished: Number of finished jobs kept in the table
+		"""
+		self.on_cancel = on_cancel
+		self.estimate = estimate or (lambda target: None)
+		self.max_finished = max_finished
+		self.jobs = {}
+		# Ids of the finished jobs in the table, oldest first
+		self.finished = {}
+		self.ui = tk.Frame(window)
+		self.tree = ttk.Treeview(self.ui, columns=('state', 'exit', 'time', 'eta', 'usage'), height=4)
+		self.tree.heading('#0', text='Job')
+		self.tree.heading('state', text='State')
+		self.tree.heading('exit', text='Exit Code')
+		self.tree.heading('time', text='Time')
+		self.tree.heading('eta', text='ETA')
+		self.tree.heading('usage', text='CPU / Memory / I/O')
+		self.tree.column('#0', width=200)
+		for column in ('state', 'exit', 'time'):
+			self.tree.column(column, width=80, anchor='center')
+		self.tree.column('eta', width=130, anchor='center')
+		self.tree.column('usage', width=320)
+		self.tree.grid(row=0, column=0, sticky='nwse')
+		scroll = ttk.Scrollbar(self.ui, orient='vertical', command=self.tree.yview)
+		scroll.grid(row=0, column=1, sticky='ns')
+		self.tree.configure(yscrollcommand=scroll.set)
+		bar = tk.Frame(self.ui)
+		bar.grid(row=1, column=0, columnspan=2, sticky='we')
+		self.run_btn = tk.Button(bar, text='Run Selected', state='disabled', command=on_run_selected)
+		self.run_btn.pack(side='left')
+		if on_history:
+			tk.Button(bar, text='History', command=on_history).pack(side='left')
+		tk.Button(bar, text='Cancel Selected', command=self.cancel_selected).pack(side='right')
+		# Progress of the selected running job, or of the most recently started one
+		self.progress = ttk.Progressbar(bar, maximum=1.0)
+		self.progress.pack(side='left', fill='x', expand=True, padx=8)
+		self.ui.columnconfigure(0, weight=1)
+
+	def eta(self, job):
+		"""Return the progress fraction of a job, or None, and the text of its ETA column."""
+		estimate = self.estimate(job.target)
+		if estimate is None:
+			return None, ''
+		if job.state == supervisor.QUEUED:
+			return None, f'~{format_duration(estimate)}'
+		if job.state != supervisor.RUNNING:
+			return None, ''
+		fraction, left = runhistory.progress(job.duration or 0.0, estimate)
+		if left < 0:
+			return fraction, f'{format_duration(-left)} over'
+		return fraction, f'{fraction:.0%}, {format_duration(left)} left'
+
+	def update_job(self, job):
+		"""Add or refresh the row for a job.
+		
+		Args:
+			job: supervisor.Job
+		"""
+		iid = str(job.id)
+		duration = job.duration
+		values = (job.state,
+				  '' if job.returncode is None else job.returncode,
+				  '' if duration is None else format_duration(duration),
+				  self.eta(job)[1],
+				  '' if job.stats is None else job.stats.totals())
+		text = f'#{job.id} {job.name}' if job.worker is None else f'#{job.id} {job.name} @ {job.worker}'
+		if iid in self.jobs:
+			self.tree.item(iid, text=text, values=values)
+		else:
+			self.tree.insert('', 0, iid=iid, text=text, values=values)
+		self.jobs[iid] = job
+		if job.finished and iid not in self.finished:
+			self.finished[iid] = None
+			self.prune()
+
+	def prune(self):
+		"""Remove the oldest finished jobs beyond max_finished and release their logs."""
+		while len(self.finished) > self.max_finished:
+			iid = next(iter(self.finished))
+			del self.finished[iid]
+			job = self.jobs.pop(iid)
+			self.tree.delete(iid)
+			job.log.clear()
+
+	def tick(self):
+		"""Refresh the run time of running jobs."""
+		for job in self.jobs.values():
+			if job.state == supervisor.RUNNING:
+				self.update_job(job)
+		self.update_progress()
+
+	def update_progress(self):
+		job = self.selected_job()
+		if job is None or job.state != supervisor.RUNNING:
+			running = [j for j in self.jobs.values() if j.state == supervisor.RUNNING]
+			job = max(running, key=lambda j: j.started_at) if running else None
+		fraction = self.eta(job)[0] if job is not None else None
+		self.progress.configure(value=fraction or 0.0)
+
+	def cancel_selected(self):
+		for iid in self.tree.selection():
+			self.on_cancel(int(iid))
+
+	def selected_job(self):
+		"""Return the first selected job, or None."""
+		for iid in self.tree.selection():
+			return self.jobs.get(iid)
+		return None
+
+
+class LogPanel:
+	"""Tail of one job's output, read from its log buffer on a fixed cadence.
+	
+	Each poll copies only the lines written since the previous poll in a single
+	insert, and the text widget is trimmed to max_lines, so a chatty job costs
+	the Tk thread at most one small update per interval.
+	"""
+
+	def __init__(self, window, max_lines=2000, interval=200):
+		"""Initialize the log panel.
+		
+		Args:
+			window: Parent window
+			max_lines: Number of lines kept in the text widget
+			interval: Milliseconds between polls of the log buffer
+		"""
+		self.max_lines = max_lines
+		self.interval = interval
+		self.job = None
+		self.seq = 0
+		self.ui = tk.Frame(window)
+		self.title = tk.Label(self.ui, text='Log', anchor='w')
+		self.title.grid(row=0, column=0, columnspan=2, sticky='we')
+		self.text = tk.Text(self.ui, height=12, wrap='none', state='disabled')
+		self.text.grid(row=1, column=0, sticky='nwse')
+		scroll = ttk.Scrollbar(self.ui, orient='vertical', command=self.text.yview)
+		scroll.grid(row=1, column=1, sticky='ns')
+		self.text.configure(yscrollcommand=scroll.set)
+		self.ui.columnconfigure(0, weight=1)
+		self.ui.rowconfigure(1, weight=1)
+		self.ui.after(self.interval, self.poll)
+
+	def show(self, job):
+		"""Switch the panel to a job's output.
+		
+		Args:
+			job: supervisor.Job
+		"""
+		if job is self.job:
+			return
+		self.job = job
+		self.seq = 0
+		self.title.configure(text=f'Log: #{job.id} {job.name}')
+		self.text.configure(state='normal')
+		self.text.delete('1.0', 'end')
+		self.text.configure(state='disabled')
+		self.update(limit=self.max_lines)
+
+	def poll(self):
+		if self.job is not None:
+			self.update()
+		self.ui.after(self.interval, self.poll)
+
+	def update(self, limit=None):
+		"""Append the lines the job wrote since the last update."""
+		lines, self.seq, skipped = self.job.log.read(self.seq, limit or self.max_lines)
+		if not lines and not skipped:
+			return
+		if skipped:
+			lines.insert(0, f'... {skipped} lines not shown ...')
+		# Only follow the output if the view is already at the end
+		follow = self.text.yview()[1] >= 1.0
+		self.text.configure(state='normal')
+		self.text.insert('end', '\n'.join(lines) + '\n')
+		excess = int(self.text.index('end-1c').split('.')[0]) - 1 - self.max_lines
+		if excess > 0:
+			self.text.delete('1.0', f'{excess + 1}.0')
+		self.text.configure(state='disabled')
+		if follow:
+			self.text.see('end')
+
+
+class HistoryWindow:
+	"""Most recent finished runs, optionally of one target."""
+
+	ALL_TARGETS = 'All targets'
+
+	def __init__(self, window, history, limit=1000):
+		"""Open the history window.
+		
+		Args:
+			window: Parent window
+			history: runhistory.RunHistory to read from
+			limit: Maximum number of runs shown
+		"""
+		self.history = history
+		self.limit = limit
+		self.ui = tk.Toplevel(window)
+		self.ui.title('Run History')
+		self.target = tk.StringVar(self.ui, self.ALL_TARGETS)
+		self.filter = ttk.Combobox(self.ui, textvariable=self.target, state='readonly')
+		self.filter.grid(row=0, column=0, sticky='w')
+		self.filter.bind('<<ComboboxSelected>>', lambda event: self.load())
+		columns = ('started', 'duration', 'state', 'exit', 'cpu', 'memory', 'io')
+		self.tree = ttk.Treeview(self.ui, columns=columns, height=20)
+		self.tree.heading('#0', text='Target')
+		for column, title in zip(columns, ('Started', 'Duration', 'State', 'Exit Code', 'CPU', 'Peak Memory',
+										   'Read / Written')):
+			self.tree.heading(column, text=title)
+			self.tree.column(column, width=90, anchor='center')
+		self.tree.column('#0', width=200)
+		self.tree.column('started', width=130)
+		self.tree.column('io', width=160)
+		self.tree.grid(row=1, column=0, sticky='nwse')
+		scroll = ttk.Scrollbar(self.ui, orient='vertical', command=self.tree.yview)
+		scroll.grid(row=1, column=1, sticky='ns')
+		self.tree.configure(yscrollcommand=scroll.set)
+		self.ui.columnconfigure(0, weight=1)
+		self.ui.rowconfigure(1, weight=1)
+		self.load()
+
+	def load(self):
+		"""Show the most recent runs of the selected target."""
+		self.filter.configure(values=[self.ALL_TARGETS] + self.history.targets())
+		target = self.target.get()
+		runs = self.history.recent(self.limit, None if target == self.ALL_TARGETS else target)
+		self.tree.delete(*self.tree.get_children())
+		for run in runs:
+			self.tree.insert('', 'end', text=run.target, values=(
+				time.strftime('%Y-%m-%d %H:%M', time.localtime(run.started)),
+				format_duration(run.duration),
+				run.state,
+				'' if run.exit_code is None else run.exit_code,
+				'' if run.cpu_seconds is None else f'{run.cpu_seconds:.0f}s',
+				'' if run.peak_rss is None else format_bytes(run.peak_rss),
+				'' if run.read_bytes is None else f'{format_bytes(run.read_bytes)} / {format_bytes(run.write_bytes)}'))
 
 
 class LauncherWindow:
@@ -112,8 +642,16 @@ class LauncherWindow:
 
 		self.window.bind('<KeyRelease>', self.key_release)
 
+		self.option_types = {'TextEntry': uicomponent.TextEntryOption,
+							 'Dropdown': uicomponent.DropdownOption,
+							 'Checkbox': uicomponent.CheckboxOption,
+							 'DirectoryChooser': uicomponent.DirectoryOption,
+							 'MapSelect': uicomponent.MapSelectOption,
+							 'MapSectionSelect': uicomponent.MapSectionSelectOption,
+							 'MultiSelect': uicomponent.MultiSelectOption}
 		self.ui_list = []
 		self.btn_list = []
+		self.selected_targets = []
 		self.sections = {'General': Section(self.window, 'General'),
 						 'Package': Section(self.window, 'Package', 2),
 						 'Maps': Section(self.window, 'Maps'),
@@ -137,6 +675,81 @@ class LauncherWindow:
 		self.btn_sections['Compile'].ui.grid(row=3, column=3, sticky='n')
 		self.btn_sections['Editor'].ui.grid(row=3, column=4, sticky='n')
 
+		# Callbacks posted from other threads, run on the Tk thread
+		self.posted = queue.SimpleQueue()
+		self.post_interval = 50
+		self.jobs_panel = None
+		self.log_panel = None
+		self.history_window = None
+		self.window.after(self.post_interval, self.run_posted)
+
+	def post(self, callback, *args):
+		"""Run a callback on the Tk thread. Safe to call from any thread.
+		
+		Args:
+			callback: Function to call
+			*args: Arguments for the callback
+		"""
+		self.posted.put((callback, args))
+
+	def run_posted(self):
+		"""Run callbacks posted from other threads and reschedule."""
+		try:
+			while True:
+				callback, args = self.posted.get_nowait()
+				try:
+					callback(*args)
+				except Exception as e:
+					print(f"Error in posted callback: {e}")
+		except queue.Empty:
+			pass
+		self.window.after(self.post_interval, self.run_posted)
+
+	def add_jobs_panel(self, on_cancel, on_run_selected, history=None):
+		"""Show the supervised jobs below the run buttons.
+		
+		Args:
+			on_cancel: Callback taking the id of the job to cancel
+			on_run_selected: Callback taking the list of selected target names
+			history: runhistory.RunHistory predicting ETAs and shown by the History button
+		"""
+		sep = ttk.Separator(self.window, orient='horizontal')
+		sep.grid(row=4, column=0, columnspan=6, sticky='nwse')
+		self.jobs_panel = JobsPanel(self.window, on_cancel, lambda: self.run_selected(on_run_selected),
+									history.estimate if history else None,
+									(lambda: self.show_history(history)) if history else None)
+		self.jobs_panel.ui.grid(row=5, column=0, columnspan=6, sticky='nwse')
+		self.log_panel = LogPanel(self.window)
+		self.log_panel.ui.grid(row=6, column=0, columnspan=6, sticky='nwse')
+		self.jobs_panel.tree.bind('<<TreeviewSelect>>', self.on_job_selected)
+		self.tick_jobs()
+
+	def on_job_selected(self, event=None):
+		job = self.jobs_panel.selected_job()
+		if job is not None:
+			self.log_panel.show(job)
+
+	def show_history(self, history):
+		"""Open the run history, or bring it to the front and reload it if it is already open."""
+		if self.history_window is not None and self.history_window.ui.winfo_exists():
+			self.history_window.load()
+			self.history_window.ui.lift()
+			return
+		self.history_window = HistoryWindow(self.window, history)
+
+	def tick_jobs(self):
+		self.jobs_panel.tick()
+		self.window.after(1000, self.tick_jobs)
+
+	def update_job(self, job):
+		"""Show a job's current state. Must be called on the Tk thread."""
+		if self.jobs_panel is not None:
+			self.jobs_panel.update_job(job)
+			# Follow newly started jobs unless a running job's log is already shown
+			shown = self.log_panel.job
+			if job.state == supervisor.RUNNING and (shown is None or shown.finished):
+				self.log_panel.show(job)
+
 	def exit(self):
 		"""Close the launcher window."""
 		self.window.destroy()
@@ -156,45 +769,134 @@ class LauncherWindow:
 		print(response)
 		return response == 'yes'
 
-	def add_dropdown(self, bg_option):
-		dp = uicomponent.DropdownOption(self.sections[bg_option.category].ui, bg_option)
-		self.ui_list.append(dp)
-		self.sections[bg_option.category].ui_list.append(dp)
-
-	def add_entry(self, bg_option):
-		dp = uicomponent.TextEntryOption(self.sections[bg_option.category].ui, bg_option)
-		self.ui_list.append(dp)
-		self.sections[bg_option.category].ui_list.append(dp)
-
-	def add_checkbox(self, bg_option):
-		dp = uicomponent.CheckboxOption(self.sections[bg_option.category].ui, bg_option)
-		self.ui_list.append(dp)
-		self.sections[bg_option.category].ui_list.append(dp)
-
-	def add_directory_choice(self, bg_option):
-		dp = uicomponent.DirectoryOption(self.sections[bg_option.category].ui, bg_option)
-		self.ui_list.append(dp)
-		self.sections[bg_option.category].ui_list.append(dp)
-
-	def add_map_select(self, bg_option, map_data):
-		dp = uicomponent.MapSelectOption(self.sections[bg_option.category].ui, bg_option, map_data)
-		self.ui_list.append(dp)
-		self.sections[bg_option.category].ui_list.append(dp)
-
-	def add_map_section_select(self, bg_option, map_data):
-		dp = uicomponent.MapSectionSelectOption(self.sections[bg_option.category].ui, bg_option, map_data)
-		self.ui_list.append(dp)
-		self.sections[bg_option.category].ui_list.append(dp)
-
-	def add_multi_select(self, bg_option):
-		dp = uicomponent.MultiSelectOption(self.sections[bg_option.category].ui, bg_option)
-		self.ui_list.append(dp)
-		self.sections[bg_option.category].ui_list.append(dp)
+	@staticmethod
+	def show_error(title, message):
+		"""Display an error dialog.
+		
+		Args:
+			title: Dialog title
+			message: Error text
+		"""
+		messagebox.showerror(title, message)
+
+	def add_option(self, model):
+		"""Add an option whose widget is created when its section is first shown.
+		
+		Args:
+			model: Option value model, see optionmodel
+		"""
+		self.ui_list.append(model)
+		self.sections[model.option.category].add(model.name, self.option_factory(model))
+
+	def option_factory(self, model):
+		component = self.option_types[model.option.type]
+		return lambda parent: self.create_widget(component, parent, model)
+
+	def get_option(self, name):
+		"""Return the model of a shown option, or None."""
+		return next((model for model in self.ui_list if model.name == name), None)
+
+	def remove_option(self, name):
+		"""Remove an option and its widget."""
+		model = self.get_option(name)
+		if model is None:
+			return
+		self.ui_list.remove(model)
+		self.sections[model.option.category].remove(name)
+		model.dispose()
+
+	def replace_option(self, model):
+		"""Show a new model for an existing option, moving it if its category changed.
+		
+		Args:
+			model: Option value model replacing the one with the same name
+		"""
+		old = self.get_option(model.name)
+		if old is None:
+			self.add_option(model)
+			return
+		self.ui_list[self.ui_list.index(old)] = model
+		if old.option.category == model.option.category:
+			self.sections[model.option.category].replace(model.name, self.option_factory(model))
+		else:
+			self.sections[old.option.category].remove(model.name)
+			self.sections[model.option.category].add(model.name, self.option_factory(model))
+		old.dispose()
+
+	@staticmethod
+	def create_widget(component, parent, model):
+		with profiler.span(f'create {model.option.type}', 'widgets', option=model.name):
+			return component(parent, model)
 
 	def add_button(self, bg_node, on_pressed):
-		dp = uicomponent.RunButton(self.btn_sections[bg_node.category].ui, bg_node, on_pressed)
-		self.btn_list.append(dp)
-		self.btn_sections[bg_node.category].ui_list.append(dp)
+		section = self.btn_sections[bg_node.category]
+		self.btn_list.append(bg_node)
+		section.add(bg_node.name, self.button_factory(bg_node, on_pressed))
+
+	def button_factory(self, bg_node, on_pressed):
+		def factory(parent):
+			return uicomponent.RunButton(parent, bg_node, on_pressed, self.toggle_target,
+										 bg_node.name in self.selected_targets)
+
+		def recycle(button):
+			if not isinstance(button, uicomponent.RunButton):
+				return False
+			button.rebind(bg_node, on_pressed, bg_node.name in self.selected_targets)
+			return True
+
+		factory.recycle = recycle
+		return factory
+
+	def get_button(self, name):
+		"""Return the BuildGraph node of a shown run button, or None."""
+		return next((node for node in self.btn_list if node.name == name), None)
+
+	def remove_button(self, name):
+		"""Remove a run button and drop its target from the selection."""
+		node = self.get_button(name)
+		if node is None:
+			return
+		self.btn_list.remove(node)
+		self.btn_sections[node.category].remove(name)
+		if name in self.selected_targets:
+			self.selected_targets.remove(name)
+			self.update_selection()
+
+	def replace_button(self, bg_node, on_pressed):
+		"""Show a new node for an existing run button, moving it if its category changed."""
+		old = self.get_button(bg_node.name)
+		if old is None:
+			self.add_button(bg_node, on_pressed)
+			return
+		self.btn_list[self.btn_list.index(old)] = bg_node
+		if old.category == bg_node.category:
+			self.btn_sections[bg_node.category].replace(bg_node.name, self.button_factory(bg_node, on_pressed))
+		else:
+			self.btn_sections[old.category].remove(bg_node.name)
+			self.btn_sections[bg_node.category].add(bg_node.name, self.button_factory(bg_node, on_pressed))
+
+	def toggle_target(self, name):
+		"""Add a target to the multi-target selection, or remove it."""
+		if name in self.selected_targets:
+			self.selected_targets.remove(name)
+		else:
+			self.selected_targets.append(name)
+		self.update_selection()
+
+	def update_selection(self):
+		for key in self.btn_sections:
+			for btn in self.btn_sections[key].ui_list:
+				btn.set_selected(btn.name in self.selected_targets)
+		if self.jobs_panel is not None:
+			count = len(self.selected_targets)
+			self.jobs_panel.run_btn.configure(text=f'Run Selected ({count})' if count else 'Run Selected',
+											  state='normal' if count else 'disabled')
+
+	def run_selected(self, on_run_selected):
+		targets = list(self.selected_targets)
+		self.selected_targets.clear()
+		self.update_selection()
+		on_run_selected(targets)
 
 	def position_all(self):
 		for key in self.sections:
@@ -209,6 +911,13 @@ class LauncherWindow:
 	def load_config(self, config_parser):
 		for ui_elem in self.ui_list:
 			ui_elem.load_config(config_parser)
+		self.refresh_all()
+
+	def refresh_all(self):
+		"""Update every option widget that has been created from its model."""
+		for key in self.sections:
+			for ui_elem in self.sections[key].ui_list:
+				ui_elem.refresh()
 
 	def start(self):
 		self.window.geometry("")
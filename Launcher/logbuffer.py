@@ -0,0 +1,86 @@
+import codecs
+import threading
+from collections import deque
+from itertools import islice
+from typing import List, Optional, Tuple
+
+
+class LogBuffer:
+	"""Fixed-size ring buffer of the most recent output lines of a process.
+
+	Every line gets a sequence number, so readers can ask for the lines after
+	the last one they saw and learn how many fell out of the buffer in between.
+	Written from the supervisor thread and read from the Tk thread.
+	"""
+
+	def __init__(self, max_lines: int = 10000, max_line_length: int = 4096, encoding: str = 'utf-8') -> None:
+		"""Initialize an empty buffer.
+
+		Args:
+			max_lines: Number of lines kept, older lines are discarded
+			max_line_length: Longer lines are truncated
+			encoding: Encoding of the process output
+		"""
+		self.lines = deque(maxlen=max_lines)
+		self.max_line_length = max_line_length
+		self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+		self.partial = ''
+		self.next_seq = 0
+		self.lock = threading.Lock()
+		# Called with each batch of complete lines after they are stored
+		self.on_lines = None
+
+	@property
+	def first_seq(self) -> int:
+		"""Sequence number of the oldest line still held."""
+		return self.next_seq - len(self.lines)
+
+	def write(self, data: bytes) -> None:
+		"""Add a chunk of raw output, which may end part way through a line."""
+		text = self.partial + self.decoder.decode(data)
+		lines = text.split('\n')
+		self.partial = lines.pop()
+		if len(self.partial) > self.max_line_length:
+			# Don't let a line without a newline grow without bound
+			lines.append(self.partial)
+			self.partial = ''
+		if lines:
+			self.add_lines(lines)
+
+	def flush(self) -> None:
+		"""Add any trailing output that did not end with a newline."""
+		text = self.partial + self.decoder.decode(b'', final=True)
+		self.partial = ''
+		if text:
+			self.add_lines([text])
+
+	def add_lines(self, lines: List[str]) -> None:
+		limit = self.max_line_length
+		lines = [line.rstrip('\r') if len(line) <= limit else line[:limit] + '...' for line in lines]
+		with self.lock:
+			self.lines.extend(lines)
+			self.next_seq += len(lines)
+		if self.on_lines is not None:
+			self.on_lines(lines)
+
+	def clear(self) -> None:
+		"""Drop every line held. Sequence numbers carry on, so readers see the lines as skipped."""
+		with self.lock:
+			self.lines.clear()
+
+	def read(self, seq: int, limit: Optional[int] = None) -> Tuple[List[str], int, int]:
+		"""Read the lines from a sequence number onwards.
+
+		Args:
+			seq: Sequence number of the first line wanted
+			limit: Only return the last limit lines
+
+		Returns:
+			tuple: Lines, sequence number to read from next time and number of lines skipped
+		"""
+		with self.lock:
+			start = max(seq, self.first_seq, self.next_seq - limit if limit else 0)
+			# Walk back from the newest line so a reader keeping up only touches new lines
+			lines = list(islice(reversed(self.lines), max(self.next_seq - start, 0)))
+			lines.reverse()
+			return lines, self.next_seq, start - seq
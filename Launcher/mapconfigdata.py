@@ -1,84 +1,239 @@
-from collections import OrderedDict
-from configparser import ConfigParser
-from typing import List, Dict
+from typing import Callable, Dict, List, Optional
 
+import profiler
+from confighierarchy import ConfigHierarchy
+from iniscanner import apply_ops, scan_ini
+from mapindex import MapIndex
+
+PACKAGING_SECTION = '/Script/UnrealEd.ProjectPackagingSettings'
+GAME_KEYS = (['MapsToCook'], [PACKAGING_SECTION])
+EDITOR_KEYS = (['Map', 'Section'], None)
+# Keys and sections to pass to ConfigHierarchy for from_hierarchy
+CONFIG_KEYS = {'Game': GAME_KEYS, 'Editor': EDITOR_KEYS}
 
-class ConfigParserMultiValues(OrderedDict):
-	"""Custom OrderedDict that handles multiple values for the same key."""
-	
-	def __setitem__(self, key, value):
-		"""Set a key-value pair, extending list values if key exists."""
-		if key in self and isinstance(value, list):
-			self[key].extend(value)
-		else:
-			super().__setitem__(key, value)
 
-	@staticmethod
-	def getlist(value):
-		"""Convert a string value to a list by splitting on newlines."""
-		return value.split('\n')
+def map_name(value: str) -> str:
+	"""Extract the map name from a map path value such as (FilePath="/Game/Maps/Name")."""
+	return value.split('/')[-1][:-2]
 
 
 class MapIniData:
 	"""Parser for Unreal Engine map configuration data."""
 	
-	def __init__(self, game_ini_path: str, editor_ini_path: str) -> None:
+	def __init__(self, game_ini_path: str, editor_ini_path: str, use_mmap: bool = False) -> None:
 		"""Initialize map data parser.
 		
+		Only +MapsToCook, +Map and +Section are read, using Unreal's array
+		operator semantics.
+		
 		Args:
 			game_ini_path: Path to DefaultGame.ini
 			editor_ini_path: Path to DefaultEditor.ini
+			use_mmap: Read the INI files through a memory map
 		"""
-		self.map_sections = {}
-		self.all_maps = []
+		self.init_state()
 
 		print(f"Loading game config: {game_ini_path}")
 		print(f"Loading editor config: {editor_ini_path}")
 
+		game_ini = {}
 		try:
-			game_ini = ConfigParser(strict=False, empty_lines_in_values=False, dict_type=ConfigParserMultiValues,
-									converters={"list": ConfigParserMultiValues.getlist})
-			game_ini.read(game_ini_path)
-
-			if game_ini.has_section('/Script/UnrealEd.ProjectPackagingSettings'):
-				maps = game_ini.getlist('/Script/UnrealEd.ProjectPackagingSettings', '+MapsToCook')
-				for m in maps:
-					self.all_maps.append(m.split('/')[-1][:-2])
+			game_ini = apply_ops(scan_ini(game_ini_path, *GAME_KEYS, use_mmap=use_mmap))
 		except Exception as e:
 			print(f"Error loading game config: {e}")
 
+		ed_ini = {}
 		try:
-			ed_ini = ConfigParser(strict=False, empty_lines_in_values=False, dict_type=ConfigParserMultiValues,
-								  converters={"list": ConfigParserMultiValues.getlist})
-			ed_ini.read(editor_ini_path)
-			sections = ed_ini.sections()
-			for section in sections:
-				if ed_ini.has_option(section, '+Map') or ed_ini.has_option(section, '+Section'):
-					self.map_sections[section] = []
-					if ed_ini.has_option(section, '+Map'):
-						maps = ed_ini.getlist(section, '+Map')
-						for m in maps:
-							self.map_sections[section].append(m.split('/')[-1][:-2])
-					if ed_ini.has_option(section, '+Section'):
-						linked_sections = ed_ini.getlist(section, '+Section')
-						self.process_sections(ed_ini, linked_sections, section)
+			ed_ini = apply_ops(scan_ini(editor_ini_path, *EDITOR_KEYS, use_mmap=use_mmap))
 		except Exception as e:
 			print(f"Error loading editor config: {e}")
 
-	def process_sections(self, ed_ini: ConfigParser, sections: List[str], main_sec: str) -> None:
-		"""Process linked sections recursively.
+		self.load(game_ini, ed_ini)
+
+	@classmethod
+	def from_hierarchy(cls, hierarchy: ConfigHierarchy, platform: Optional[str] = None) -> 'MapIniData':
+		"""Create map data from every layer of the Unreal config hierarchy.
+		
+		Args:
+			hierarchy: Config resolver created with CONFIG_KEYS
+			platform: Config platform name, None for the platform independent view
+			
+		Returns:
+			MapIniData: Map data for the platform
+		"""
+		data = cls.__new__(cls)
+		data.init_state()
+		data.hierarchy = hierarchy
+		data.set_platform(platform, force=True)
+		return data
+
+	def init_state(self) -> None:
+		"""Reset every field to empty."""
+		self.map_sections = {}
+		self.all_maps = []
+		self.section_maps = {}
+		self.section_links = {}
+		self.cycles = []
+		self.hierarchy = None
+		self.platform = None
+		self.listeners = []
+		self._resolved = {}
+		self._map_index = None
+		self._map_to_sections = None
+
+	def load(self, game_ini: Dict[str, Dict[str, List[str]]], ed_ini: Dict[str, Dict[str, List[str]]]) -> None:
+		"""Fill the map lists from merged game and editor config values.
+		
+		Args:
+			game_ini: Game config values by section and lower case key
+			ed_ini: Editor config values by section and lower case key
+		"""
+		self.all_maps = [map_name(m) for m in game_ini.get(PACKAGING_SECTION, {}).get('mapstocook', [])]
+		self.section_maps = {}
+		self.section_links = {}
+		for section, keys in ed_ini.items():
+			if keys.get('map') or keys.get('section'):
+				self.section_maps[section] = [map_name(m) for m in keys.get('map', [])]
+				self.section_links[section] = list(keys.get('section', []))
+		self.cycles = []
+		self._resolved = {}
+		self._map_index = None
+		self._map_to_sections = None
+		self.resolve_all()
+
+	def set_platform(self, platform: Optional[str], force: bool = False) -> None:
+		"""Switch to the merged map data of another platform.
+		
+		Only available for map data created with from_hierarchy. Listeners
+		are notified when the data is reloaded.
+		
+		Args:
+			platform: Config platform name, None for the platform independent view
+			force: Reload even if the platform did not change
+		"""
+		if self.hierarchy is None or (platform == self.platform and not force):
+			return
+		self.platform = platform
+		try:
+			with profiler.span('MapIniData.merge_config', platform=platform):
+				game_ini = self.hierarchy.merged('Game', platform)
+				ed_ini = self.hierarchy.merged('Editor', platform)
+			with profiler.span('MapIniData.load', platform=platform):
+				self.load(game_ini, ed_ini)
+		except Exception as e:
+			print(f"Error loading config for platform {platform}: {e}")
+		for listener in self.listeners:
+			listener(self)
+
+	def add_listener(self, callback: Callable[['MapIniData'], None]) -> None:
+		"""Call back after the map data is reloaded for another platform."""
+		self.listeners.append(callback)
+
+	def remove_listener(self, callback: Callable[['MapIniData'], None]) -> None:
+		"""Stop calling back a listener added with add_listener."""
+		if callback in self.listeners:
+			self.listeners.remove(callback)
+
+	@property
+	def map_index(self) -> MapIndex:
+		"""Search index over all_maps, built on first use."""
+		if self._map_index is None:
+			self._map_index = MapIndex(self.all_maps)
+		return self._map_index
+
+	def resolve_all(self) -> None:
+		"""Resolve every map section, filling map_sections."""
+		self.map_sections = {section: self.resolve_section(section) for section in self.section_maps}
+
+	def resolve_section(self, section: str) -> List[str]:
+		"""Resolve the maps of a section, including those of linked sections.
+		
+		The +Section links are walked as a graph without recursion: each
+		section is resolved once and memoized, and maps are deduplicated
+		keeping their first position. Sections linking to each other in a
+		cycle are resolved together, so each one gets the maps of the whole
+		cycle whichever is resolved first; the cycles are reported in cycles.
+		
+		Args:
+			section: Section name
+			
+		Returns:
+			list: Map names in the section and its linked sections
+		"""
+		if section in self._resolved:
+			return self._resolved[section]
+
+		# Tarjan's strongly connected components: sections finish in reverse link order
+		index = {section: 0}
+		low = {section: 0}
+		pending = [section]
+		on_pending = {section}
+		stack = [(section, iter(self.section_links.get(section, ())))]
+		on_stack = {section}
+		while stack:
+			name, links = stack[-1]
+			for link in links:
+				if link in self._resolved:
+					continue
+				if link not in index:
+					index[link] = low[link] = len(index)
+					pending.append(link)
+					on_pending.add(link)
+					stack.append((link, iter(self.section_links.get(link, ()))))
+					on_stack.add(link)
+					break
+				if link in on_stack:
+					chain = [n for n, _ in stack]
+					cycle = chain[chain.index(link):] + [link]
+					self.cycles.append(cycle)
+					print(f"Map section cycle: {' -> '.join(cycle)}")
+				if link in on_pending:
+					low[name] = min(low[name], index[link])
+			else:
+				stack.pop()
+				on_stack.discard(name)
+				if stack:
+					parent = stack[-1][0]
+					low[parent] = min(low[parent], low[name])
+				if low[name] == index[name]:
+					component = []
+					while not component or component[-1] != name:
+						component.append(pending.pop())
+					component.reverse()
+					on_pending.difference_update(component)
+					self.resolve_component(component)
+		return self._resolved[section]
+
+	def resolve_component(self, component: List[str]) -> None:
+		"""Resolve sections that link to each other, once every section they link out to is resolved.
+		
+		Each section lists its own maps first, followed by the rest of the maps
+		of the component in resolution order.
+		"""
+		members = set(component)
+		union = {}
+		for section in component:
+			union.update(dict.fromkeys(self.section_maps.get(section, ())))
+			for link in self.section_links.get(section, ()):
+				if link not in members:
+					union.update(dict.fromkeys(self._resolved.get(link, ())))
+		for section in component:
+			maps = dict.fromkeys(self.section_maps.get(section, ()))
+			maps.update(union)
+			self._resolved[section] = list(maps)
+
+	def sections_containing(self, map_name: str) -> List[str]:
+		"""Return the map sections that resolve to include a map.
 		
 		Args:
-			ed_ini: Editor INI parser
-			sections: List of section names to process
-			main_sec: Main section name
+			map_name: Map name as listed in map_sections
+			
+		Returns:
+			list: Section names in config order
 		"""
-		for section in sections:
-			if ed_ini.has_option(section, '+Map') or ed_ini.has_option(section, '+Section'):
-				if ed_ini.has_option(section, '+Map'):
-					maps = ed_ini.getlist(section, '+Map')
-					for m in maps:
-						self.map_sections[main_sec].append(m.split('/')[-1][:-2])
-				if ed_ini.has_option(section, '+Section'):
-					linked_sections = ed_ini.getlist(section, '+Section')
-					self.process_sections(ed_ini, linked_sections, main_sec)
+		if self._map_to_sections is None:
+			self._map_to_sections = {}
+			for section, maps in self.map_sections.items():
+				for m in maps:
+					self._map_to_sections.setdefault(m, []).append(section)
+		return self._map_to_sections.get(map_name, [])
@@ -0,0 +1,68 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence
+
+
+class MapIndex:
+	"""Case-insensitive prefix and substring search over a list of map names.
+
+	Prefix matches come from a sorted array searched with bisect. Substring
+	matches are found with str.find over all names joined into one string,
+	and mapped back to names through a sorted array of start offsets.
+	"""
+
+	def __init__(self, maps: Sequence[str]) -> None:
+		"""Build the index.
+
+		Args:
+			maps: Map names, duplicates are ignored
+		"""
+		self.maps = list(dict.fromkeys(maps))
+		folded = [m.lower() for m in self.maps]
+		self.sorted_ids = sorted(range(len(folded)), key=folded.__getitem__)
+		self.sorted_keys = [folded[i] for i in self.sorted_ids]
+		# Names never contain newlines, so a match can't span two names
+		self.corpus = '\n'.join(folded)
+		self.offsets = array('l')
+		pos = 0
+		for name in folded:
+			self.offsets.append(pos)
+			pos += len(name) + 1
+
+	def __len__(self) -> int:
+		return len(self.maps)
+
+	def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+		"""Find map names containing a query.
+
+		Args:
+			query: Text to search for, case-insensitive
+			limit: Maximum number of results, None for all
+
+		Returns:
+			list: Names starting with the query in sorted order, followed by
+			the other names containing it in map list order
+		"""
+		q = query.strip().lower()
+		if limit is None:
+			limit = len(self.maps)
+		if not q:
+			return self.maps[:limit]
+
+		lo = bisect_left(self.sorted_keys, q)
+		hi = bisect_right(self.sorted_keys, q + '\uffff', lo)
+		found = self.sorted_ids[lo:min(hi, lo + limit)]
+		if len(found) >= limit:
+			return [self.maps[i] for i in found]
+
+		ids = []
+		pos = self.corpus.find(q)
+		while pos != -1 and len(found) + len(ids) < limit:
+			i = bisect_right(self.offsets, pos) - 1
+			# A match at the start of a name was already found as a prefix
+			if pos != self.offsets[i]:
+				ids.append(i)
+			if i + 1 >= len(self.offsets):
+				break
+			pos = self.corpus.find(q, self.offsets[i + 1])
+		return [self.maps[i] for i in found] + [self.maps[i] for i in ids]
@@ -0,0 +1,200 @@
+from configparser import ConfigParser
+from typing import Any, Callable, List, Optional
+
+
+class OptionValue:
+	"""Value of a BuildGraph option, held independently of any widget.
+
+	Mirrors how the matching uicomponent resolves its value so command lines
+	can be built without tkinter.
+	"""
+
+	def __init__(self, bg_option: Any) -> None:
+		"""Initialize the option value from its BuildGraph default.
+
+		Args:
+			bg_option: BuildGraph option data
+		"""
+		self.option = bg_option
+		self.name = bg_option.name
+		self.value = bg_option.default or ''
+		self.listeners = []
+
+	def add_listener(self, callback: Callable[['OptionValue'], None]) -> None:
+		"""Call back whenever the value changes."""
+		self.listeners.append(callback)
+
+	def changed(self) -> None:
+		"""Notify listeners that the value changed."""
+		for listener in self.listeners:
+			listener(self)
+
+	def dispose(self) -> None:
+		"""Detach from shared data once the option is no longer shown."""
+		self.listeners = []
+
+	def get_value(self, context: str) -> str:
+		"""Get the value of the option when running the given target."""
+		return self.value
+
+	def set_value(self, value: str) -> None:
+		"""Set the value of the option."""
+		self.value = value
+		self.changed()
+
+	def save_config(self, config_parser: ConfigParser) -> None:
+		"""Save option value to configuration."""
+		if not config_parser.has_section(self.option.category):
+			config_parser.add_section(self.option.category)
+		config_parser.set(self.option.category, self.name, self.get_value('self'))
+
+	def load_config(self, config_parser: ConfigParser) -> None:
+		"""Load option value from configuration."""
+		if config_parser.has_option(self.option.category, self.name):
+			self.set_value(config_parser.get(self.option.category, self.name))
+
+
+class CheckboxValue(OptionValue):
+	"""Checkbox option value, stored as 'true' or 'false'."""
+
+	def __init__(self, bg_option: Any) -> None:
+		super().__init__(bg_option)
+		self.value = self.value.lower()
+
+
+class MapSelectValue(OptionValue):
+	"""List of maps chosen from the cooked map list."""
+
+	def __init__(self, bg_option: Any, map_data: Any) -> None:
+		"""Initialize map selection value.
+
+		Args:
+			bg_option: BuildGraph option data
+			map_data: Map configuration data
+		"""
+		super().__init__(bg_option)
+		self.map_data = map_data
+		self.maps = []
+
+	def get_value(self, context):
+		if context == 'Fill DDC' and len(self.maps) == 0:
+			return '+'.join(self.map_data.all_maps)
+		return '+'.join(self.maps)
+
+	def set_value(self, value):
+		self.maps = [m for m in value.split('+') if m != '']
+		self.changed()
+
+	def add_maps(self, maps: List[str]) -> List[str]:
+		"""Add maps to the top of the list, skipping ones already selected.
+
+		Returns:
+			list: The maps that were added
+		"""
+		current = set(self.maps)
+		added = [m for m in dict.fromkeys(maps) if m not in current]
+		self.maps[0:0] = added
+		if added:
+			self.changed()
+		return added
+
+	def remove_indices(self, indices: List[int]) -> None:
+		"""Remove the maps at the given list positions."""
+		for index in sorted(indices, reverse=True):
+			del self.maps[index]
+		if indices:
+			self.changed()
+
+
+class MultiSelectValue(OptionValue):
+	"""Subset of the delimited choices listed in the option default."""
+
+	def __init__(self, bg_option: Any) -> None:
+		super().__init__(bg_option)
+		self.delimiter = ';'
+		if ';' in self.value:
+			self.delimiter = ';'
+		elif ',' in self.value:
+			self.delimiter = ','
+		elif '+' in self.value:
+			self.delimiter = '+'
+		self.all_options = {op: True for op in self.value.split(self.delimiter)}
+
+	def get_value(self, context):
+		return self.delimiter.join(key for key, selected in self.all_options.items() if selected)
+
+	def set_value(self, value):
+		sl = value.split(self.delimiter)
+		for key in self.all_options:
+			self.all_options[key] = key in sl
+		self.changed()
+
+	def select(self, key: str, selected: bool) -> None:
+		"""Select or deselect one choice."""
+		if self.all_options.get(key) != selected:
+			self.all_options[key] = selected
+			self.changed()
+
+
+class MapSectionSelectValue(OptionValue):
+	"""Subset of the map sections defined in the editor config."""
+
+	def __init__(self, bg_option: Any, map_data: Any) -> None:
+		"""Initialize map section selection value.
+
+		Args:
+			bg_option: BuildGraph option data
+			map_data: Map configuration data
+		"""
+		super().__init__(bg_option)
+		self.map_data = map_data
+		self.map_sections = {section: False for section in map_data.map_sections}
+		map_data.add_listener(self.on_map_data_changed)
+
+	def on_map_data_changed(self, map_data):
+		"""Follow the sections of reloaded map data, keeping current selections."""
+		self.map_sections = {section: self.map_sections.get(section, False) for section in map_data.map_sections}
+
+	def dispose(self):
+		super().dispose()
+		self.map_data.remove_listener(self.on_map_data_changed)
+
+	def get_value(self, context):
+		if context == 'Fill DDC':
+			return ''
+		return '+'.join(key for key, selected in self.map_sections.items() if selected)
+
+	def set_value(self, value):
+		sl = value.split('+')
+		for key in self.map_sections:
+			self.map_sections[key] = key in sl
+		self.changed()
+
+	def select(self, key: str, selected: bool) -> None:
+		"""Select or deselect one map section."""
+		if self.map_sections.get(key) != selected:
+			self.map_sections[key] = selected
+			self.changed()
+
+
+def create_option_value(bg_option: Any, map_data: Any) -> Optional[OptionValue]:
+	"""Create the value model for a BuildGraph option.
+
+	Args:
+		bg_option: BuildGraph option data
+		map_data: Map configuration data
+
+	Returns:
+		OptionValue: The model, or None if the option type is not shown in the launcher
+	"""
+	if bg_option.type in ('TextEntry', 'Dropdown', 'DirectoryChooser'):
+		return OptionValue(bg_option)
+	elif bg_option.type == 'Checkbox':
+		return CheckboxValue(bg_option)
+	elif bg_option.type == 'MapSelect':
+		return MapSelectValue(bg_option, map_data)
+	elif bg_option.type == 'MapSectionSelect':
+		return MapSectionSelectValue(bg_option, map_data)
+	elif bg_option.type == 'MultiSelect':
+		return MultiSelectValue(bg_option)
+	return None
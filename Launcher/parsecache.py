@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+class ParseCache:
+	"""Persistent cache of data extracted from BuildGraph scripts.
+
+	Entries are keyed by the absolute script path and validated against the
+	file's modification time and size, or against a content hash when
+	use_hash is set. Only scripts whose fingerprint changed need re-parsing.
+	"""
+
+	VERSION = 3
+
+	def __init__(self, cache_path: str, use_hash: bool = False) -> None:
+		"""Initialize the cache and load any existing entries.
+
+		Args:
+			cache_path: Path of the JSON file backing the cache
+			use_hash: Validate entries by content hash instead of mtime and size
+		"""
+		self.cache_path = cache_path
+		self.use_hash = use_hash
+		self.entries = {}
+		self.hits = 0
+		self.misses = 0
+		self.dirty = False
+		self.load()
+
+	def load(self) -> None:
+		"""Load cache entries from disk, discarding incompatible files."""
+		try:
+			with open(self.cache_path, 'r', encoding='utf-8') as fp:
+				data = json.load(fp)
+			if data.get('version') == self.VERSION:
+				self.entries = data.get('entries', {})
+		except FileNotFoundError:
+			pass
+		except Exception as e:
+			print(f"Error loading parse cache {self.cache_path}: {e}")
+
+	def clear(self) -> None:
+		"""Invalidate every cache entry."""
+		self.entries = {}
+		self.dirty = True
+
+	def fingerprint(self, path: str) -> Dict[str, Any]:
+		"""Compute the fingerprint of a file.
+
+		Args:
+			path: File to fingerprint
+
+		Returns:
+			dict: Fingerprint fields for the file
+		"""
+		st = os.stat(path)
+		fp = {'mtime': st.st_mtime_ns, 'size': st.st_size}
+		if self.use_hash:
+			fp['hash'] = file_hash(path)
+		return fp
+
+	def _matches(self, entry: Dict[str, Any], fp: Dict[str, Any]) -> bool:
+		if self.use_hash:
+			return entry.get('hash') == fp['hash']
+		return entry.get('mtime') == fp['mtime'] and entry.get('size') == fp['size']
+
+	def get(self, path: str) -> Optional[Any]:
+		"""Return cached data for a file if its fingerprint is unchanged.
+
+		Args:
+			path: Script file path
+
+		Returns:
+			The cached data, or None on a miss
+		"""
+		key = os.path.abspath(path)
+		entry = self.entries.get(key)
+		try:
+			fp = self.fingerprint(path)
+		except OSError:
+			fp = None
+		if entry is not None and fp is not None and self._matches(entry, fp):
+			self.hits += 1
+			if self.use_hash and (entry.get('mtime') != fp['mtime'] or entry.get('size') != fp['size']):
+				entry.update(fp)
+				self.dirty = True
+			return entry['data']
+		self.misses += 1
+		return None
+
+	def put(self, path: str, data: Any) -> None:
+		"""Store extracted data for a file.
+
+		Args:
+			path: Script file path
+			data: JSON serializable data extracted from the file
+		"""
+		try:
+			entry = self.fingerprint(path)
+		except OSError:
+			return
+		entry['data'] = data
+		self.entries[os.path.abspath(path)] = entry
+		self.dirty = True
+
+	def save(self) -> None:
+		"""Write the cache to disk if it changed, dropping entries for deleted files."""
+		for key in [k for k in self.entries if not os.path.exists(k)]:
+			del self.entries[key]
+			self.dirty = True
+		if not self.dirty:
+			return
+		try:
+			os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+			tmp_path = self.cache_path + '.tmp'
+			with open(tmp_path, 'w', encoding='utf-8') as fp:
+				json.dump({'version': self.VERSION, 'entries': self.entries}, fp)
+			os.replace(tmp_path, self.cache_path)
+			self.dirty = False
+		except Exception as e:
+			print(f"Error saving parse cache {self.cache_path}: {e}")
+
+	def stats(self) -> str:
+		"""Return a one line summary of cache hits and misses."""
+		return f"BuildGraph cache: {self.hits} hits, {self.misses} misses"
+
+
+def file_hash(path: str) -> str:
+	"""Return the SHA-1 hex digest of a file's contents."""
+	h = hashlib.sha1()
+	with open(path, 'rb') as fp:
+		for chunk in iter(lambda: fp.read(1 << 20), b''):
+			h.update(chunk)
+	return h.hexdigest()
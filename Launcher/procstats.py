@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+PROC_DIR = '/proc'
+
+
+def proc_available() -> bool:
+	"""True if process statistics can be read from /proc."""
+	return os.path.exists(os.path.join(PROC_DIR, 'self', 'stat'))
+
+
+def format_bytes(count: float) -> str:
+	"""Format a byte count with a binary unit, e.g. '1.5 GB'."""
+	for unit in ('B', 'KB', 'MB', 'GB'):
+		if count < 1024:
+			return f'{count:.0f} {unit}' if unit == 'B' else f'{count:.1f} {unit}'
+		count /= 1024
+	return f'{count:.1f} TB'
+
+
+class JobStats:
+	"""Resource usage of one process tree as compact time series.
+
+	Series live in typed arrays. When max_samples is reached every other
+	sample is dropped and the recording stride doubles, so a job of any
+	length keeps at most max_samples samples spread over its whole run.
+	"""
+
+	def __init__(self, pid: int, max_samples: int = 1024) -> None:
+		"""Initialize empty series for a process tree.
+
+		Args:
+			pid: Root process of the tree
+			max_samples: Maximum number of samples kept per series
+		"""
+		self.pid = pid
+		self.max_samples = max_samples
+		self.stride = 1
+		self.skipped = 0
+		self.times = array('d')
+		self.cpu = array('d')
+		self.rss = array('q')
+		self.read_bytes = array('q')
+		self.write_bytes = array('q')
+		self.started = time.monotonic()
+		self.last_sampled = self.started
+		# Totals of processes in the tree that have exited
+		self.exited_cpu = 0.0
+		self.exited_read = 0
+		self.exited_write = 0
+		# Last reading of each live process: pid -> (cpu seconds, read bytes, write bytes)
+		self.live = {}
+		self.cpu_seconds = 0.0
+		self.cpu_percent = 0.0
+		self.rss_bytes = 0
+		self.peak_rss = 0
+		self.total_read = 0
+		self.total_write = 0
+		self.processes = 0
+
+	def update(self, now: float, readings: Dict[int, Tuple[float, int, int, int]]) -> None:
+		"""Record a sample of the tree.
+
+		Args:
+			now: Monotonic time of the sample
+			readings: Live processes of the tree: pid -> (cpu seconds, rss bytes, read bytes, write bytes)
+		"""
+		for pid in self.live.keys() - readings.keys():
+			cpu, read, write = self.live.pop(pid)
+			self.exited_cpu += cpu
+			self.exited_read += read
+			self.exited_write += write
+		for pid, (cpu, rss, read, write) in readings.items():
+			self.live[pid] = (cpu, read, write)
+
+		cpu = max(self.exited_cpu + sum(v[0] for v in self.live.values()), self.cpu_seconds)
+		if now > self.last_sampled:
+			self.cpu_percent = 100.0 * (cpu - self.cpu_seconds) / (now - self.last_sampled)
+		self.last_sampled = now
+		self.cpu_seconds = cpu
+		self.rss_bytes = sum(r[1] for r in readings.values())
+		self.peak_rss = max(self.peak_rss, self.rss_bytes)
+		self.total_read = self.exited_read + sum(v[1] for v in self.live.values())
+		self.total_write = self.exited_write + sum(v[2] for v in self.live.values())
+		self.processes = len(readings)
+		self.append(now)
+
+	def append(self, now: float) -> None:
+		self.skipped += 1
+		if self.skipped < self.stride:
+			return
+		self.skipped = 0
+		if len(self.times) >= self.max_samples:
+			for series in (self.times, self.cpu, self.rss, self.read_bytes, self.write_bytes):
+				series[:] = series[::2]
+			self.stride *= 2
+		self.times.append(now - self.started)
+		self.cpu.append(self.cpu_seconds)
+		self.rss.append(self.rss_bytes)
+		self.read_bytes.append(self.total_read)
+		self.write_bytes.append(self.total_write)
+
+	def totals(self) -> str:
+		"""Short live totals for display beside a running job."""
+		return (f'{self.cpu_seconds:.0f}s CPU ({self.cpu_percent:.0f}%), {format_bytes(self.rss_bytes)}, '
+				f'R {format_bytes(self.total_read)} / W {format_bytes(self.total_write)}')
+
+	def summary(self) -> str:
+		"""One line summary of the whole run."""
+		wall = self.times[-1] if self.times else 0.0
+		average = 100.0 * self.cpu_seconds / wall if wall > 0 else 0.0
+		return (f'Resource usage: {self.cpu_seconds:.1f}s CPU over {wall:.0f}s (average {average:.0f}%), '
+				f'peak memory {format_bytes(self.peak_rss)}, read {format_bytes(self.total_read)}, '
+				f'written {format_bytes(self.total_write)}')
+
+
+class ProcessSampler:
+	"""Samples the process trees of running jobs from /proc on a background thread.
+
+	One pass over /proc per interval serves every tracked tree, so the cost
+	depends on the number of processes on the machine, not on the number of
+	jobs. Does nothing where /proc is not available.
+	"""
+
+	def __init__(self, interval: float = 1.0, max_samples: int = 1024) -> None:
+		"""Initialize the sampler. The thread starts with the first tracked tree.
+
+		Args:
+			interval: Seconds between samples
+			max_samples: Maximum number of samples kept per job
+		"""
+		self.interval = interval
+		self.max_samples = max_samples
+		self.enabled = proc_available()
+		self.tracked = {}
+		self.lock = threading.Lock()
+		self.sampling = threading.Lock()
+		self.thread = None
+		if self.enabled:
+			self.ticks = os.sysconf('SC_CLK_TCK')
+			self.page_size = os.sysconf('SC_PAGE_SIZE')
+
+	def track(self, pid: int) -> Optional[JobStats]:
+		"""Start sampling a process tree.
+
+		Args:
+			pid: Root process of the tree
+
+		Returns:
+			JobStats: Series updated at each sample, or None if sampling is not available
+		"""
+		if not self.enabled:
+			return None
+		stats = JobStats(pid, self.max_samples)
+		with self.lock:
+			self.tracked[pid] = stats
+			if self.thread is None:
+				self.thread = threading.Thread(target=self.run, name='ProcessSampler', daemon=True)
+				self.thread.start()
+		return stats
+
+	def untrack(self, stats: JobStats) -> None:
+		"""Stop sampling a process tree.
+
+		No final sample is taken: once the root process has exited and been
+		reaped the tree can no longer be found, so the last periodic sample stands.
+		"""
+		with self.lock:
+			self.tracked.pop(stats.pid, None)
+
+	def run(self) -> None:
+		while True:
+			time.sleep(self.interval)
+			with self.lock:
+				stats = list(self.tracked.values())
+			if stats:
+				try:
+					self.sample(stats)
+				except Exception as e:
+					print(f"Error sampling processes: {e}")
+
+	def sample(self, stats: List[JobStats]) -> None:
+		"""Read /proc once and update the given trees."""
+		with self.sampling:
+			self.sample_trees(stats)
+
+	def sample_trees(self, stats: List[JobStats]) -> None:
+		now = time.monotonic()
+		children = {}
+		info = {}
+		for entry in os.listdir(PROC_DIR):
+			if not entry.isdigit():
+				continue
+			pid = int(entry)
+			fields = self.read_stat(pid)
+			if fields is None:
+				continue
+			ppid, cpu, rss = fields
+			children.setdefault(ppid, []).append(pid)
+			info[pid] = (cpu, rss)
+
+		for tree in stats:
+			readings = {}
+			stack = [tree.pid] if tree.pid in info else []
+			while stack:
+				pid = stack.pop()
+				cpu, rss = info[pid]
+				read, write = self.read_io(pid)
+				readings[pid] = (cpu, rss, read, write)
+				stack.extend(children.get(pid, ()))
+			tree.update(now, readings)
+
+	def read_stat(self, pid: int) -> Optional[Tuple[int, float, int]]:
+		"""Return (parent pid, cpu seconds, rss bytes) of a process, or None if it is gone."""
+		try:
+			with open(f'{PROC_DIR}/{pid}/stat', 'rb') as fp:
+				data = fp.read()
+		except OSError:
+			return None
+		# The command name may contain spaces, so split after its closing parenthesis
+		fields = data[data.rfind(b')') + 2:].split()
+		ppid = int(fields[1])
+		cpu = (int(fields[11]) + int(fields[12])) / self.ticks
+		rss = int(fields[21]) * self.page_size
+		return ppid, cpu, rss
+
+	@staticmethod
+	def read_io(pid: int) -> Tuple[int, int]:
+		"""Return the bytes a process read from and wrote to storage, zero if not readable."""
+		read = write = 0
+		try:
+			with open(f'{PROC_DIR}/{pid}/io', 'rb') as fp:
+				for line in fp:
+					if line.startswith(b'read_bytes:'):
+						read = int(line[11:])
+					elif line.startswith(b'write_bytes:'):
+						write = int(line[12:])
+		except OSError:
+			pass
+		return read, write
@@ -0,0 +1,155 @@
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Setting this to a trace path, or to 1 for the default path, profiles a run without --profile
+ENV_VAR = 'BGLAUNCHER_PROFILE'
+DEFAULT_TRACE = 'launcher_trace.json'
+
+# Returned by span() while profiling is off, so disabled spans allocate nothing
+_DISABLED = contextlib.nullcontext()
+
+
+class _Span:
+	"""Times a block and records it as a complete trace event."""
+
+	__slots__ = ('profiler', 'name', 'category', 'args', 'start', 'child_time')
+
+	def __init__(self, profiler: 'Profiler', name: str, category: str, args: Dict[str, Any]) -> None:
+		self.profiler = profiler
+		self.name = name
+		self.category = category
+		self.args = args
+		self.child_time = 0
+
+	def __enter__(self) -> '_Span':
+		self.profiler.stack().append(self)
+		self.start = time.perf_counter_ns()
+		return self
+
+	def __exit__(self, *exc) -> None:
+		end = time.perf_counter_ns()
+		stack = self.profiler.stack()
+		stack.pop()
+		duration = end - self.start
+		if stack:
+			stack[-1].child_time += duration
+		self.profiler.record(self, duration)
+
+
+class Profiler:
+	"""Collects named spans and exports them as a Chrome trace and a text summary.
+
+	While disabled, span() returns a shared no-op context manager, so
+	instrumentation can stay in the code permanently.
+	"""
+
+	def __init__(self) -> None:
+		self.enabled = False
+		self.path = None
+		self.events = []
+		# Per span name: [count, total ns, self ns, max ns]
+		self.totals = {}
+		self.origin = time.perf_counter_ns()
+		self.pid = os.getpid()
+		self.local = threading.local()
+		self.lock = threading.Lock()
+
+	def enable(self, path: str = DEFAULT_TRACE, write_at_exit: bool = True) -> None:
+		"""Start recording spans.
+
+		Args:
+			path: Chrome trace file to write, the summary is written beside it
+			write_at_exit: Write the trace and summary when the interpreter exits
+		"""
+		if not self.enabled and write_at_exit:
+			atexit.register(self.finish)
+		self.enabled = True
+		self.path = path
+
+	def span(self, name: str, category: str = 'startup', **args: Any):
+		"""Return a context manager timing a block as a span.
+
+		Args:
+			name: Span name, spans with the same name are aggregated in the summary
+			category: Trace event category
+			**args: Extra values shown with the event in the trace viewer
+		"""
+		if not self.enabled:
+			return _DISABLED
+		return _Span(self, name, category, args)
+
+	def instant(self, name: str, category: str = 'startup') -> None:
+		"""Record a point in time, such as the window becoming idle."""
+		if self.enabled:
+			self.events.append({'name': name, 'cat': category, 'ph': 'i', 's': 'p', 'pid': self.pid,
+								'tid': threading.get_ident(), 'ts': (time.perf_counter_ns() - self.origin) / 1000})
+
+	def stack(self) -> List[_Span]:
+		stack = getattr(self.local, 'stack', None)
+		if stack is None:
+			stack = self.local.stack = []
+		return stack
+
+	def record(self, span: _Span, duration: int) -> None:
+		event = {'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': self.pid,
+				 'tid': threading.get_ident(), 'ts': (span.start - self.origin) / 1000, 'dur': duration / 1000}
+		if span.args:
+			event['args'] = {k: str(v) for k, v in span.args.items()}
+		with self.lock:
+			self.events.append(event)
+			total = self.totals.setdefault(span.name, [0, 0, 0, 0])
+			total[0] += 1
+			total[1] += duration
+			total[2] += duration - span.child_time
+			total[3] = max(total[3], duration)
+
+	def trace(self) -> Dict[str, Any]:
+		"""Return the recorded events in Chrome trace-event format."""
+		names = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': t.ident, 'args': {'name': t.name}}
+				 for t in threading.enumerate()]
+		return {'traceEvents': names + self.events, 'displayTimeUnit': 'ms'}
+
+	def summary(self) -> str:
+		"""Return a table of span names by total time."""
+		lines = [f'{"Span":<40} {"Count":>6} {"Total ms":>10} {"Self ms":>10} {"Max ms":>10}']
+		for name, (count, total, own, longest) in sorted(self.totals.items(), key=lambda t: -t[1][1]):
+			lines.append(f'{name[:40]:<40} {count:>6} {total / 1e6:>10.1f} {own / 1e6:>10.1f} {longest / 1e6:>10.1f}')
+		return '\n'.join(lines)
+
+	def write(self, path: Optional[str] = None) -> None:
+		"""Write the Chrome trace and, beside it, the text summary.
+
+		Args:
+			path: Trace file, defaults to the path given to enable
+		"""
+		path = path or self.path
+		with open(path, 'w') as fp:
+			json.dump(self.trace(), fp)
+		with open(os.path.splitext(path)[0] + '.txt', 'w') as fp:
+			fp.write(self.summary() + '\n')
+
+	def finish(self) -> None:
+		"""Print the summary and write the profile files."""
+		if not self.enabled:
+			return
+		print(self.summary())
+		try:
+			self.write()
+			print(f'Profile written to {os.path.abspath(self.path)}')
+		except Exception as e:
+			print(f"Error writing profile: {e}")
+
+
+profiler = Profiler()
+span = profiler.span
+instant = profiler.instant
+
+# Taken out of the environment so parse workers and jobs started from here do not overwrite the launcher's trace
+_env_profile = os.environ.pop(ENV_VAR, None)
+if _env_profile:
+	profiler.enable(DEFAULT_TRACE if _env_profile == '1' else _env_profile)
@@ -0,0 +1,207 @@
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import buildgraphapi
+import mapconfigdata
+import profiler
+from confighierarchy import ConfigHierarchy, config_platform
+from mapconfigdata import MapIniData
+from parsecache import ParseCache
+
+# Option whose value selects the platform used to resolve the config hierarchy
+PLATFORM_OPTION = 'Platform'
+# Files whose changes are picked up while the launcher runs
+WATCHED_EXTENSIONS = ('.xml', '.ini')
+
+
+def is_watched(path: str) -> bool:
+	"""True if changes to the file should reload the project."""
+	return path.lower().endswith(WATCHED_EXTENSIONS)
+
+
+def diff_items(old: Dict[str, Any], new: Sequence[Any]) -> Tuple[List[Any], List[str], List[Any]]:
+	"""Compare BuildGraph options or actions by name and contents.
+
+	Args:
+		old: Previous items by name
+		new: Current items
+
+	Returns:
+		tuple: Added items, names of removed items and changed items
+	"""
+	names = {item.name for item in new}
+	added = [item for item in new if item.name not in old]
+	removed = [name for name in old if name not in names]
+	changed = [item for item in new if item.name in old and old[item.name].to_record() != item.to_record()]
+	return added, removed, changed
+
+
+class ProjectChanges(NamedTuple):
+	"""Differences between the project before and after a reload."""
+	added_options: List[Any]
+	removed_options: List[str]
+	changed_options: List[Any]
+	added_actions: List[Any]
+	removed_actions: List[str]
+	changed_actions: List[Any]
+	maps_changed: bool
+
+
+class LauncherProject:
+	"""Project paths plus the BuildGraph and map data the launcher is built from.
+
+	Shared by the Tk launcher and headless mode, so it must never import tkinter.
+	"""
+
+	def __init__(self, in_script_dir: str, in_project_dir: str, use_cache: bool = True,
+				 clear_cache: bool = False, cache_hash: bool = False, parse_jobs: int = 1,
+				 parse_processes: Optional[bool] = None) -> None:
+		"""Resolve project paths and load BuildGraph and map data.
+
+		Args:
+			in_script_dir: Directory containing BuildGraph scripts
+			in_project_dir: Base project directory
+			use_cache: Reuse data extracted from unchanged scripts on previous runs
+			clear_cache: Invalidate the parse cache before loading scripts
+			cache_hash: Validate cached scripts by content hash
+			parse_jobs: Number of BuildGraph scripts to parse concurrently
+			parse_processes: Parse in a process pool rather than a thread pool, None to decide by script size
+		"""
+		self.script_dir = in_script_dir
+		self.project_dir = in_project_dir
+		self.game_dir = os.path.join(self.project_dir, 'unreal', 'Game')
+		self.engine_dir = os.path.join(self.project_dir, 'unreal')
+		self.graph_script = os.path.join(self.script_dir, 'CPG_Builds.xml')
+		self.config_ini = os.path.join(self.game_dir, 'Saved', 'Launcher.ini')
+		self.fingerprint_file = os.path.join(self.game_dir, 'Saved', 'LauncherFingerprints.json')
+		self.running_dir = os.path.join(self.game_dir, 'Saved', 'LauncherRunning')
+		self.history_file = os.path.join(self.game_dir, 'Saved', 'LauncherHistory.sqlite')
+		# Config directory -> (modification time, .ini files), so fingerprints don't list unchanged directories
+		self.ini_listings = {}
+
+		self.cache = None
+		if use_cache:
+			with profiler.span('ParseCache.load'):
+				self.cache = ParseCache(os.path.join(self.game_dir, 'Saved', 'BuildGraphCache.json'),
+										use_hash=cache_hash)
+			if clear_cache:
+				self.cache.clear()
+
+		with profiler.span('BuildGraph'):
+			self.build_graph = buildgraphapi.BuildGraph(os.path.join(self.script_dir, 'GlobalVariables.xml'),
+														self.graph_script,
+														buildgraphapi.discover_platform_scripts(self.script_dir),
+														cache=self.cache, jobs=parse_jobs,
+														use_processes=parse_processes)
+		if self.cache is not None:
+			print(self.cache.stats())
+
+		with profiler.span('MapIniData'):
+			self.config_hierarchy = ConfigHierarchy(self.engine_dir, self.game_dir, mapconfigdata.CONFIG_KEYS)
+			self.map_data = MapIniData.from_hierarchy(self.config_hierarchy)
+
+	def watch_directories(self) -> List[str]:
+		"""List the directories holding BuildGraph scripts and config layers."""
+		directories = {self.script_dir}
+		directories.update(os.path.dirname(key) for key in self.build_graph.loaded)
+		directories.update(self.config_hierarchy.watch_directories())
+		return sorted(directories)
+
+	def input_files(self) -> List[str]:
+		"""List the BuildGraph scripts and project config files a launch depends on.
+		
+		Local overrides in Saved are left out, since the editor rewrites them
+		without affecting builds. A directory is only listed again once its
+		modification time changes.
+		"""
+		files = list(self.build_graph.loaded)
+		saved_dir = os.path.join(self.game_dir, 'Saved')
+		for directory in self.config_hierarchy.watch_directories():
+			if directory.startswith(saved_dir):
+				continue
+			try:
+				mtime = os.stat(directory).st_mtime_ns
+				listing = self.ini_listings.get(directory)
+				if listing is None or listing[0] != mtime:
+					with os.scandir(directory) as entries:
+						listing = (mtime, [entry.path for entry in entries if entry.name.lower().endswith('.ini')])
+					self.ini_listings[directory] = listing
+			except OSError:
+				continue
+			files += listing[1]
+		return files
+
+	def reload(self, paths: Optional[Iterable[str]] = None) -> ProjectChanges:
+		"""Reload what depends on changed files and report what changed.
+		
+		Changed BuildGraph scripts are parsed again while unchanged ones are
+		reused, and map data is merged again if one of the config layers it
+		reads changed, which only scans the layers that changed. Map data
+		listeners are notified.
+		
+		Args:
+			paths: Changed files, None to reload everything
+			
+		Returns:
+			ProjectChanges: Options and actions that were added, removed or changed
+		"""
+		scripts = configs = paths is None
+		if paths is not None:
+			paths = list(paths)
+			scripts = [path for path in paths if path.lower().endswith('.xml')]
+			# The editor keeps rewriting other ini files in Saved, which must not rebuild the map widgets
+			configs = any(self.config_hierarchy.is_layer(path, self.map_data.platform) for path in paths)
+
+		bg = self.build_graph
+		old_options = {option.name: option for option in bg.options}
+		old_actions = {action.name: action for action in bg.actions}
+		if scripts:
+			with profiler.span('BuildGraph.reload', 'reload'):
+				bg.reload(None if paths is None else scripts,
+						  buildgraphapi.discover_platform_scripts(self.script_dir))
+		if configs:
+			with profiler.span('MapIniData.reload', 'reload'):
+				self.map_data.set_platform(self.map_data.platform, force=True)
+		return ProjectChanges(*diff_items(old_options, bg.options), *diff_items(old_actions, bg.actions),
+							  bool(configs))
+
+	def bind_platform_option(self, options: Iterable) -> None:
+		"""Resolve map data for the platform chosen in the Platform option, now and whenever it changes.
+
+		Args:
+			options: Option value models, see optionmodel
+		"""
+		for opt in options:
+			if opt.name == PLATFORM_OPTION:
+				opt.add_listener(lambda o: self.map_data.set_platform(config_platform(o.get_value('self'))))
+				self.map_data.set_platform(config_platform(opt.get_value('self')))
+
+	def command_prefix(self, target: str) -> List[str]:
+		"""Return the RunUAT executable and the arguments that don't come from options."""
+		return [f'{self.engine_dir}/Engine/Build/BatchFiles/RunUAT.bat',
+				'BuildGraph',
+				f'-set:CheckoutPath={self.project_dir}',
+				f'-set:ProjectDir={self.game_dir}',
+				f'-script={self.graph_script}',
+				f'-target={target}']
+
+	def build_command(self, target: str, options: Iterable, debug: bool = False) -> List[str]:
+		"""Build the RunUAT command line for a target.
+
+		Args:
+			target: Name of the build target to execute
+			options: Option components or models providing name and get_value(context)
+			debug: Only list the graph instead of running it
+
+		Returns:
+			list: RunUAT executable followed by its arguments
+		"""
+		proc = self.command_prefix(target)
+		for opt in options:
+			val = opt.get_value(target)
+			if len(val) > 0:
+				proc.append(f'-set:{opt.name}={val}')
+
+		if debug:
+			proc.append('-listonly')
+		return proc
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import statistics
+import subprocess
+import threading
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from supervisor import SUCCEEDED
+
+# Number of recent successful runs of a target the ETA is predicted from
+ETA_SAMPLES = 10
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+	id INTEGER PRIMARY KEY,
+	target TEXT NOT NULL,
+	fingerprint TEXT,
+	started REAL NOT NULL,
+	ended REAL NOT NULL,
+	state TEXT NOT NULL,
+	exit_code INTEGER,
+	cpu_seconds REAL,
+	peak_rss INTEGER,
+	read_bytes INTEGER,
+	write_bytes INTEGER,
+	command TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_target_started ON runs (target, started DESC);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started DESC);
+'''
+
+
+class Run(NamedTuple):
+	"""One finished launch as stored in the history."""
+	id: int
+	target: str
+	fingerprint: Optional[str]
+	started: float
+	ended: float
+	state: str
+	exit_code: Optional[int]
+	cpu_seconds: Optional[float]
+	peak_rss: Optional[int]
+	read_bytes: Optional[int]
+	write_bytes: Optional[int]
+	command: Optional[str]
+
+	@property
+	def duration(self) -> float:
+		return self.ended - self.started
+
+
+def format_duration(seconds: float) -> str:
+	"""Format seconds as minutes and seconds, e.g. '12:05'."""
+	seconds = int(seconds)
+	return f'{seconds // 60}:{seconds % 60:02d}'
+
+
+def progress(elapsed: float, estimate: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+	"""Return the fraction done and the seconds left of a running job.
+
+	Args:
+		elapsed: Seconds the job has been running
+		estimate: Predicted duration in seconds, None if unknown
+
+	Returns:
+		tuple: Fraction done capped below 1, and seconds left, negative once the estimate is exceeded
+	"""
+	if not estimate:
+		return None, None
+	return min(elapsed / estimate, 0.99), estimate - elapsed
+
+
+class RunHistory:
+	"""Local SQLite store of finished launches.
+
+	Rows are indexed by target and by start time, so recent runs and the
+	duration statistics behind ETAs are read from an index no matter how
+	many runs are stored. Safe to use from several threads.
+	"""
+
+	def __init__(self, path: str) -> None:
+		"""Open or create the history database.
+
+		Args:
+			path: SQLite database file, ':memory:' for a temporary store
+		"""
+		if path != ':memory:':
+			os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		self.path = path
+		self.lock = threading.Lock()
+		self.connection = sqlite3.connect(path, check_same_thread=False, timeout=10)
+		with self.lock, self.connection:
+			self.connection.execute('PRAGMA journal_mode=WAL')
+			self.connection.execute('PRAGMA synchronous=NORMAL')
+			self.connection.executescript(SCHEMA)
+		# Target -> predicted duration, cleared when the target finishes again
+		self.estimates = {}
+
+	def record(self, target: str, started: float, ended: float, state: str, exit_code: Optional[int] = None,
+			   fingerprint: Optional[str] = None, stats: Any = None, argv: Optional[Sequence[str]] = None) -> None:
+		"""Store a finished launch.
+
+		Args:
+			target: Name of the build target
+			started: Start time in seconds since the epoch
+			ended: End time in seconds since the epoch
+			state: Final state, see supervisor
+			exit_code: Exit code of RunUAT, None if it did not run to completion
+			fingerprint: Launch fingerprint, see fingerprint
+			stats: procstats.JobStats of the process tree, if it was sampled
+			argv: Command line, which records the option values used
+		"""
+		row = (target, fingerprint, started, ended, state, exit_code,
+			   None if stats is None else stats.cpu_seconds, None if stats is None else stats.peak_rss,
+			   None if stats is None else stats.total_read, None if stats is None else stats.total_write,
+			   None if argv is None else subprocess.list2cmdline(argv))
+		try:
+			with self.lock, self.connection:
+				self.connection.execute('INSERT INTO runs (target, fingerprint, started, ended, state, exit_code, '
+										'cpu_seconds, peak_rss, read_bytes, write_bytes, command) '
+										'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row)
+				self.estimates.pop(target, None)
+		except sqlite3.Error as e:
+			print(f"Error recording run of {target}: {e}")
+
+	def record_job(self, job: Any) -> None:
+		"""Store a finished supervisor job under its build target. Jobs that never started are skipped."""
+		if job.started_at is None:
+			return
+		self.record(job.target, job.started_at, job.ended_at or job.started_at, job.state, job.returncode,
+					job.fingerprint, job.stats, job.argv)
+
+	def estimate(self, target: str) -> Optional[float]:
+		"""Predict the duration of a target from the median of its recent successful runs, ignoring -listonly runs.
+
+		Returns:
+			float: Seconds, or None if the target never succeeded
+		"""
+		with self.lock:
+			if target in self.estimates:
+				return self.estimates[target]
+			# Debug launches only list the graph, so their durations say nothing about a real run
+			rows = self.connection.execute("SELECT ended - started FROM runs WHERE target = ? AND state = ? "
+										   "AND ' ' || COALESCE(command, '') || ' ' NOT LIKE '% -listonly %' "
+										   "ORDER BY started DESC LIMIT ?",
+										   (target, SUCCEEDED, ETA_SAMPLES)).fetchall()
+			estimate = statistics.median(r[0] for r in rows) if rows else None
+			self.estimates[target] = estimate
+			return estimate
+
+	def recent(self, limit: int = 1000, target: Optional[str] = None) -> List[Run]:
+		"""Return the most recent runs, newest first.
+
+		Args:
+			limit: Maximum number of runs
+			target: Only runs of this target
+		"""
+		query = 'SELECT * FROM runs'
+		params = ()
+		if target:
+			query += ' WHERE target = ?'
+			params = (target,)
+		with self.lock:
+			rows = self.connection.execute(query + ' ORDER BY started DESC LIMIT ?', params + (limit,)).fetchall()
+		return [Run(*row) for row in rows]
+
+	def targets(self) -> List[str]:
+		"""Return every target with recorded runs."""
+		with self.lock:
+			return [row[0] for row in self.connection.execute('SELECT DISTINCT target FROM runs ORDER BY target')]
+
+	def close(self) -> None:
+		with self.lock:
+			self.connection.close()
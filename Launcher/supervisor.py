@@ -0,0 +1,389 @@
+import asyncio
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from logbuffer import LogBuffer
+from procstats import ProcessSampler
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+	"""Raised when a job is submitted while the job queue is full."""
+
+
+class Job:
+	"""A RunUAT process managed by the supervisor."""
+
+	def __init__(self, job_id: int, name: str, argv: Sequence[str], env: Optional[Dict[str, str]] = None,
+				 cwd: Optional[str] = None, log_lines: int = 10000, depends_on: Sequence['Job'] = (),
+				 fingerprint: Optional[str] = None, target: Optional[str] = None) -> None:
+		"""Initialize a queued job.
+
+		Args:
+			job_id: Unique job id
+			name: Display name, usually the build target
+			argv: Executable followed by its arguments
+			env: Environment for the process, None to inherit the launcher's
+			cwd: Working directory for the process
+			log_lines: Number of output lines kept in the job's log
+			depends_on: Jobs that must succeed before this one starts
+			fingerprint: Identifies the inputs of the launch, see fingerprint
+			target: Build target the job runs, which the run history is kept by, defaults to the name
+		"""
+		self.id = job_id
+		self.name = name
+		self.target = target or name
+		self.argv = list(argv)
+		self.env = env
+		self.cwd = cwd
+		self.state = QUEUED
+		self.returncode = None
+		self.error = None
+		self.pid = None
+		self.queued_at = time.time()
+		self.started_at = None
+		self.ended_at = None
+		self.cancel_requested = False
+		self.depends_on = list(depends_on)
+		self.fingerprint = fingerprint
+		# Name of the worker agent running the job, None when it runs locally
+		self.worker = None
+		self.process = None
+		self.task = None
+		self.done = None
+		self.log = LogBuffer(log_lines)
+		self.stats = None
+
+	@property
+	def finished(self) -> bool:
+		"""True once the job succeeded, failed or was cancelled."""
+		return self.state in FINISHED_STATES
+
+	@property
+	def duration(self) -> Optional[float]:
+		"""Seconds the process has been running, or ran for."""
+		if self.started_at is None:
+			return None
+		return (self.ended_at or time.time()) - self.started_at
+
+
+class JobProtocol(asyncio.SubprocessProtocol):
+	"""Copies a job's output into its log buffer as the loop reads it."""
+
+	def __init__(self, job: Job, loop: asyncio.AbstractEventLoop) -> None:
+		self.job = job
+		self.transport = None
+		self.exited = loop.create_future()
+		self.closed = loop.create_future()
+
+	def connection_made(self, transport: asyncio.SubprocessTransport) -> None:
+		self.transport = transport
+
+	def pipe_data_received(self, fd: int, data: bytes) -> None:
+		self.job.log.write(data)
+
+	def process_exited(self) -> None:
+		self.exited.set_result(self.transport.get_returncode())
+
+	def connection_lost(self, exc: Optional[Exception]) -> None:
+		if not self.closed.done():
+			self.closed.set_result(None)
+
+
+class ProcessSupervisor:
+	"""Runs jobs on an asyncio loop in a background thread.
+
+	At most max_jobs processes run at once and at most max_queued jobs may
+	wait for a slot. Processes are executed directly, without a shell, in
+	their own process group so cancellation reaches the whole process tree.
+	With a dispatcher, jobs run on worker agents instead, and only run
+	locally while no worker is reachable.
+	Listeners are called on the supervisor thread whenever a job changes state.
+	Finished jobs are forgotten, so their logs are kept only as long as a
+	listener holds on to them.
+	"""
+
+	def __init__(self, max_jobs: int = 2, max_queued: int = 16, kill_timeout: float = 5.0,
+				 log_lines: int = 10000, sampler: Optional[ProcessSampler] = None, dispatcher: Any = None) -> None:
+		"""Start the supervisor thread.
+
+		Args:
+			max_jobs: Maximum number of processes running at once
+			max_queued: Maximum number of jobs waiting for a slot
+			kill_timeout: Seconds to wait after a graceful stop before killing the process tree
+			log_lines: Number of output lines kept per job
+			sampler: Records the resource usage of each job's process tree
+			dispatcher: dispatch.Dispatcher sending jobs to worker agents
+		"""
+		self.max_jobs = max_jobs
+		self.max_queued = max_queued
+		self.kill_timeout = kill_timeout
+		self.log_lines = log_lines
+		self.sampler = sampler
+		self.dispatcher = dispatcher
+		# Seconds to keep reading output once the process exited, in case a child still holds the pipe
+		self.drain_timeout = 2.0
+		# Jobs that have not finished, by id
+		self.jobs = {}
+		self.listeners = []
+		self.output_listeners = []
+		self.lock = threading.Lock()
+		self.idle = threading.Condition(self.lock)
+		self.ids = itertools.count(1)
+		self.loop = asyncio.new_event_loop()
+		self.slots = None
+		self.thread = threading.Thread(target=self.run_loop, name='ProcessSupervisor', daemon=True)
+		self.thread.start()
+		asyncio.run_coroutine_threadsafe(self.create_slots(), self.loop).result()
+		if dispatcher is not None:
+			asyncio.run_coroutine_threadsafe(dispatcher.start(), self.loop).result()
+
+	def run_loop(self) -> None:
+		asyncio.set_event_loop(self.loop)
+		self.loop.run_forever()
+
+	async def create_slots(self) -> None:
+		self.slots = asyncio.Semaphore(self.max_jobs)
+
+	def add_listener(self, callback: Callable[[Job], None]) -> None:
+		"""Call back, on the supervisor thread, whenever a job changes state."""
+		self.listeners.append(callback)
+
+	def add_output_listener(self, callback: Callable[[Job, List[str]], None]) -> None:
+		"""Call back, on the supervisor thread, with each batch of lines a job writes."""
+		self.output_listeners.append(callback)
+
+	def notify_output(self, job: Job, lines: List[str]) -> None:
+		for listener in self.output_listeners:
+			try:
+				listener(job, lines)
+			except Exception as e:
+				print(f"Error in job output listener: {e}")
+
+	def notify(self, job: Job) -> None:
+		for listener in self.listeners:
+			try:
+				listener(job)
+			except Exception as e:
+				print(f"Error in job listener: {e}")
+		if job.finished:
+			with self.idle:
+				self.idle.notify_all()
+
+	def submit(self, name: str, argv: Sequence[str], env: Optional[Dict[str, str]] = None,
+			   cwd: Optional[str] = None, depends_on: Sequence[Job] = (), fingerprint: Optional[str] = None,
+			   target: Optional[str] = None) -> Job:
+		"""Queue a process to run when a slot is free. Safe to call from any thread.
+
+		A job with dependencies waits for them without holding a slot, and is
+		cancelled if any of them does not succeed.
+
+		Args:
+			name: Display name, usually the build target
+			argv: Executable followed by its arguments
+			env: Environment for the process, None to inherit the launcher's
+			cwd: Working directory for the process
+			depends_on: Previously submitted jobs that must succeed first
+			fingerprint: Identifies the inputs of the launch, kept on the job
+			target: Build target the job runs if the name is decorated, kept on the job
+
+		Returns:
+			Job: The queued job
+
+		Raises:
+			QueueFull: If max_queued jobs are already waiting
+		"""
+		with self.lock:
+			# Jobs that will get a free slot straight away don't count as queued
+			if len(self.jobs) >= self.max_jobs + self.max_queued:
+				raise QueueFull(f"{self.max_queued} jobs are already queued")
+			job = Job(next(self.ids), name, argv, env, cwd, self.log_lines, depends_on, fingerprint, target)
+			job.log.on_lines = lambda lines: self.notify_output(job, lines)
+			self.jobs[job.id] = job
+		self.loop.call_soon_threadsafe(self.start_job, job)
+		return job
+
+	def submit_plan(self, plan: Sequence[Tuple[str, Sequence[str], Sequence[str]]],
+					fingerprints: Optional[Dict[str, str]] = None, targets: Optional[Dict[str, str]] = None
+					) -> List[Job]:
+		"""Queue a set of jobs that depend on each other, or none of them if the queue can't hold them all.
+
+		Args:
+			plan: (name, argv, names of prerequisite jobs) with prerequisites listed first
+			fingerprints: Fingerprint of each job by name
+			targets: Build target of each job by name, for jobs whose name is not the target
+
+		Returns:
+			list: The queued jobs in plan order
+
+		Raises:
+			QueueFull: If there is no room for every job
+		"""
+		with self.lock:
+			active = len(self.jobs)
+		if active + len(plan) > self.max_jobs + self.max_queued:
+			raise QueueFull(f"No room for {len(plan)} more jobs")
+		jobs = {}
+		for name, argv, prerequisites in plan:
+			jobs[name] = self.submit(name, argv, depends_on=[jobs[p] for p in prerequisites],
+									 fingerprint=(fingerprints or {}).get(name), target=(targets or {}).get(name))
+		return list(jobs.values())
+
+	def start_job(self, job: Job) -> None:
+		job.done = self.loop.create_future()
+		self.notify(job)
+		job.task = self.loop.create_task(self.run_job(job))
+
+	async def run_job(self, job: Job) -> None:
+		for dependency in job.depends_on:
+			await asyncio.shield(dependency.done)
+			if dependency.state != SUCCEEDED:
+				job.error = f'{dependency.name} {dependency.state}'
+				job.log.add_lines([f'Not started: prerequisite #{dependency.id} {dependency.name} {dependency.state}'])
+				self.finish(job, CANCELLED)
+				return
+		if self.dispatcher is not None and await self.dispatcher.execute(job, self):
+			return
+		async with self.slots:
+			if not job.cancel_requested:
+				await self.execute(job)
+
+	async def execute(self, job: Job) -> None:
+		"""Run a job's process to completion while holding a slot."""
+		job.state = RUNNING
+		job.started_at = time.time()
+		try:
+			job.process, protocol = await self.loop.subprocess_exec(lambda: JobProtocol(job, self.loop), *job.argv,
+																	  stdin=subprocess.DEVNULL,
+																	  stdout=subprocess.PIPE,
+																	  stderr=subprocess.STDOUT,
+																	  env=job.env, cwd=job.cwd,
+																	  **self.spawn_options())
+		except Exception as e:
+			job.error = str(e)
+			job.log.add_lines([f'Error starting {job.name}: {e}'])
+			print(f"Error starting {job.name}: {e}")
+			self.finish(job, FAILED)
+			return
+		job.pid = job.process.get_pid()
+		if job.cancel_requested:
+			# Cancelled while the process was being spawned, when there was nothing to signal yet
+			self.signal_tree(job, force=False)
+			self.loop.call_later(self.kill_timeout, self.kill_if_running, job)
+		if self.sampler is not None:
+			job.stats = self.sampler.track(job.pid)
+		self.notify(job)
+		job.returncode = await protocol.exited
+		# Children that outlive the process may keep the pipe open
+		await asyncio.wait({protocol.closed}, timeout=self.drain_timeout)
+		job.process.close()
+		job.log.flush()
+		if job.stats is not None:
+			self.sampler.untrack(job.stats)
+			job.log.add_lines([job.stats.summary()])
+		if job.cancel_requested:
+			self.finish(job, CANCELLED)
+		else:
+			self.finish(job, SUCCEEDED if job.returncode == 0 else FAILED)
+
+	@staticmethod
+	def spawn_options() -> Dict:
+		"""Options that start a process in its own process group."""
+		if sys.platform == 'win32':
+			return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+		return {'start_new_session': True}
+
+	def finish(self, job: Job, state: str) -> None:
+		job.state = state
+		job.ended_at = time.time()
+		job.process = None
+		# Don't keep finished prerequisites, and their logs, alive through their dependents
+		job.depends_on = []
+		with self.lock:
+			self.jobs.pop(job.id, None)
+		if job.done is not None and not job.done.done():
+			job.done.set_result(state)
+		self.notify(job)
+
+	def cancel(self, job_id: int) -> None:
+		"""Cancel a queued job or stop a running job's process tree. Safe to call from any thread."""
+		job = self.jobs.get(job_id)
+		if job is not None:
+			self.loop.call_soon_threadsafe(self.cancel_job, job)
+
+	def cancel_all(self) -> None:
+		"""Cancel every job that has not finished. Safe to call from any thread."""
+		for job in self.active_jobs():
+			self.cancel(job.id)
+
+	def cancel_job(self, job: Job) -> None:
+		if job.finished or job.cancel_requested:
+			return
+		job.cancel_requested = True
+		if job.state == QUEUED:
+			if job.task is not None:
+				job.task.cancel()
+			self.finish(job, CANCELLED)
+			return
+		if job.worker is not None:
+			self.dispatcher.cancel(job)
+		elif job.process is not None:
+			self.signal_tree(job, force=False)
+			self.loop.call_later(self.kill_timeout, self.kill_if_running, job)
+
+	def kill_if_running(self, job: Job) -> None:
+		if job.process is not None and job.process.get_returncode() is None:
+			self.signal_tree(job, force=True)
+
+	@staticmethod
+	def signal_tree(job: Job, force: bool) -> None:
+		"""Stop every process in a job's process group.
+
+		Args:
+			job: Running job
+			force: Kill immediately instead of asking the processes to exit
+		"""
+		try:
+			if sys.platform == 'win32':
+				if force:
+					subprocess.call(['taskkill', '/T', '/F', '/PID', str(job.pid)],
+									stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+				else:
+					job.process.send_signal(signal.CTRL_BREAK_EVENT)
+			else:
+				os.killpg(job.pid, signal.SIGKILL if force else signal.SIGTERM)
+		except (OSError, ProcessLookupError) as e:
+			print(f"Error stopping {job.name}: {e}")
+
+	def active_jobs(self) -> List[Job]:
+		"""Return the jobs that are queued or running."""
+		with self.lock:
+			return list(self.jobs.values())
+
+	def wait_idle(self, timeout: Optional[float] = None) -> bool:
+		"""Block until no job is queued or running.
+
+		Returns:
+			bool: False if the timeout expired first
+		"""
+		with self.idle:
+			return self.idle.wait_for(lambda: not self.jobs, timeout)
+
+	def shutdown(self) -> None:
+		"""Stop the supervisor loop. Running processes are left running unless cancelled first."""
+		if self.dispatcher is not None:
+			asyncio.run_coroutine_threadsafe(self.dispatcher.close(), self.loop).result()
+		self.loop.call_soon_threadsafe(self.loop.stop)
+		self.thread.join()
@@ -1,112 +1,227 @@
 import tkinter as tk
 
+# Tooltips with more lines are shown a page at a time, scrolled with the mouse wheel
+MAX_LINES = 30
+# Longer tooltip lines are cut off
+MAX_LINE_LENGTH = 200
+
+
+class TooltipManager:
+	"""Shows the tooltips of every widget in a window using one shared Toplevel.
+
+	The Toplevel and its label are created on first use and then only
+	reconfigured, moved, shown and withdrawn. Tooltip text may be given as a
+	callable, which is evaluated the first time the tooltip is shown and then
+	memoized, so text that is expensive to build costs nothing until needed.
+	Long text is split into pages of max_lines lines.
+	"""
+
+	def __init__(self, root, max_lines=MAX_LINES):
+		"""Initialize the manager.
 
-class Tooltip:
-	"""Tooltip widget for displaying help text on hover."""
-	
-	def __init__(self, widget,
-				 *,
-				 bg='#FFFFEA',
-				 pad=(5, 3, 5, 3),
-				 text='widget info',
-				 waittime=400,
-				 wraplength=250):
-		"""Initialize tooltip.
-		
 		Args:
-			widget: Widget to attach tooltip to
-			bg: Background color
-			pad: Padding tuple (left, top, right, bottom)
-			text: Tooltip text
-			waittime: Delay before showing tooltip (ms)
-			wraplength: Text wrap length
+			root: Tk root window the tooltips belong to
+			max_lines: Number of lines shown per page
 		"""
-
-		self.waittime = waittime
-		self.wraplength = wraplength
-		self.widget = widget
-		self.text = text
-		self.widget.bind("<Enter>", self.onEnter)
-		self.widget.bind("<Leave>", self.onLeave)
-		self.widget.bind("<ButtonPress>", self.onLeave)
-		self.bg = bg
-		self.pad = pad
-		self.id = None
+		self.root = root
+		self.max_lines = max_lines
+		# Widget path -> tooltip settings, with the text replaced by its value once evaluated
+		self.entries = {}
 		self.tw = None
+		self.frame = None
+		self.label = None
+		self.current = None
+		self.page = 0
+		self.id = None
 
-	def onEnter(self, event=None):
-		self.schedule()
+	@staticmethod
+	def of(widget):
+		"""Return the manager of a widget's window, creating it on first use."""
+		root = widget._root()
+		manager = getattr(root, 'tooltip_manager', None)
+		if manager is None:
+			manager = root.tooltip_manager = TooltipManager(root)
+		return manager
 
-	def onLeave(self, event=None):
-		self.unschedule()
-		self.hide()
+	def register(self, widget, text, bg='#FFFFEA', pad=(5, 3, 5, 3), waittime=400, wraplength=250):
+		"""Show a tooltip while the pointer rests on a widget.
 
-	def schedule(self):
+		Args:
+			widget: Widget to attach the tooltip to
+			text: Tooltip text, or a callable returning it when first shown
+			bg: Background color
+			pad: Padding tuple (left, top, right, bottom)
+			waittime: Delay before showing the tooltip (ms)
+			wraplength: Text wrap length
+		"""
+		key = str(widget)
+		if key not in self.entries:
+			widget.bind('<Enter>', lambda event: self.schedule(widget), add='+')
+			widget.bind('<Leave>', lambda event: self.leave(widget), add='+')
+			widget.bind('<ButtonPress>', lambda event: self.leave(widget), add='+')
+			widget.bind('<MouseWheel>', lambda event: self.scroll(widget, -event.delta), add='+')
+			widget.bind('<Button-4>', lambda event: self.scroll(widget, -1), add='+')
+			widget.bind('<Button-5>', lambda event: self.scroll(widget, 1), add='+')
+			widget.bind('<Destroy>', lambda event: self.unregister(widget), add='+')
+		self.entries[key] = {'text': text, 'bg': bg, 'pad': pad, 'waittime': waittime, 'wraplength': wraplength}
+
+	def unregister(self, widget):
+		"""Forget a widget's tooltip, hiding it if shown."""
+		if self.current is widget:
+			self.leave(widget)
+		self.entries.pop(str(widget), None)
+
+	def set_text(self, widget, text):
+		"""Replace the text of a registered tooltip, dropping any memoized value."""
+		entry = self.entries.get(str(widget))
+		if entry is not None:
+			entry['text'] = text
+			if self.current is widget and self.tw is not None and self.tw.winfo_viewable():
+				self.show(widget)
+
+	def text(self, widget):
+		"""Return the tooltip text of a widget, evaluating and memoizing a callable."""
+		entry = self.entries[str(widget)]
+		if callable(entry['text']):
+			entry['text'] = str(entry['text']())
+		return entry['text']
+
+	def schedule(self, widget):
 		self.unschedule()
-		self.id = self.widget.after(self.waittime, self.show)
+		entry = self.entries.get(str(widget))
+		if entry is not None:
+			self.current = widget
+			self.page = 0
+			self.id = widget.after(entry['waittime'], lambda: self.show(widget))
 
 	def unschedule(self):
 		id_ = self.id
 		self.id = None
 		if id_:
-			self.widget.after_cancel(id_)
+			self.root.after_cancel(id_)
 
-	def show(self):
-		def tip_pos_calculator(widget, label, *, tip_delta=(10, 5), pad=(5, 3, 5, 3)):
-			w = widget
-			s_width, s_height = w.winfo_screenwidth(), w.winfo_screenheight()
-			width, height = (pad[0] + label.winfo_reqwidth() + pad[2],
-							 pad[1] + label.winfo_reqheight() + pad[3])
-
-			mouse_x, mouse_y = w.winfo_pointerxy()
-
-			x1, y1 = mouse_x + tip_delta[0], mouse_y + tip_delta[1]
-			x2, y2 = x1 + width, y1 + height
+	def leave(self, widget):
+		self.unschedule()
+		if self.current is widget:
+			self.current = None
+			self.hide()
+
+	def scroll(self, widget, direction):
+		"""Show the next or previous page of a long tooltip."""
+		if self.current is not widget or self.tw is None or not self.tw.winfo_viewable():
+			return
+		pages = self.page_count(self.text(widget))
+		page = min(max(self.page + (1 if direction > 0 else -1), 0), pages - 1)
+		if page != self.page:
+			self.page = page
+			self.show(widget)
+
+	def pageable(self):
+		"""True while a tooltip with more than one page is shown, so the mouse wheel should page it."""
+		return (self.current is not None and self.tw is not None and self.tw.winfo_viewable()
+				and self.page_count(self.text(self.current)) > 1)
+
+	def page_count(self, text):
+		lines = text.count('\n') + 1
+		return max(1, -(-lines // self.max_lines))
+
+	def page_text(self, text):
+		"""Return the current page of a text, with a note of the pages around it."""
+		lines = text.split('\n')
+		if len(lines) <= self.max_lines:
+			return '\n'.join(line[:MAX_LINE_LENGTH] for line in lines)
+		pages = self.page_count(text)
+		start = self.page * self.max_lines
+		shown = [line[:MAX_LINE_LENGTH] for line in lines[start:start + self.max_lines]]
+		shown.append(f'... {start + 1}-{start + len(shown)} of {len(lines)}, scroll for more'
+					 if self.page < pages - 1 else f'... {start + 1}-{start + len(shown)} of {len(lines)}')
+		return '\n'.join(shown)
+
+	def create(self):
+		self.tw = tk.Toplevel(self.root)
+		# Leaves only the label and removes the app window
+		self.tw.wm_overrideredirect(True)
+		self.tw.withdraw()
+		self.frame = tk.Frame(self.tw, borderwidth=0)
+		self.frame.grid()
+		self.label = tk.Label(self.frame, justify=tk.LEFT, relief=tk.SOLID, borderwidth=0)
 
-			x_delta = max(0, x2 - s_width)
-			y_delta = max(0, y2 - s_height)
+	def show(self, widget):
+		self.id = None
+		entry = self.entries.get(str(widget))
+		if entry is None or not widget.winfo_exists():
+			return
+		if self.tw is None or not self.tw.winfo_exists():
+			self.create()
+		pad = entry['pad']
+		self.frame.configure(background=entry['bg'])
+		self.label.configure(text=self.page_text(self.text(widget)), background=entry['bg'],
+							 wraplength=entry['wraplength'])
+		self.label.grid(padx=(pad[0], pad[2]), pady=(pad[1], pad[3]), sticky=tk.NSEW)
+		self.tw.wm_geometry('+%d+%d' % self.position(widget, pad))
+		self.tw.deiconify()
+		self.tw.lift()
+
+	def position(self, widget, pad, tip_delta=(10, 5)):
+		"""Place the tooltip beside the pointer, flipping it to stay on screen."""
+		s_width, s_height = widget.winfo_screenwidth(), widget.winfo_screenheight()
+		width, height = (pad[0] + self.label.winfo_reqwidth() + pad[2],
+						 pad[1] + self.label.winfo_reqheight() + pad[3])
+
+		mouse_x, mouse_y = widget.winfo_pointerxy()
+
+		x1, y1 = mouse_x + tip_delta[0], mouse_y + tip_delta[1]
+		x2, y2 = x1 + width, y1 + height
+
+		if x2 > s_width:
+			x1 = mouse_x - tip_delta[0] - width
+		if y2 > s_height:
+			y1 = mouse_y - tip_delta[1] - height
+		return x1, max(0, y1)
 
-			if (x_delta, y_delta) != (0, 0):
-				if x_delta:
-					x1 = mouse_x - tip_delta[0] - width
-				if y_delta:
-					y1 = mouse_y - tip_delta[1] - height
+	def hide(self):
+		if self.tw is not None and self.tw.winfo_exists():
+			self.tw.withdraw()
 
-			y1 = max(0, y1)
-			return x1, y1
 
-		bg = self.bg
-		pad = self.pad
-		widget = self.widget
+class Tooltip:
+	"""Tooltip for displaying help text on hover.
 
-		# creates a toplevel window
-		self.tw = tk.Toplevel(widget)
+	Kept for compatibility: registers the widget with its window's
+	TooltipManager, which does the work.
+	"""
 
-		# Leaves only the label and removes the app window
-		self.tw.wm_overrideredirect(True)
+	def __init__(self, widget,
+				 *,
+				 bg='#FFFFEA',
+				 pad=(5, 3, 5, 3),
+				 text='widget info',
+				 waittime=400,
+				 wraplength=250):
+		"""Initialize tooltip.
 
-		win = tk.Frame(self.tw,
-					background=bg,
-					borderwidth=0)
-		label = tk.Label(win,
-					  text=self.text,
-					  justify=tk.LEFT,
-					  background=bg,
-					  relief=tk.SOLID,
-					  borderwidth=0,
-					  wraplength=self.wraplength)
+		Args:
+			widget: Widget to attach tooltip to
+			bg: Background color
+			pad: Padding tuple (left, top, right, bottom)
+			text: Tooltip text, or a callable returning it when the tooltip is first shown
+			waittime: Delay before showing tooltip (ms)
+			wraplength: Text wrap length
+		"""
+		self.widget = widget
+		self.manager = TooltipManager.of(widget)
+		self.manager.register(widget, text, bg, pad, waittime, wraplength)
 
-		label.grid(padx=(pad[0], pad[2]),
-				   pady=(pad[1], pad[3]),
-				   sticky=tk.NSEW)
-		win.grid()
+	@property
+	def text(self):
+		return self.manager.text(self.widget)
 
-		x, y = tip_pos_calculator(widget, label)
+	@text.setter
+	def text(self, text):
+		self.manager.set_text(self.widget, text)
 
-		self.tw.wm_geometry("+%d+%d" % (x, y))
+	def show(self):
+		self.manager.show(self.widget)
 
 	def hide(self):
-		tw = self.tw
-		if tw:
-			tw.destroy()
-		self.tw = None
+		self.manager.leave(self.widget)
@@ -1,51 +1,63 @@
 import tkinter as tk
-from configparser import ConfigParser
 from tkinter.filedialog import askdirectory
-from typing import Any, Dict, List
+from typing import Any
 
-import buildgraphapi
 import tooltip
 
 
 class BaseOption:
-	"""Base class for all UI option components."""
+	"""Base class for all UI option components.
 	
-	def __init__(self, window: tk.Widget, bg_option: Any) -> None:
+	Components are views over an optionmodel value: the model holds the
+	value before the widget exists and every widget edit is written back to it.
+	"""
+	
+	def __init__(self, window: tk.Widget, model: Any) -> None:
 		"""Initialize base option.
 		
 		Args:
 			window: Parent window
-			bg_option: BuildGraph option data
+			model: Option value model wrapping the BuildGraph option data
 		"""
-		self.option = bg_option
-		self.name = bg_option.name
-		self.selected = tk.StringVar(window, bg_option.default)
+		self.model = model
+		self.option = model.option
+		self.name = model.name
+		self.selected = None
 		self.ui = tk.Frame(window)
-		tooltip.Tooltip(self.ui, text=bg_option.description)
-		self.elem_init(bg_option)
+		tooltip.Tooltip(self.ui, text=self.option.description)
+		self.elem_init(self.option)
 
 	def elem_init(self, bg_option):
 		"""Initialize the specific UI element. Override in subclasses."""
-		pass
+		self.selected = self.bind_var(tk.StringVar(self.ui, self.model.value), self.on_selected_changed)
+
+	@staticmethod
+	def bind_var(var: tk.Variable, callback) -> tk.Variable:
+		"""Call back whenever a Tk variable is written and return the variable."""
+		var.trace_add('write', lambda *_: callback())
+		return var
+
+	def destroy(self) -> None:
+		"""Destroy the widgets of the component."""
+		self.ui.destroy()
+
+	def on_selected_changed(self) -> None:
+		"""Write the widget value back to the model."""
+		self.model.set_value(self.selected.get())
+
+	def refresh(self) -> None:
+		"""Update the widgets from the model."""
+		if self.selected.get() != self.model.value:
+			self.selected.set(self.model.value)
 
 	def get_value(self, context: str) -> str:
 		"""Get the current value of the option."""
-		return self.selected.get()
+		return self.model.get_value(context)
 
 	def set_value(self, value: str) -> None:
 		"""Set the value of the option."""
-		self.selected.set(value)
-
-	def save_config(self, config_parser: ConfigParser) -> None:
-		"""Save option value to configuration."""
-		if not config_parser.has_section(self.option.category):
-			config_parser.add_section(self.option.category)
-		config_parser.set(self.option.category, self.name, self.get_value('self'))
-
-	def load_config(self, config_parser: ConfigParser) -> None:
-		"""Load option value from configuration."""
-		if config_parser.has_option(self.option.category, self.name):
-			self.set_value(config_parser.get(self.option.category, self.name))
+		self.model.set_value(value)
+		self.refresh()
 
 
 class DropdownOption(BaseOption):
@@ -53,6 +65,7 @@ class DropdownOption(BaseOption):
 	
 	def elem_init(self, bg_option):
 		"""Initialize dropdown UI elements."""
+		super().elem_init(bg_option)
 		lbl = tk.Label(self.ui, text=self.name)
 		elm = tk.OptionMenu(self.ui, self.selected, *bg_option.restrict)
 		lbl.pack(side=tk.LEFT)
@@ -64,6 +77,7 @@ class TextEntryOption(BaseOption):
 	
 	def elem_init(self, bg_option):
 		"""Initialize text entry UI elements."""
+		super().elem_init(bg_option)
 		lbl = tk.Label(self.ui, text=self.name)
 		elm = tk.Entry(self.ui, textvariable=self.selected)
 		lbl.pack(side=tk.LEFT)
@@ -75,7 +89,7 @@ class CheckboxOption(BaseOption):
 	
 	def elem_init(self, bg_option):
 		"""Initialize checkbox UI elements."""
-		self.selected.set(bg_option.default.lower())
+		super().elem_init(bg_option)
 		elm = tk.Checkbutton(self.ui, text=self.name, variable=self.selected, onvalue='true', offvalue='false')
 		elm.pack(side=tk.LEFT)
 
@@ -85,6 +99,7 @@ class DirectoryOption(BaseOption):
 	
 	def elem_init(self, bg_option):
 		"""Initialize directory chooser UI elements."""
+		super().elem_init(bg_option)
 		lbl = tk.Label(self.ui, text=self.name)
 		elm = tk.Entry(self.ui, textvariable=self.selected)
 		btn = tk.Button(self.ui, text='...', command=self.choose_output_dir)
@@ -98,30 +113,36 @@ class DirectoryOption(BaseOption):
 
 
 class MapSelectOption(BaseOption):
-	"""Map selection option component."""
+	"""Map selection option component with a type-to-filter map picker."""
+
+	max_results = 200
 	
-	def __init__(self, window, bg_option, map_data):
+	def __init__(self, window, model):
 		"""Initialize map selection option.
 		
 		Args:
 			window: Parent window
-			bg_option: BuildGraph option data
-			map_data: Map configuration data
+			model: Map selection value model
 		"""
-		self.map_data = map_data
-		self.selected_map = None
+		self.map_data = model.map_data
+		self.search = None
+		self.results = None
 		self.map_list = None
-		super().__init__(window, bg_option)
+		super().__init__(window, model)
 
 	def elem_init(self, bg_option):
-		self.selected_map = tk.StringVar(self.ui, 'Seventh_Sanctum_P')
 		frame = tk.Frame(self.ui)
 		frame.pack(fill=tk.BOTH)
 
 		lbl = tk.Label(frame, text=self.name)
 		lbl.grid(row=0, column=0, columnspan=4)
-		opt = tk.OptionMenu(frame, self.selected_map, *self.map_data.all_maps)
-		opt.grid(row=1, column=1, sticky='n')
+		self.search = self.bind_var(tk.StringVar(self.ui, ''), self.update_results)
+		entry = tk.Entry(frame, textvariable=self.search)
+		entry.grid(row=1, column=1, sticky='we')
+		entry.bind('<Return>', lambda event: self.add_map())
+		self.results = tk.Listbox(frame, selectmode='extended', exportselection=False)
+		self.results.grid(row=2, column=1, sticky='nswe')
+		self.results.bind('<Double-Button-1>', lambda event: self.add_map())
 		btn = tk.Button(frame, text=">>>", command=self.add_map)
 		btn.grid(row=1, column=2, sticky='s')
 		btn = tk.Button(frame, text="<<<", command=self.remove_map)
@@ -129,149 +150,184 @@ class MapSelectOption(BaseOption):
 
 		self.map_list = tk.Listbox(frame, selectmode='multiple')
 		self.map_list.grid(row=1, column=3, rowspan=2, sticky='nswe')
+		self.refresh()
+		self.map_data.add_listener(self.on_map_data_changed)
+
+	def on_map_data_changed(self, map_data):
+		self.update_results()
+
+	def destroy(self):
+		self.map_data.remove_listener(self.on_map_data_changed)
+		super().destroy()
+
+	def update_results(self):
+		"""Show the maps matching the search text."""
+		matches = self.map_data.map_index.search(self.search.get(), self.max_results)
+		self.results.delete(0, tk.END)
+		self.results.insert(tk.END, *matches)
+
+	def refresh(self):
+		self.update_results()
+		self.map_list.delete(0, tk.END)
+		self.map_list.insert(tk.END, *self.model.maps)
 
 	def add_map(self):
-		"""Add selected map to the list."""
-		self.map_list.insert(0, self.selected_map.get())
+		"""Add the selected search results, or the only result, to the list."""
+		selected = [self.results.get(i) for i in self.results.curselection()]
+		if not selected and self.results.size() == 1:
+			selected = [self.results.get(0)]
+		added = self.model.add_maps(selected)
+		for m in reversed(added):
+			self.map_list.insert(0, m)
 
 	def remove_map(self):
 		"""Remove selected maps from the list."""
 		selected = self.map_list.curselection()
-		for index in selected:
+		self.model.remove_indices(list(selected))
+		for index in reversed(selected):
 			self.map_list.delete(index)
 
-	def get_value(self, context):
-		selected_maps = []
-		if context == 'Fill DDC' and self.map_list.size() == 0:
-			for m in self.map_data.all_maps:
-				selected_maps.append(m)
-		else:
-			for m in self.map_list.get(0, self.map_list.size()):
-				selected_maps.append(m)
-		return '+'.join(selected_maps)
-
-	def set_value(self, value):
-		ml = value.split('+')
-		for m in ml:
-			if m != '':
-				self.map_list.insert(self.map_list.size() + 1, m)
-
 
 class MultiSelectOption(BaseOption):
 	"""Multi-select option component."""
 	
-	def __init__(self, window, bg_option):
+	def __init__(self, window, model):
 		"""Initialize multi-select option."""
 		self.all_options = {}
-		self.delimiter = ';'
-		super().__init__(window, bg_option)
+		super().__init__(window, model)
 
 	def elem_init(self, bg_option):
-		if ';' in bg_option.default:
-			self.delimiter = ';'
-		elif ',' in bg_option.default:
-			self.delimiter = ','
-		elif '+' in bg_option.default:
-			self.delimiter = '+'
-		options = bg_option.default.split(self.delimiter)
-
 		cur_row = 0
 		cur_col = 0
 		lbl = tk.Label(self.ui, text=self.name)
 		lbl.grid(row=cur_row, column=cur_col, sticky='w')
 		cur_col += 1
-		for op in options:
-			self.all_options[op] = tk.StringVar(self.ui, 'true')
+		for op in self.model.all_options:
+			var = tk.StringVar(self.ui, 'true' if self.model.all_options[op] else 'false')
+			self.all_options[op] = self.bind_var(var, lambda op=op: self.on_option_changed(op))
 			elm = tk.Checkbutton(self.ui, text=op, variable=self.all_options[op], onvalue='true', offvalue='false')
 			elm.grid(row=cur_row, column=cur_col, sticky='w')
 			cur_row += 1
 
-	def get_value(self, context):
-		selected_options = []
-		for key in self.all_options:
-			if self.all_options[key].get() == 'true':
-				selected_options.append(key)
-		return self.delimiter.join(selected_options)
+	def on_option_changed(self, op):
+		self.model.select(op, self.all_options[op].get() == 'true')
 
-	def set_value(self, value):
-		sl = value.split(self.delimiter)
+	def refresh(self):
 		for key in self.all_options:
-			if key in sl:
-				self.all_options[key].set('true')
-			else:
-				self.all_options[key].set('false')
+			self.all_options[key].set('true' if self.model.all_options[key] else 'false')
 
 
 class MapSectionSelectOption(BaseOption):
 	"""Map section selection option component."""
 	
-	def __init__(self, window, bg_option, map_data):
+	def __init__(self, window, model):
 		"""Initialize map section selection option.
 		
 		Args:
 			window: Parent window
-			bg_option: BuildGraph option data
-			map_data: Map configuration data
+			model: Map section selection value model
 		"""
-		self.map_data = map_data
+		self.map_data = model.map_data
 		self.map_sections = {}
-		super().__init__(window, bg_option)
+		self.map_frame = None
+		super().__init__(window, model)
 
 	def elem_init(self, bg_option):
+		lbl = tk.Label(self.ui, text=self.name)
+		lbl.pack()
+		self.map_frame = tk.Frame(self.ui)
+		self.map_frame.pack()
+		self.build_sections()
+		self.map_data.add_listener(self.on_map_data_changed)
+
+	def on_map_data_changed(self, map_data):
+		self.build_sections()
+
+	def destroy(self):
+		self.map_data.remove_listener(self.on_map_data_changed)
+		super().destroy()
+
+	def build_sections(self):
+		"""Create one checkbox per map section, replacing any existing ones."""
+		for child in self.map_frame.winfo_children():
+			child.destroy()
+		self.map_sections = {}
 		cur_row = 0
 		cur_col = 0
 		map_row = 0
-		lbl = tk.Label(self.ui, text=self.name)
-		lbl.pack()
-		map_frame = tk.Frame(self.ui)
-		map_frame.pack()
 		for map_section in self.map_data.map_sections:
-			self.map_sections[map_section] = tk.StringVar(map_frame, 'false')
-			section_btn = tk.Checkbutton(map_frame, text=map_section,
+			var = tk.StringVar(self.map_frame, 'true' if self.model.map_sections[map_section] else 'false')
+			self.map_sections[map_section] = self.bind_var(var, lambda s=map_section: self.on_section_changed(s))
+			section_btn = tk.Checkbutton(self.map_frame, text=map_section,
 									  variable=self.map_sections[map_section], onvalue='true', offvalue='false')
 			section_btn.grid(row=cur_row + map_row, column=cur_col, sticky="w")
 
-			tooltip.Tooltip(section_btn, text='\n'.join(self.map_data.map_sections[map_section]))
+			maps = self.map_data.map_sections[map_section]
+			tooltip.Tooltip(section_btn, text=lambda maps=maps: '\n'.join(maps))
 
 			map_row += 1
 			if map_row >= 4:
 				map_row = 0
 				cur_col += 1
 
-	def get_value(self, context):
-		if context == 'Fill DDC':
-			return ''
-		selected_sections = []
-		for key in self.map_sections:
-			if self.map_sections[key].get() == 'true':
-				selected_sections.append(key)
-		return '+'.join(selected_sections)
+	def on_section_changed(self, section):
+		self.model.select(section, self.map_sections[section].get() == 'true')
 
-	def set_value(self, value):
-		sl = value.split('+')
+	def refresh(self):
 		for key in self.map_sections:
-			if key in sl:
-				self.map_sections[key].set('true')
-			else:
-				self.map_sections[key].set('false')
+			self.map_sections[key].set('true' if self.model.map_sections[key] else 'false')
 
 
 class RunButton:
 	"""Button component for running build actions."""
 	
-	def __init__(self, window, bg_node, on_pressed):
+	def __init__(self, window, bg_node, on_pressed, on_toggled=None, selected=False):
 		"""Initialize run button.
 		
 		Args:
 			window: Parent window
 			bg_node: BuildGraph node data
 			on_pressed: Callback for button press
+			on_toggled: Callback for Ctrl+click, which adds or removes the target from the selection
+			selected: Whether the target starts out selected
 		"""
 		self.name = bg_node.name
 		self.pressed_callback = on_pressed
+		self.toggled_callback = on_toggled
 		self.ui = tk.Button(window, text=self.name, command=self.on_button_pressed)
-		tooltip.Tooltip(self.ui, text=bg_node.description)
+		self.normal_relief = self.ui['relief']
+		self.tooltip = tooltip.Tooltip(self.ui, text=bg_node.description)
+		if on_toggled:
+			self.ui.bind('<Control-Button-1>', self.on_toggled)
+		self.set_selected(selected)
+
+	def destroy(self):
+		"""Destroy the button."""
+		self.ui.destroy()
+
+	def rebind(self, bg_node, on_pressed, selected=False):
+		"""Show another target, so a scrolling section can reuse the button.
+		
+		Args:
+			bg_node: BuildGraph node data
+			on_pressed: Callback for button press
+			selected: Whether the target is selected
+		"""
+		self.name = bg_node.name
+		self.pressed_callback = on_pressed
+		self.ui.configure(text=self.name)
+		self.tooltip.text = bg_node.description
+		self.set_selected(selected)
 
 	def on_button_pressed(self):
 		"""Handle button press event."""
 		self.pressed_callback(self.name)
+
+	def on_toggled(self, event=None):
+		"""Toggle selection instead of running the target."""
+		self.toggled_callback(self.name)
+		return 'break'
+
+	def set_selected(self, selected):
+		"""Show whether the target is part of the multi-target selection."""
+		self.ui.configure(relief='sunken' if selected else self.normal_relief)
@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import ipaddress
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from dispatch import (DEFAULT_PORT, HEARTBEAT_INTERVAL, MESSAGE_LIMIT, PROTOCOL_VERSION, TOKEN_ENV, check_token,
+					  encode, read_message)
+from procstats import ProcessSampler
+from supervisor import ProcessSupervisor, QueueFull
+
+parser = argparse.ArgumentParser(description="Worker agent running RunUAT commands sent by launchers")
+parser.add_argument('--host', default='127.0.0.1',
+					help="Address to listen on, 0.0.0.0 to accept launchers on other machines, which requires --token")
+parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+parser.add_argument('--slots', type=int, default=2, help="Maximum number of RunUAT processes running at once")
+parser.add_argument('--name', default=socket.gethostname(), help="Name shown in the launchers")
+parser.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+					help=f"Shared secret launchers must present, defaults to the {TOKEN_ENV} variable")
+parser.add_argument('--path-map', action='append', metavar='FROM=TO',
+					help="Replace a path of the launcher's machine with the local one, e.g. D:\\Work=E:\\Build")
+parser.add_argument('--sample-interval', type=float, default=1.0,
+					help="Seconds between resource usage samples of running jobs, 0 disables sampling")
+
+
+def is_loopback(host: str) -> bool:
+	"""True if an address to listen on only accepts connections from this machine."""
+	if host == 'localhost':
+		return True
+	try:
+		return ipaddress.ip_address(host).is_loopback
+	except ValueError:
+		return False
+
+
+class Client:
+	"""A launcher connected to the worker."""
+
+	def __init__(self, writer: asyncio.StreamWriter) -> None:
+		self.writer = writer
+		# Launcher job id -> local supervisor job
+		self.jobs = {}
+
+	def send(self, message: Dict[str, Any]) -> None:
+		if not self.writer.is_closing():
+			self.writer.write(encode(message))
+
+
+class WorkerAgent:
+	"""Runs the commands launchers send it and streams their output back.
+
+	Commands run through a local ProcessSupervisor, so they get the same
+	process groups, cancellation and resource sampling as local launches.
+	Every connected launcher receives a heartbeat with the worker's slots,
+	running jobs and load average every HEARTBEAT_INTERVAL seconds and
+	whenever a job starts or ends. Jobs of a launcher that disconnects are
+	cancelled.
+	"""
+
+	def __init__(self, name: str, slots: int, token: Optional[str] = None, path_map: Iterable[str] = (),
+				 sample_interval: float = 1.0) -> None:
+		"""Initialize the worker.
+
+		Args:
+			name: Name shown in the launchers
+			slots: Maximum number of processes running at once
+			token: Shared secret launchers must present, None to accept any launcher
+			path_map: FROM=TO replacements applied to command lines and working directories
+			sample_interval: Seconds between resource usage samples, 0 disables sampling
+		"""
+		self.name = name
+		self.slots = slots
+		self.token = token
+		self.path_map = []
+		for mapping in path_map:
+			source, sep, target = mapping.partition('=')
+			if not sep:
+				raise ValueError(f"Expected FROM=TO, got '{mapping}'")
+			self.path_map.append((source, target))
+		sampler = ProcessSampler(sample_interval) if sample_interval > 0 else None
+		self.supervisor = ProcessSupervisor(slots, max_queued=1000, log_lines=1000, sampler=sampler)
+		self.supervisor.add_output_listener(self.on_output)
+		self.supervisor.add_listener(self.on_job_changed)
+		self.clients = set()
+		# Local job id -> (client, launcher job id), only used on the supervisor loop
+		self.owners = {}
+		self.server = None
+
+	def map_path(self, text: str) -> str:
+		for source, target in self.path_map:
+			text = text.replace(source, target)
+		return text
+
+	def heartbeat(self) -> Dict[str, Any]:
+		load = os.getloadavg()[0] if hasattr(os, 'getloadavg') else None
+		return {'type': 'heartbeat', 'slots': self.slots, 'running': len(self.supervisor.active_jobs()),
+				'load': load}
+
+	def broadcast_heartbeat(self) -> None:
+		message = self.heartbeat()
+		for client in self.clients:
+			client.send(message)
+
+	def on_output(self, job: Any, lines: List[str]) -> None:
+		owner = self.owners.get(job.id)
+		if owner is not None:
+			owner[0].send({'type': 'output', 'id': owner[1], 'lines': lines})
+
+	def on_job_changed(self, job: Any) -> None:
+		if not job.finished:
+			return
+		owner = self.owners.pop(job.id, None)
+		if owner is not None:
+			client, job_id = owner
+			client.jobs.pop(job_id, None)
+			client.send({'type': 'exit', 'id': job_id, 'code': job.returncode, 'state': job.state,
+						 'error': job.error})
+			print(f"{job.name}: {job.state}")
+		self.broadcast_heartbeat()
+
+	async def start(self, host: str, port: int) -> None:
+		self.server = await asyncio.start_server(self.handle, host, port, limit=MESSAGE_LIMIT)
+
+	async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		"""Serve one launcher connection."""
+		peer = writer.get_extra_info('peername')
+		client = Client(writer)
+		try:
+			hello = await read_message(reader)
+			if not hello or hello.get('type') != 'hello' or not check_token(self.token, hello.get('token')):
+				print(f"Rejected launcher {peer}")
+				client.send({'type': 'error', 'message': 'Invalid token'})
+				return
+			if hello.get('version') != PROTOCOL_VERSION:
+				client.send({'type': 'error', 'message': f'Worker speaks protocol version {PROTOCOL_VERSION}'})
+				return
+			print(f"Launcher {peer} connected")
+			client.send({'type': 'hello', 'name': self.name, 'slots': self.slots, 'version': PROTOCOL_VERSION,
+						 'platform': sys.platform})
+			self.clients.add(client)
+			heartbeats = asyncio.get_running_loop().create_task(self.send_heartbeats(client))
+			try:
+				while True:
+					message = await read_message(reader)
+					if message is None:
+						break
+					if message.get('type') == 'run':
+						self.run(client, message)
+					elif message.get('type') == 'cancel':
+						job = client.jobs.get(message.get('id'))
+						if job is not None:
+							self.supervisor.cancel(job.id)
+			finally:
+				heartbeats.cancel()
+				self.clients.discard(client)
+				for job in client.jobs.values():
+					self.supervisor.cancel(job.id)
+				print(f"Launcher {peer} disconnected")
+		except (OSError, ValueError) as e:
+			print(f"Error talking to launcher {peer}: {e}")
+		finally:
+			writer.close()
+
+	async def send_heartbeats(self, client: Client) -> None:
+		while True:
+			client.send(self.heartbeat())
+			await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+	def run(self, client: Client, message: Dict[str, Any]) -> None:
+		"""Queue a command sent by a launcher."""
+		job_id = message.get('id')
+		try:
+			argv = [self.map_path(arg) for arg in message['argv']]
+			cwd = self.map_path(message['cwd']) if message.get('cwd') else None
+			job = self.supervisor.submit(message.get('name') or str(job_id), argv, cwd=cwd)
+		except (KeyError, OSError, QueueFull) as e:
+			client.send({'type': 'exit', 'id': job_id, 'code': None, 'error': f"{self.name} can't run the job: {e}"})
+			return
+		self.owners[job.id] = (client, job_id)
+		client.jobs[job_id] = job
+		print(f"{job.name}: {subprocess.list2cmdline(argv)}")
+		self.broadcast_heartbeat()
+
+	def serve_forever(self, host: str, port: int) -> None:
+		"""Accept launchers until interrupted, then stop the running jobs."""
+		asyncio.run_coroutine_threadsafe(self.start(host, port), self.supervisor.loop).result()
+		print(f"Worker {self.name} listening on {host}:{port} with {self.slots} slots")
+		try:
+			while True:
+				time.sleep(3600)
+		except KeyboardInterrupt:
+			pass
+		finally:
+			self.supervisor.cancel_all()
+			self.supervisor.wait_idle(self.supervisor.kill_timeout + 1)
+			self.supervisor.loop.call_soon_threadsafe(self.server.close)
+			self.supervisor.shutdown()
+
+
+if __name__ == '__main__':
+	args = parser.parse_args()
+	# The protocol is plaintext and runs any command it is sent, so only loopback listeners may go without a token
+	if not args.token and not is_loopback(args.host):
+		parser.error(f"--token or {TOKEN_ENV} is required to listen on {args.host}")
+	try:
+		agent = WorkerAgent(args.name, args.slots, args.token, args.path_map or (), args.sample_interval)
+	except ValueError as e:
+		parser.error(str(e))
+	agent.serve_forever(args.host, args.port)
@@ -0,0 +1,161 @@
+"""Generate synthetic launcher projects for benchmarking.
+
+A generated project has the layout the launcher expects:
+
+    <root>/BuildGraph/GlobalVariables.xml, CPG_Builds.xml, Platform_*.xml
+    <root>/unreal/Game/Config/DefaultGame.ini, DefaultEditor.ini
+    <root>/unreal/Engine/Config/BaseGame.ini
+
+Usage:
+    python generate.py <root> [--options N] [--aggregates N] [--platforms N] [--maps N] [--sections N] [--depth N]
+"""
+import argparse
+import os
+import random
+from xml.sax.saxutils import quoteattr
+
+OPTION_CATEGORIES = ('General', 'Package', 'Maps', 'Compile', 'Editor')
+ACTION_CATEGORIES = ('Cook', 'Package', 'Test', 'Compile', 'Editor')
+SIMPLE_TYPES = ('TextEntry', 'Dropdown', 'Checkbox', 'DirectoryChooser', 'MultiSelect')
+HEADER = '<?xml version="1.0" encoding="utf-8"?>\n<BuildGraph xmlns="http://www.epicgames.com/BuildGraph">\n'
+FOOTER = '</BuildGraph>\n'
+
+
+def option_element(index: int, rng: random.Random) -> str:
+	"""Return an Option element of a random launcher type."""
+	option_type = SIMPLE_TYPES[index % len(SIMPLE_TYPES)]
+	category = OPTION_CATEGORIES[rng.randrange(len(OPTION_CATEGORIES))]
+	extra = ''
+	if option_type == 'TextEntry':
+		default = f'Value{index}'
+	elif option_type == 'Dropdown':
+		choices = [f'Choice{index}_{c}' for c in range(5)]
+		default = choices[0]
+		extra = f' Restrict={quoteattr("|".join(choices))}'
+	elif option_type == 'Checkbox':
+		default = 'true' if index % 2 else 'false'
+	elif option_type == 'DirectoryChooser':
+		default = f'C:/Output/{index}'
+	else:
+		default = ';'.join(f'Item{index}_{c}' for c in range(4))
+	description = quoteattr(f'[{category}][{option_type}] Synthetic option {index}')
+	return (f'\t<Option Name="Option{index}" DefaultValue={quoteattr(default)}{extra} '
+			f'Description={description}/>\n')
+
+
+def write_buildgraph(script_dir: str, options: int, aggregates: int, platforms: int, seed: int = 0) -> None:
+	"""Write GlobalVariables.xml, CPG_Builds.xml and platform scripts.
+
+	Each aggregate requires a node on an agent, and nodes require a shared
+	editor node and, within a platform, the previous node, so the scripts
+	also exercise dependency graph construction.
+
+	Args:
+		script_dir: Directory to write the scripts to
+		options: Number of options in GlobalVariables.xml, plus the two map options
+		aggregates: Number of aggregates, spread over CPG_Builds.xml and the platform scripts
+		platforms: Number of Platform_*.xml scripts included from CPG_Builds.xml
+		seed: Random seed for categories
+	"""
+	rng = random.Random(seed)
+	os.makedirs(script_dir, exist_ok=True)
+	with open(os.path.join(script_dir, 'GlobalVariables.xml'), 'w') as fp:
+		fp.write(HEADER)
+		fp.write('\t<Option Name="Maps" DefaultValue="" Description="[Maps][MapSelect] Maps to cook"/>\n')
+		fp.write('\t<Option Name="MapSections" DefaultValue="" '
+				 'Description="[Maps][MapSectionSelect] Map sections to cook"/>\n')
+		for index in range(options):
+			fp.write(option_element(index, rng))
+		fp.write(FOOTER)
+
+	files = ['CPG_Builds.xml'] + [f'Platform_P{p}.xml' for p in range(platforms)]
+	per_file = -(-aggregates // len(files))
+	for file_index, name in enumerate(files):
+		first = file_index * per_file
+		count = max(0, min(per_file, aggregates - first))
+		with open(os.path.join(script_dir, name), 'w') as fp:
+			fp.write(HEADER)
+			if file_index == 0:
+				fp.write('\t<Include Script="GlobalVariables.xml"/>\n')
+				fp.write('\t<Agent Name="Editor" Type="Win64">\n')
+				fp.write('\t\t<Node Name="Compile Editor Node" Produces="#Editor"/>\n')
+				fp.write('\t</Agent>\n')
+			fp.write(f'\t<Agent Name="Agent {file_index}" Type="Win64">\n')
+			for index in range(first, first + count):
+				requires = '#Editor' if index == first else f'Node {index - 1}'
+				fp.write(f'\t\t<Node Name="Node {index}" Requires="{requires}"/>\n')
+			fp.write('\t</Agent>\n')
+			for index in range(first, first + count):
+				category = ACTION_CATEGORIES[rng.randrange(len(ACTION_CATEGORIES))]
+				fp.write(f'\t<Aggregate Name="Action {index}" Label="[{category}] Synthetic action {index}" '
+						 f'Requires="Node {index}"/>\n')
+			if file_index == 0:
+				for include in files[1:]:
+					fp.write(f'\t<Include Script="{include}"/>\n')
+			fp.write(FOOTER)
+
+
+def write_config(game_dir: str, engine_dir: str, maps: int, sections: int, depth: int) -> None:
+	"""Write DefaultGame.ini, DefaultEditor.ini and a BaseGame.ini layer.
+
+	Map sections are chained in groups of depth, each section linking the
+	next one with +Section, so resolving the first section of a group walks
+	the whole chain.
+
+	Args:
+		game_dir: Project directory containing Config
+		engine_dir: Directory containing the Engine folder
+		maps: Number of maps to cook
+		sections: Number of map sections
+		depth: Length of each +Section chain
+	"""
+	config_dir = os.path.join(game_dir, 'Config')
+	os.makedirs(config_dir, exist_ok=True)
+	with open(os.path.join(config_dir, 'DefaultGame.ini'), 'w') as fp:
+		fp.write('[/Script/EngineSettings.GeneralProjectSettings]\nProjectName=Synthetic\n\n')
+		fp.write('[/Script/UnrealEd.ProjectPackagingSettings]\nBuildConfiguration=PPBC_Shipping\n')
+		for index in range(maps):
+			fp.write(f'+MapsToCook=(FilePath="/Game/Maps/Map{index:05d}")\n')
+
+	with open(os.path.join(config_dir, 'DefaultEditor.ini'), 'w') as fp:
+		fp.write('[/Script/UnrealEd.EditorEngine]\nbEnableEditorPSysRealtimeLOD=False\n\n')
+		for section in range(sections):
+			fp.write(f'[Section{section:05d}]\n')
+			for index in range(section, maps, max(sections, 1)):
+				fp.write(f'+Map=(FilePath="/Game/Maps/Map{index:05d}")\n')
+			if depth > 1 and (section + 1) % depth and section + 1 < sections:
+				fp.write(f'+Section=Section{section + 1:05d}\n')
+			fp.write('\n')
+
+	engine_config = os.path.join(engine_dir, 'Engine', 'Config')
+	os.makedirs(engine_config, exist_ok=True)
+	with open(os.path.join(engine_config, 'BaseGame.ini'), 'w') as fp:
+		fp.write('[/Script/UnrealEd.ProjectPackagingSettings]\n-MapsToCook=(FilePath="/Game/Maps/Missing")\n')
+
+
+def write_project(root: str, options: int = 100, aggregates: int = 100, platforms: int = 4, maps: int = 1000,
+				  sections: int = 100, depth: int = 10) -> str:
+	"""Write a complete synthetic project.
+
+	Returns:
+		str: The BuildGraph script directory
+	"""
+	script_dir = os.path.join(root, 'BuildGraph')
+	write_buildgraph(script_dir, options, aggregates, platforms)
+	write_config(os.path.join(root, 'unreal', 'Game'), os.path.join(root, 'unreal'), maps, sections, depth)
+	os.makedirs(os.path.join(root, 'unreal', 'Game', 'Saved'), exist_ok=True)
+	return script_dir
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Generate a synthetic launcher project")
+	parser.add_argument('root', help="Directory to write the project to")
+	parser.add_argument('--options', type=int, default=100)
+	parser.add_argument('--aggregates', type=int, default=100)
+	parser.add_argument('--platforms', type=int, default=4)
+	parser.add_argument('--maps', type=int, default=1000)
+	parser.add_argument('--sections', type=int, default=100)
+	parser.add_argument('--depth', type=int, default=10)
+	args = parser.parse_args()
+	print(write_project(args.root, args.options, args.aggregates, args.platforms, args.maps, args.sections,
+						args.depth))
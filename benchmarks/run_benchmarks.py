@@ -0,0 +1,289 @@
+"""Benchmark the launcher against synthetic projects and save the results as JSON.
+
+Usage:
+    python run_benchmarks.py [--quick] [--only NAME] [--repeat N] [--output FILE] [--compare FILE]
+
+Results are written to benchmarks/results/ by default. Pass an earlier
+results file to --compare to print the change of every benchmark.
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'Launcher'))
+
+import buildgraphapi  # noqa: E402
+import generate  # noqa: E402
+from commandbuilder import CommandBuilder  # noqa: E402
+from confighierarchy import ConfigHierarchy  # noqa: E402
+from headless import HeadlessApp  # noqa: E402
+from mapconfigdata import CONFIG_KEYS, MapIniData  # noqa: E402
+from parsecache import ParseCache  # noqa: E402
+from project import LauncherProject  # noqa: E402
+
+FULL_SCALES = {'buildgraph': [10, 100, 1000, 10000],
+			   'maps': [1000, 10000, 50000],
+			   'command': [10, 100, 1000, 10000],
+			   'widgets': [10, 100, 1000]}
+QUICK_SCALES = {'buildgraph': [10, 1000],
+				'maps': [1000, 10000],
+				'command': [10, 1000],
+				'widgets': [10, 100]}
+SECTION_DEPTH = 50
+# Run buttons in the section scrolled by the widget benchmark
+SCROLL_BUTTONS = 1000
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+	"""Time fn repeat times, with output suppressed.
+
+	Args:
+		fn: Function to time
+		repeat: Number of timed runs
+		setup: Optional untimed function called before each run
+
+	Returns:
+		dict: Minimum, mean and maximum seconds
+	"""
+	times = []
+	for _ in range(repeat):
+		with contextlib.redirect_stdout(io.StringIO()):
+			if setup:
+				setup()
+			start = time.perf_counter()
+			fn()
+			times.append(time.perf_counter() - start)
+	return {'min': min(times), 'mean': statistics.mean(times), 'max': max(times), 'repeat': repeat}
+
+
+def buildgraph_args(script_dir: str):
+	return (os.path.join(script_dir, 'GlobalVariables.xml'), os.path.join(script_dir, 'CPG_Builds.xml'),
+			buildgraphapi.discover_platform_scripts(script_dir))
+
+
+def bench_buildgraph(root: str, scales, repeat: int):
+	"""BuildGraph construction without a cache, in parallel and from a warm cache."""
+	for count in scales:
+		project_dir = os.path.join(root, f'bg{count}')
+		script_dir = generate.write_project(project_dir, options=count, aggregates=count, maps=10, sections=2)
+		args = buildgraph_args(script_dir)
+		cache_path = os.path.join(project_dir, 'cache.json')
+		params = {'options': count, 'aggregates': count}
+
+		yield 'buildgraph_cold', params, measure(lambda: buildgraphapi.BuildGraph(*args), repeat)
+		jobs = os.cpu_count() or 1
+		yield ('buildgraph_parallel', dict(params, jobs=jobs),
+			   measure(lambda: buildgraphapi.BuildGraph(*args, jobs=jobs), repeat))
+		with contextlib.redirect_stdout(io.StringIO()):
+			buildgraphapi.BuildGraph(*args, cache=ParseCache(cache_path))
+		yield 'buildgraph_warm_cache', params, measure(lambda: buildgraphapi.BuildGraph(*args, cache=ParseCache(cache_path)), repeat)
+
+
+def bench_maps(root: str, scales, repeat: int):
+	"""MapIniData construction through the config hierarchy."""
+	for maps in scales:
+		project_dir = os.path.join(root, f'maps{maps}')
+		generate.write_project(project_dir, options=10, aggregates=10, maps=maps, sections=maps // 10,
+							   depth=SECTION_DEPTH)
+		game_dir = os.path.join(project_dir, 'unreal', 'Game')
+		engine_dir = os.path.join(project_dir, 'unreal')
+		params = {'maps': maps, 'sections': maps // 10, 'depth': SECTION_DEPTH}
+		yield 'mapinidata', params, measure(
+			lambda: MapIniData.from_hierarchy(ConfigHierarchy(engine_dir, game_dir, CONFIG_KEYS)), repeat)
+
+
+def bench_command(root: str, scales, repeat: int):
+	"""RunUAT command line assembly from option values, per command, uncached and from a warm cache."""
+	commands = 100
+	for count in scales:
+		project_dir = os.path.join(root, f'cmd{count}')
+		script_dir = generate.write_project(project_dir, options=count, aggregates=commands, maps=1000,
+											sections=100)
+		with contextlib.redirect_stdout(io.StringIO()):
+			app = HeadlessApp(LauncherProject(script_dir, project_dir, use_cache=False))
+		targets = [action.name for action in app.project.build_graph.actions] + ['Fill DDC']
+
+		def build_all():
+			for target in targets:
+				app.build_command(target)
+
+		result = measure(build_all, repeat)
+		for key in ('min', 'mean', 'max'):
+			result[key] /= len(targets)
+		yield 'command_line', {'options': count}, result
+
+		builder = CommandBuilder(app.project, app.options)
+
+		def build_cached():
+			for target in targets:
+				builder.build(target)
+
+		build_cached()
+		result = measure(build_cached, repeat)
+		for key in ('min', 'mean', 'max'):
+			result[key] /= len(targets)
+		yield 'command_line_cached', {'options': count}, result
+
+
+def start_display():
+	"""Make sure tkinter has a display, starting Xvfb if needed.
+
+	Returns:
+		tuple: Xvfb process or None, and the reason widgets can't be benchmarked or None
+	"""
+	if os.environ.get('DISPLAY'):
+		return None, None
+	xvfb = shutil.which('Xvfb')
+	if not xvfb:
+		return None, 'no DISPLAY and Xvfb is not installed'
+	display = ':97'
+	proc = subprocess.Popen([xvfb, display, '-screen', '0', '1920x1080x24', '-nolisten', 'tcp'],
+							stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+	time.sleep(1)
+	if proc.poll() is not None:
+		return None, 'Xvfb failed to start'
+	os.environ['DISPLAY'] = display
+	return proc, None
+
+
+def bench_widgets(root: str, scales, repeat: int):
+	"""LauncherWindow creation with every section built and laid out."""
+	xvfb, reason = start_display()
+	if reason:
+		print(f'Skipping widget benchmarks: {reason}')
+		return
+	try:
+		import optionmodel
+		from launcherwindow import LauncherWindow
+
+		for count in scales:
+			project_dir = os.path.join(root, f'ui{count}')
+			script_dir = generate.write_project(project_dir, options=count, aggregates=count, maps=1000,
+												sections=100)
+			with contextlib.redirect_stdout(io.StringIO()):
+				project = LauncherProject(script_dir, project_dir, use_cache=False)
+
+			def create_window():
+				window = LauncherWindow(lambda: None, lambda key: None)
+				for option in project.build_graph.options:
+					model = optionmodel.create_option_value(option, project.map_data)
+					if model:
+						window.add_option(model)
+				for action in project.build_graph.actions:
+					window.add_button(action, lambda name: None)
+				window.position_all()
+				for sections in (window.sections, window.btn_sections):
+					for section in sections.values():
+						section.build()
+				window.window.update_idletasks()
+				window.exit()
+
+			yield 'widgets', {'options': count, 'aggregates': count}, measure(create_window, repeat)
+
+		yield 'widgets_scroll', {'buttons': SCROLL_BUTTONS}, bench_scroll(project, repeat)
+	finally:
+		if xvfb is not None:
+			xvfb.terminate()
+
+
+def bench_scroll(project, repeat: int) -> dict:
+	"""Create a section of SCROLL_BUTTONS run buttons, then scroll it to the bottom and back."""
+	from launcherwindow import LauncherWindow
+
+	actions = project.build_graph.actions
+
+	def create_and_scroll():
+		window = LauncherWindow(lambda: None, lambda key: None)
+		for index in range(SCROLL_BUTTONS):
+			node = copy.copy(actions[index % len(actions)])
+			node.name = f'Scroll {index}'
+			node.category = 'Cook'
+			window.add_button(node, lambda name: None)
+		window.position_all()
+		section = window.btn_sections['Cook']
+		section.build()
+		window.window.update()
+		for direction in (1, -1):
+			for _ in range(section.row_count()):
+				section.yview('scroll', direction * 3, 'units')
+				window.window.update()
+		window.exit()
+
+	return measure(create_and_scroll, repeat)
+
+
+BENCHMARKS = {'buildgraph': bench_buildgraph,
+			  'maps': bench_maps,
+			  'command': bench_command,
+			  'widgets': bench_widgets}
+
+
+def git_revision() -> str:
+	try:
+		return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+									   stderr=subprocess.DEVNULL, text=True).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return ''
+
+
+def compare(results: list, baseline_path: str) -> None:
+	"""Print the change of each benchmark against an earlier results file."""
+	with open(baseline_path) as fp:
+		baseline = {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in json.load(fp)['results']}
+	print(f'\n{"Benchmark":<48} {"Before ms":>10} {"After ms":>10} {"Change":>8}')
+	for result in results:
+		key = (result['name'], json.dumps(result['params'], sort_keys=True))
+		label = f"{result['name']} {' '.join(f'{k}={v}' for k, v in result['params'].items())}"
+		before = baseline.get(key)
+		if before is None:
+			print(f'{label[:48]:<48} {"":>10} {result["min"] * 1000:>10.2f} {"new":>8}')
+			continue
+		change = (result['min'] - before['min']) / before['min'] * 100 if before['min'] else 0.0
+		print(f'{label[:48]:<48} {before["min"] * 1000:>10.2f} {result["min"] * 1000:>10.2f} {change:>+7.1f}%')
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark the launcher against synthetic projects")
+	parser.add_argument('--quick', action='store_true', help="Use smaller scales")
+	parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+	parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark")
+	parser.add_argument('--output', help="Results file, defaults to results/bench-<time>.json")
+	parser.add_argument('--compare', metavar='FILE', help="Earlier results file to compare against")
+	args = parser.parse_args()
+
+	scales = QUICK_SCALES if args.quick else FULL_SCALES
+	results = []
+	with tempfile.TemporaryDirectory(prefix='bglauncher-bench-') as root:
+		for name in args.only or BENCHMARKS:
+			for bench, params, timing in BENCHMARKS[name](root, scales[name], args.repeat):
+				label = ' '.join(f'{k}={v}' for k, v in params.items())
+				print(f'{bench:<24} {label:<40} {timing["min"] * 1000:>10.2f} ms')
+				results.append(dict(name=bench, params=params, **timing))
+
+	output = args.output or os.path.join(BENCH_DIR, 'results', time.strftime('bench-%Y%m%d-%H%M%S.json'))
+	os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+	with open(output, 'w') as fp:
+		json.dump({'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'revision': git_revision(),
+							'python': platform.python_version(), 'platform': platform.platform(),
+							'cpus': os.cpu_count(), 'quick': args.quick, 'repeat': args.repeat},
+				   'results': results}, fp, indent=1)
+	print(f'Results written to {output}')
+
+	if args.compare:
+		compare(results, args.compare)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The launcher's modules import each other as top-level modules, as they do when launcher.py is run
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Launcher'))
@@ -0,0 +1,60 @@
+import pytest
+
+from batchplan import SummaryRow, expand_matrix, summary_table
+
+
+def test_matrix_expands_every_combination():
+	plan = {'targets': ['Cook {Platform}'], 'matrix': {'Platform': ['Win64', 'Linux'], 'Shipping': [True, False]}}
+	entries = expand_matrix(plan)
+	assert [entry.values for entry in entries] == [
+		{'Platform': 'Win64', 'Shipping': 'true'}, {'Platform': 'Win64', 'Shipping': 'false'},
+		{'Platform': 'Linux', 'Shipping': 'true'}, {'Platform': 'Linux', 'Shipping': 'false'}]
+	assert entries[2].targets == ['Cook Linux']
+	assert entries[2].job_name('Cook Linux') == 'Cook Linux (Platform=Linux, Shipping=true)'
+
+
+def test_exclude_and_include():
+	plan = {'targets': ['Build'], 'matrix': {'Platform': ['Win64', 'Linux'], 'Config': ['Debug', 'Shipping']},
+			'exclude': [{'Platform': 'Linux', 'Config': 'Debug'}],
+			'include': [{'Platform': 'Mac', 'Config': 'Shipping'}, {'Platform': 'Win64', 'Config': 'Debug'}]}
+	assert [entry.label for entry in expand_matrix(plan)] == [
+		'Platform=Win64, Config=Debug', 'Platform=Win64, Config=Shipping', 'Platform=Linux, Config=Shipping',
+		'Platform=Mac, Config=Shipping']
+
+
+def test_excluding_every_combination_is_an_error():
+	plan = {'targets': ['Build'], 'matrix': {'Platform': ['Win64']}, 'exclude': [{}]}
+	with pytest.raises(ValueError, match='exclusions'):
+		expand_matrix(plan)
+
+
+def test_plan_without_matrix_runs_once():
+	entries = expand_matrix({'targets': ['Build', 'Cook']})
+	assert len(entries) == 1
+	assert entries[0].values == {}
+	assert entries[0].targets == ['Build', 'Cook']
+	assert entries[0].job_name('Cook') == 'Cook'
+
+
+def test_unknown_placeholder_is_an_error():
+	with pytest.raises(ValueError, match='unknown placeholder'):
+		expand_matrix({'targets': ['Cook {Platform}'], 'matrix': {'Config': ['Debug']}})
+
+
+def test_summary_table():
+	rows = [SummaryRow('Build', 'succeeded', 0, 65), SummaryRow('Cook Linux', 'failed', 1, 3.5, 'agent1'),
+			SummaryRow('Cook Win64', 'skipped')]
+	assert summary_table(rows, elapsed=130).split('\n') == [
+		'Job         Result     Exit  Duration  Worker',
+		'----------  ---------  ----  --------  ------',
+		'Build       succeeded  0     1:05      local',
+		'Cook Linux  failed     1     0:03      agent1',
+		'Cook Win64  skipped                    local',
+		'',
+		'3 jobs: 1 succeeded, 1 failed, 1 skipped in 2:10']
+
+
+def test_summary_table_without_workers():
+	table = summary_table([SummaryRow('Build', 'cancelled')])
+	assert table.split('\n')[0] == 'Job    Result     Exit  Duration'
+	assert table.endswith('1 jobs: 1 cancelled')
@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+import buildgraphapi
+
+HEADER = '<?xml version="1.0" encoding="utf-8"?>\n<BuildGraph xmlns="http://www.epicgames.com/BuildGraph">\n'
+FOOTER = '</BuildGraph>\n'
+
+BUILDS = '''	<Include Script="GlobalVariables.xml"/>
+	<Agent Name="Editor" Type="Win64">
+		<Node Name="Compile" Produces="#Editor"/>
+	</Agent>
+	<Agent Name="Game" Type="Win64">
+		<Node Name="Cook" Requires="#Editor"/>
+		<Node Name="Package" Requires="Cook"/>
+		<Node Name="Other" Requires="#Editor"/>
+	</Agent>
+	<Aggregate Name="Compile Editor" Label="[Compile] Compile the editor" Requires="Compile"/>
+	<Aggregate Name="Cook Game" Label="[Cook] Cook the game" Requires="Cook"/>
+	<Aggregate Name="Package Game" Label="[Package] Package the game" Requires="Package"/>
+	<Aggregate Name="Other" Label="[Test] Something else" Requires="Other"/>
+	<Aggregate Name="Cook And Other" Label="[Test] Cook and something else" Requires="Cook;Other"/>
+'''
+
+
+@pytest.fixture
+def build_graph(tmp_path, capsys):
+	(tmp_path / 'GlobalVariables.xml').write_text(HEADER + FOOTER, encoding='utf-8')
+	(tmp_path / 'CPG_Builds.xml').write_text(HEADER + BUILDS + FOOTER, encoding='utf-8')
+	graph = buildgraphapi.BuildGraph(str(tmp_path / 'GlobalVariables.xml'), str(tmp_path / 'CPG_Builds.xml'))
+	capsys.readouterr()
+	return graph
+
+
+def test_target_nodes_follow_requirements_and_tags(build_graph):
+	assert build_graph.target_nodes('Package Game') == {'Compile', 'Cook', 'Package'}
+	assert build_graph.target_nodes('Unknown') == frozenset()
+
+
+def test_targets_wait_for_the_targets_they_contain(build_graph):
+	plan = build_graph.schedule(['Package Game', 'Cook Game', 'Other', 'Compile Editor'])
+	assert plan == [('Compile Editor', []),
+					('Cook Game', ['Compile Editor']),
+					('Other', ['Compile Editor']),
+					('Package Game', ['Compile Editor', 'Cook Game'])]
+
+
+def test_targets_sharing_nodes_do_not_run_at_once(build_graph):
+	plan = build_graph.schedule(['Cook And Other', 'Package Game'])
+	assert plan == [('Cook And Other', []), ('Package Game', ['Cook And Other'])]
+
+
+def test_independent_and_duplicate_targets(build_graph):
+	plan = build_graph.schedule(['Other', 'Unknown', 'Other'])
+	assert plan == [('Unknown', []), ('Other', [])]
+
+
+def test_prerequisites_come_before_their_dependents(build_graph):
+	targets = ['Package Game', 'Cook And Other', 'Other', 'Cook Game', 'Compile Editor']
+	plan = build_graph.schedule(targets)
+	assert sorted(name for name, _ in plan) == sorted(targets)
+	seen = set()
+	for name, prerequisites in plan:
+		assert set(prerequisites) <= seen
+		seen.add(name)
+
+
+def option(name):
+	return f'\t<Option Name="{name}" DefaultValue="" Description="[General][TextEntry] {name}"/>\n'
+
+
+def include(script):
+	return f'\t<Include Script="{script}"/>\n'
+
+
+def write_scripts(directory, **scripts):
+	for name, body in scripts.items():
+		path = directory / f'{name}.xml'
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_text(HEADER + body + FOOTER, encoding='utf-8')
+
+
+def option_names(graph):
+	return [opt.name for opt in graph.options]
+
+
+def test_includes_are_merged_where_they_appear(tmp_path, capsys):
+	write_scripts(tmp_path, GlobalVariables=option('First') + include('Shared/*.xml') + option('Last'),
+				  CPG_Builds=option('Builds') + include('Shared/Alpha.xml') + include('$(Root)/Other.xml'))
+	write_scripts(tmp_path / 'Shared', Alpha=option('Alpha') + include('../Nested.xml'), Beta=option('Beta'))
+	write_scripts(tmp_path, Nested=option('Nested'))
+	graph = buildgraphapi.BuildGraph(str(tmp_path / 'GlobalVariables.xml'), str(tmp_path / 'CPG_Builds.xml'))
+	# Each script is merged once, at its first include
+	assert option_names(graph) == ['First', 'Alpha', 'Nested', 'Beta', 'Last', 'Builds']
+	assert [os.path.basename(path) for path in graph.scripts] == [
+		'GlobalVariables.xml', 'Alpha.xml', 'Nested.xml', 'Beta.xml', 'CPG_Builds.xml']
+	assert 'properties are not supported' in capsys.readouterr().out
+
+
+def test_include_cycle_is_ignored(tmp_path, capsys):
+	write_scripts(tmp_path, GlobalVariables=option('Global'),
+				  CPG_Builds=option('Before') + include('Cycle.xml') + option('After'),
+				  Cycle=option('Cycle') + include('CPG_Builds.xml') + include('Missing.xml'))
+	graph = buildgraphapi.BuildGraph(str(tmp_path / 'GlobalVariables.xml'), str(tmp_path / 'CPG_Builds.xml'))
+	assert option_names(graph) == ['Global', 'Before', 'Cycle', 'After']
+	output = capsys.readouterr().out
+	builds = buildgraphapi.script_key(str(tmp_path / 'CPG_Builds.xml'))
+	cycle = buildgraphapi.script_key(str(tmp_path / 'Cycle.xml'))
+	assert f'Include cycle ignored: {builds} -> {cycle} -> {builds}' in output
+	assert 'Error parsing script' in output and 'Missing.xml' in output
+
+
+def graph_contents(graph):
+	return ([opt.to_record() for opt in graph.options], [action.to_record() for action in graph.actions],
+			[node.to_record() for node in graph.nodes], graph.scripts)
+
+
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_concurrent_parsing_matches_serial_parsing(tmp_path, capsys, use_processes):
+	parts = {f'Part{index}': option(f'Part{index}') + include(f'../Nested/Part{index}.xml') + option(f'After{index}')
+			 for index in range(8)}
+	write_scripts(tmp_path, GlobalVariables=option('Global') + include('Parts/*.xml'),
+				  CPG_Builds=BUILDS + include('Parts/Part3.xml') + include('Nested/Part0.xml'))
+	write_scripts(tmp_path / 'Parts', **parts)
+	write_scripts(tmp_path / 'Nested', **{name: option(f'Nested{name}') + include(f'../Parts/{name}.xml')
+										   for name in parts})
+	paths = (str(tmp_path / 'GlobalVariables.xml'), str(tmp_path / 'CPG_Builds.xml'))
+	serial = buildgraphapi.BuildGraph(*paths)
+	concurrent = buildgraphapi.BuildGraph(*paths, jobs=4, use_processes=use_processes)
+	assert len(serial.options) == 25
+	assert graph_contents(concurrent) == graph_contents(serial)
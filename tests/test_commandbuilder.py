@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from commandbuilder import MAX_COMMAND_LINE, CommandBuilder, warn_if_too_long
+from optionmodel import OptionValue
+
+
+class CountingValue(OptionValue):
+	def __init__(self, name, default=''):
+		super().__init__(SimpleNamespace(name=name, default=default, category='Options'))
+		self.reads = 0
+
+	def get_value(self, context):
+		self.reads += 1
+		return super().get_value(context)
+
+
+class FakeMapData:
+	def __init__(self):
+		self.listeners = []
+
+	def add_listener(self, callback):
+		self.listeners.append(callback)
+
+
+class FakeProject:
+	def __init__(self):
+		self.map_data = FakeMapData()
+
+	def command_prefix(self, target):
+		return ['RunUAT.bat', 'BuildGraph', f'-target={target}']
+
+
+def test_build_skips_empty_options():
+	platform, maps = CountingValue('Platform', 'Win64'), CountingValue('Maps')
+	builder = CommandBuilder(FakeProject(), [platform, maps])
+	assert builder.build('Cook') == ['RunUAT.bat', 'BuildGraph', '-target=Cook', '-set:Platform=Win64']
+	assert builder.build('Cook', debug=True)[-1] == '-listonly'
+
+
+def test_arguments_are_cached_until_an_option_or_the_map_data_changes():
+	platform, maps = CountingValue('Platform', 'Win64'), CountingValue('Maps', 'Town')
+	project = FakeProject()
+	builder = CommandBuilder(project, [platform, maps])
+	builder.build('Cook')
+	builder.build('Cook')
+	assert (platform.reads, maps.reads) == (1, 1)
+	platform.set_value('Linux')
+	assert builder.build('Cook')[3] == '-set:Platform=Linux'
+	assert (platform.reads, maps.reads) == (2, 1)
+	builder.build('Package')
+	assert (platform.reads, maps.reads) == (3, 2)
+	for listener in project.map_data.listeners:
+		listener(project.map_data)
+	builder.build('Cook')
+	assert (platform.reads, maps.reads) == (4, 3)
+
+
+def test_untrack_and_replace():
+	platform, maps = CountingValue('Platform', 'Win64'), CountingValue('Maps', 'Town')
+	builder = CommandBuilder(FakeProject(), [platform, maps])
+	builder.untrack('Maps')
+	assert builder.build('Cook')[3:] == ['-set:Platform=Win64']
+	builder.replace(CountingValue('Platform', 'Linux'))
+	builder.replace(CountingValue('Config', 'Shipping'))
+	assert builder.build('Cook')[3:] == ['-set:Platform=Linux', '-set:Config=Shipping']
+
+
+def test_overlong_command_line_warns(capsys):
+	warn_if_too_long('Cook', ['RunUAT.bat', '-set:Maps=' + 'x' * MAX_COMMAND_LINE])
+	assert 'Warning: the command line of Cook is' in capsys.readouterr().out
+	warn_if_too_long('Cook', ['RunUAT.bat', '-set:Maps=Town'])
+	assert capsys.readouterr().out == ''
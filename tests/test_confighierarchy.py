@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+import confighierarchy
+from confighierarchy import ConfigHierarchy
+
+SECTION = '/Script/UnrealEd.ProjectPackagingSettings'
+KEYS = {'Game': (['MapsToCook'], [SECTION])}
+
+
+def write_layer(path, *lines, mtime=None):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, 'w', encoding='utf-8') as fp:
+		fp.write(f'[{SECTION}]\n' + ''.join(line + '\n' for line in lines))
+	if mtime is not None:
+		os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def layers(tmp_path):
+	engine_config = tmp_path / 'Engine' / 'Config'
+	game_dir = tmp_path / 'Game'
+	paths = {'base': engine_config / 'BaseGame.ini',
+			 'default': game_dir / 'Config' / 'DefaultGame.ini',
+			 'platform': game_dir / 'Config' / 'Windows' / 'WindowsGame.ini',
+			 'saved': game_dir / 'Saved' / 'Config' / 'WindowsEditor' / 'Game.ini'}
+	write_layer(paths['base'], '+MapsToCook=Engine')
+	write_layer(paths['default'], '+MapsToCook=Town', '+MapsToCook=Arena')
+	write_layer(paths['platform'], '-MapsToCook=Arena', '+MapsToCook=Windows')
+	write_layer(paths['saved'], '+MapsToCook=Local')
+	return tmp_path, paths
+
+
+def maps(values):
+	return values[SECTION]['mapstocook']
+
+
+def test_layer_order(tmp_path):
+	hierarchy = ConfigHierarchy(str(tmp_path), str(tmp_path / 'Game'), KEYS)
+	engine = os.path.join(str(tmp_path), 'Engine')
+	game = str(tmp_path / 'Game')
+	assert hierarchy.layer_paths('Game', 'Windows') == [
+		os.path.join(engine, 'Config', 'Base.ini'),
+		os.path.join(engine, 'Config', 'BaseGame.ini'),
+		os.path.join(engine, 'Config', 'Windows', 'BaseWindowsGame.ini'),
+		os.path.join(engine, 'Platforms', 'Windows', 'Config', 'BaseWindowsGame.ini'),
+		os.path.join(game, 'Config', 'DefaultGame.ini'),
+		os.path.join(engine, 'Config', 'Windows', 'WindowsGame.ini'),
+		os.path.join(engine, 'Platforms', 'Windows', 'Config', 'WindowsGame.ini'),
+		os.path.join(game, 'Config', 'Windows', 'WindowsGame.ini'),
+		os.path.join(game, 'Platforms', 'Windows', 'Config', 'WindowsGame.ini'),
+		os.path.join(game, 'Saved', 'Config', 'WindowsEditor', 'Game.ini')]
+
+
+def test_layers_merge_in_order(layers):
+	root = layers[0]
+	hierarchy = ConfigHierarchy(str(root), str(root / 'Game'), KEYS)
+	assert maps(hierarchy.merged('Game')) == ['Engine', 'Town', 'Arena', 'Local']
+	assert maps(hierarchy.merged('Game', 'Windows')) == ['Engine', 'Town', 'Windows', 'Local']
+
+
+def test_clear_in_a_later_layer(layers):
+	root, paths = layers
+	write_layer(paths['saved'], '!MapsToCook=ClearArray', '+MapsToCook=Only')
+	hierarchy = ConfigHierarchy(str(root), str(root / 'Game'), KEYS)
+	assert maps(hierarchy.merged('Game', 'Windows')) == ['Only']
+
+
+def test_views_are_cached_and_only_stale_layers_are_scanned(layers, monkeypatch):
+	root, paths = layers
+	scanned = []
+	scan_ini = confighierarchy.scan_ini
+
+	def counting_scan(path, *args, **kwargs):
+		scanned.append(os.path.basename(path))
+		return scan_ini(path, *args, **kwargs)
+
+	monkeypatch.setattr(confighierarchy, 'scan_ini', counting_scan)
+	hierarchy = ConfigHierarchy(str(root), str(root / 'Game'), KEYS)
+	windows = hierarchy.merged('Game', 'Windows')
+	assert sorted(scanned) == ['BaseGame.ini', 'DefaultGame.ini', 'Game.ini', 'WindowsGame.ini']
+	scanned.clear()
+	assert hierarchy.merged('Game', 'Windows') is windows
+	assert maps(hierarchy.merged('Game')) == ['Engine', 'Town', 'Arena', 'Local']
+	assert scanned == []
+	stat = os.stat(paths['default'])
+	write_layer(paths['default'], '+MapsToCook=Town', mtime=stat.st_mtime_ns + 1_000_000_000)
+	assert maps(hierarchy.merged('Game', 'Windows')) == ['Engine', 'Town', 'Windows', 'Local']
+	assert scanned == ['DefaultGame.ini']
+
+
+def test_watch_directories(layers):
+	root, paths = layers
+	hierarchy = ConfigHierarchy(str(root), str(root / 'Game'), KEYS)
+	assert sorted(hierarchy.watch_directories()) == sorted(str(paths[name].parent) for name in paths)
+
+
+def test_is_layer(layers):
+	root, paths = layers
+	hierarchy = ConfigHierarchy(str(root), str(root / 'Game'), KEYS)
+	saved = paths['saved'].parent
+	assert hierarchy.is_layer(str(saved / 'Game.ini'))
+	assert not hierarchy.is_layer(str(saved / 'EditorPerProjectUserSettings.ini'))
+	assert not hierarchy.is_layer(str(paths['platform']))
+	assert hierarchy.is_layer(str(paths['platform']), 'Windows')
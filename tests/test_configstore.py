@@ -0,0 +1,117 @@
+import os
+import stat
+import threading
+import time
+from configparser import ConfigParser
+
+import pytest
+
+import configstore
+from configstore import ConfigStore, write_atomic
+
+
+def settings(value):
+	config_parser = ConfigParser()
+	config_parser.read_dict({'General': {'Option': value}})
+	return config_parser
+
+
+def mode(path):
+	return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.fixture
+def writes(monkeypatch):
+	written = []
+
+	def counting_write(path, text):
+		written.append(text)
+		write_atomic(path, text)
+
+	monkeypatch.setattr(configstore, 'write_atomic', counting_write)
+	return written
+
+
+def test_write_atomic_replaces_the_file(tmp_path):
+	path = tmp_path / 'Saved' / 'Launcher.ini'
+	write_atomic(str(path), 'first')
+	write_atomic(str(path), 'second')
+	assert path.read_text(encoding='utf-8') == 'second'
+	assert os.listdir(path.parent) == ['Launcher.ini']
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+	path = tmp_path / 'Launcher.ini'
+	path.write_text('old', encoding='utf-8')
+
+	def failing_replace(src, dst):
+		raise OSError('disk full')
+
+	monkeypatch.setattr(os, 'replace', failing_replace)
+	with pytest.raises(OSError):
+		write_atomic(str(path), 'new')
+	assert path.read_text(encoding='utf-8') == 'old'
+	assert os.listdir(tmp_path) == ['Launcher.ini']
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="Windows has no POSIX permissions")
+def test_write_atomic_keeps_permissions(tmp_path):
+	path = tmp_path / 'Launcher.ini'
+	write_atomic(str(path), 'new')
+	assert mode(path) == 0o666 & ~configstore._UMASK
+	for permissions in (0o644, 0o664, 0o600):
+		os.chmod(path, permissions)
+		write_atomic(str(path), 'replaced')
+		assert mode(path) == permissions
+
+
+def test_changes_are_coalesced(tmp_path, writes):
+	path = str(tmp_path / 'Launcher.ini')
+	values = ['0']
+	store = ConfigStore(path, lambda: settings(values[-1]), delay=0.3)
+	for index in range(20):
+		values.append(str(index))
+		store.mark_dirty()
+	deadline = time.monotonic() + 10
+	while not writes and time.monotonic() < deadline:
+		time.sleep(0.02)
+	time.sleep(0.5)
+	store.close()
+	assert len(writes) == 1
+	assert store.load().get('General', 'Option') == '19'
+
+
+def test_snapshots_are_taken_on_the_owning_thread(tmp_path, writes):
+	threads = []
+
+	def snapshot():
+		threads.append(threading.current_thread().name)
+		return settings('value')
+
+	def post(function):
+		threading.Thread(target=function, name='Owner').start()
+
+	store = ConfigStore(str(tmp_path / 'Launcher.ini'), snapshot, delay=0.05, post=post)
+	store.mark_dirty()
+	deadline = time.monotonic() + 10
+	while not writes and time.monotonic() < deadline:
+		time.sleep(0.02)
+	assert writes and threads == ['Owner']
+	store.close()
+
+
+def test_close_writes_pending_changes_and_skips_unchanged_text(tmp_path, writes):
+	path = tmp_path / 'Launcher.ini'
+	with path.open('w', encoding='utf-8') as fp:
+		settings('saved').write(fp)
+	value = ['saved']
+	store = ConfigStore(str(path), lambda: settings(value[0]), delay=3600)
+	store.load()
+	store.mark_dirty()
+	store.flush()
+	assert writes == []
+	value[0] = 'changed'
+	store.mark_dirty()
+	store.close()
+	assert len(writes) == 1
+	assert store.load().get('General', 'Option') == 'changed'
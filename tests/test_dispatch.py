@@ -0,0 +1,141 @@
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import dispatch
+import worker
+from dispatch import Dispatcher
+from supervisor import CANCELLED, RUNNING, SUCCEEDED, Job, ProcessSupervisor
+from worker import WorkerAgent
+
+SLEEP = [sys.executable, '-c', 'import time; time.sleep(0.5)']
+
+
+def wait_for(condition, timeout=10.0):
+	deadline = time.monotonic() + timeout
+	while not condition():
+		if time.monotonic() > deadline:
+			pytest.fail("Timed out")
+		time.sleep(0.02)
+
+
+@pytest.fixture
+def start_workers():
+	agents = []
+
+	def start(count, token=None):
+		for index in range(count):
+			agent = WorkerAgent(f'w{index + 1}', 1, token, sample_interval=0)
+			asyncio.run_coroutine_threadsafe(agent.start('127.0.0.1', 0), agent.supervisor.loop).result()
+			agents.append(agent)
+		return [f"127.0.0.1:{agent.server.sockets[0].getsockname()[1]}" for agent in agents]
+
+	yield start
+	for agent in agents:
+		agent.supervisor.cancel_all()
+		agent.supervisor.wait_idle(10)
+		agent.supervisor.loop.call_soon_threadsafe(agent.server.close)
+		agent.supervisor.shutdown()
+
+
+@pytest.fixture
+def start_launcher():
+	supervisors = []
+
+	def start(addresses, token=None):
+		supervisor = ProcessSupervisor(2, 8, kill_timeout=2.0, dispatcher=Dispatcher(addresses, token))
+		supervisors.append(supervisor)
+		return supervisor
+
+	yield start
+	for supervisor in supervisors:
+		supervisor.cancel_all()
+		supervisor.wait_idle(10)
+		supervisor.shutdown()
+
+
+def test_jobs_spread_across_workers(start_workers, start_launcher):
+	supervisor = start_launcher(start_workers(2))
+	wait_for(lambda: all(w.healthy for w in supervisor.dispatcher.workers))
+	jobs = [supervisor.submit(f'job{index}', SLEEP) for index in range(2)]
+	assert supervisor.wait_idle(20)
+	assert [job.state for job in jobs] == [SUCCEEDED, SUCCEEDED]
+	assert sorted(job.worker for job in jobs) == ['w1', 'w2']
+
+
+def test_output_is_streamed_back(start_workers, start_launcher):
+	supervisor = start_launcher(start_workers(1))
+	wait_for(lambda: supervisor.dispatcher.workers[0].healthy)
+	job = supervisor.submit('echo', [sys.executable, '-c', 'print("hello from the worker")'])
+	assert supervisor.wait_idle(20)
+	assert job.state == SUCCEEDED and job.returncode == 0
+	wait_for(lambda: any('hello from the worker' in line for line in job.log.read(0)[0]))
+
+
+def test_cancel_stops_the_remote_process(start_workers, start_launcher):
+	supervisor = start_launcher(start_workers(1))
+	wait_for(lambda: supervisor.dispatcher.workers[0].healthy)
+	job = supervisor.submit('sleep', [sys.executable, '-c', 'import time; time.sleep(60)'])
+	wait_for(lambda: job.state == RUNNING and supervisor.dispatcher.workers[0].running)
+	supervisor.cancel(job.id)
+	assert supervisor.wait_idle(20)
+	assert job.state == CANCELLED
+	assert job.duration < 20
+
+
+def test_silent_worker_is_dropped_and_jobs_run_locally(start_workers, start_launcher, monkeypatch):
+	monkeypatch.setattr(worker, 'HEARTBEAT_INTERVAL', 3600)
+	monkeypatch.setattr(dispatch, 'HEARTBEAT_INTERVAL', 0.1)
+	monkeypatch.setattr(dispatch, 'HEARTBEAT_TIMEOUT', 0.5)
+	monkeypatch.setattr(dispatch, 'RECONNECT_DELAY', 3600)
+	supervisor = start_launcher(start_workers(1))
+	connection = supervisor.dispatcher.workers[0]
+	wait_for(lambda: connection.slots)
+	wait_for(lambda: connection.writer is None and not connection.connecting)
+	job = supervisor.submit('local', SLEEP)
+	assert supervisor.wait_idle(20)
+	assert job.state == SUCCEEDED
+	assert job.worker is None
+
+
+def test_wrong_token_falls_back_to_local(start_workers, start_launcher, monkeypatch):
+	monkeypatch.setattr(dispatch, 'RECONNECT_DELAY', 3600)
+	supervisor = start_launcher(start_workers(1, token='secret'), token='wrong')
+	connection = supervisor.dispatcher.workers[0]
+	wait_for(lambda: not connection.connecting)
+	job = supervisor.submit('local', SLEEP)
+	assert supervisor.wait_idle(20)
+	assert job.state == SUCCEEDED
+	assert job.worker is None
+	assert not connection.slots
+
+
+def test_slot_is_freed_when_the_job_ends():
+	dispatcher = Dispatcher(['worker:1'])
+	connection = dispatcher.workers[0]
+	sent = []
+	connection.writer = SimpleNamespace(write=sent.append)
+	connection.slots = 1
+	connection.last_heartbeat = time.monotonic()
+	supervisor = SimpleNamespace(notify=lambda job: None, finish=lambda job, state: setattr(job, 'state', state))
+	job = Job(1, 'job', ['RunUAT.bat', 'BuildGraph'])
+
+	async def run():
+		dispatcher.changed = asyncio.Condition()
+		task = asyncio.ensure_future(dispatcher.execute(job, supervisor))
+		while job.id not in connection.jobs:
+			await asyncio.sleep(0)
+		assert connection.free == 0
+		connection.jobs[job.id][1].set_result({'code': 0})
+		assert await task
+
+	asyncio.run(run())
+	assert job.state == SUCCEEDED
+	# Without waiting for a heartbeat
+	assert connection.free == 1
+	assert json.loads(sent[0]) == {'type': 'run', 'id': 1, 'name': 'job', 'argv': ['RunUAT.bat', 'BuildGraph'],
+								   'cwd': None}
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from filewatcher import FileWatcher, load_inotify
+
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(load_inotify() is None, reason="needs inotify"))]
+
+
+class Recorder:
+	"""Collects the changed paths reported by a watcher."""
+
+	def __init__(self):
+		self.calls = []
+		self.lock = threading.Lock()
+
+	def __call__(self, paths):
+		with self.lock:
+			self.calls.append(paths)
+
+	def wait(self, count=1, timeout=10.0):
+		deadline = time.monotonic() + timeout
+		while len(self.calls) < count:
+			if time.monotonic() > deadline:
+				pytest.fail("Timed out")
+			time.sleep(0.02)
+		return self.calls
+
+
+@pytest.fixture
+def start_watcher():
+	watchers = []
+
+	def start(directories, callback, use_inotify):
+		watcher = FileWatcher([str(d) for d in directories], callback, match=lambda path: path.endswith('.ini'),
+							  interval=0.05, debounce=0.3, use_inotify=use_inotify)
+		watcher.start()
+		watchers.append(watcher)
+		# Let the polling backend take its first listing
+		time.sleep(0.2)
+		return watcher
+
+	yield start
+	for watcher in watchers:
+		watcher.stop()
+
+
+@pytest.mark.parametrize('use_inotify', BACKENDS)
+def test_changes_are_reported_once_after_the_debounce(tmp_path, start_watcher, use_inotify):
+	recorder = Recorder()
+	watcher = start_watcher([tmp_path, tmp_path / 'missing'], recorder, use_inotify)
+	assert watcher.backend == ('inotify' if use_inotify else 'polling')
+	for index in range(4):
+		(tmp_path / 'Game.ini').write_text('x' * index)
+		(tmp_path / 'notes.txt').write_text('x' * index)
+		time.sleep(0.1)
+	(tmp_path / 'Editor.ini').write_text('new')
+	assert recorder.wait() == [{str(tmp_path / 'Game.ini'), str(tmp_path / 'Editor.ini')}]
+	time.sleep(0.4)
+	assert len(recorder.calls) == 1
+
+
+@pytest.mark.parametrize('use_inotify', BACKENDS)
+def test_set_directories(tmp_path, start_watcher, use_inotify):
+	old, new = tmp_path / 'old', tmp_path / 'new'
+	old.mkdir()
+	new.mkdir()
+	(new / 'Existing.ini').write_text('existing')
+	recorder = Recorder()
+	watcher = start_watcher([old], recorder, use_inotify)
+	watcher.set_directories([new, tmp_path / 'missing'])
+	assert watcher.directories == [str(new)]
+	# The watcher thread picks the new set up within half a second
+	time.sleep(0.7)
+	(old / 'Dropped.ini').write_text('dropped')
+	(new / 'Added.ini').write_text('added')
+	assert recorder.wait() == [{str(new / 'Added.ini')}]
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+from fingerprint import FingerprintStore, skip_targets
+
+
+def test_skip_targets_drops_targets_and_their_prerequisites():
+	plan = [('Build', ['-target=Build'], []), ('Cook', ['-target=Cook'], ['Build']),
+			('Package', ['-target=Package'], ['Build', 'Cook'])]
+	assert skip_targets(plan, ['Build']) == [('Cook', ['-target=Cook'], []),
+											 ('Package', ['-target=Package'], ['Cook'])]
+	assert skip_targets(plan, []) == [(name, argv, list(prerequisites)) for name, argv, prerequisites in plan]
+
+
+def test_fingerprint_follows_file_contents(tmp_path):
+	store = FingerprintStore(str(tmp_path / 'fingerprints.json'), str(tmp_path / 'running'))
+	script = tmp_path / 'Build.xml'
+	script.write_text('<BuildGraph/>')
+	first = store.fingerprint('Build', ['-target=Build'], [str(script)])
+	assert store.fingerprint('Build', ['-target=Build'], [str(script)]) == first
+	assert store.fingerprint('Build', ['-target=Build', '-clean'], [str(script)]) != first
+	script.write_text('<BuildGraph></BuildGraph>')
+	assert store.fingerprint('Build', ['-target=Build'], [str(script)]) != first
+
+
+def test_last_success_sees_other_writers(tmp_path):
+	path = str(tmp_path / 'fingerprints.json')
+	store = FingerprintStore(path, str(tmp_path / 'running'))
+	assert store.last_success('Build', 'abc') is None
+	store.record_success('Build', 'abc', 60)
+	assert store.last_success('Build', 'abc')['duration'] == 60
+	assert store.last_success('Build', 'def') is None
+	FingerprintStore(path, str(tmp_path / 'running')).record_success('Cook', 'def', 120)
+	assert store.last_success('Cook', 'def')['duration'] == 120
+	assert store.last_success('Build', 'abc') is not None
+
+
+def test_claims_are_listed_until_released(tmp_path):
+	running_dir = tmp_path / 'running'
+	running_dir.mkdir()
+	store = FingerprintStore(str(tmp_path / 'fingerprints.json'), str(running_dir))
+	fingerprint = 'a' * 64
+	assert store.running(fingerprint) == []
+	claim = store.claim('Build', fingerprint)
+	assert [info['target'] for info in store.running(fingerprint)] == ['Build']
+	assert store.running('b' * 64) == []
+	store.release(claim)
+	assert store.running(fingerprint) == []
+
+
+def test_abandoned_claims_are_removed(tmp_path):
+	running_dir = tmp_path / 'running'
+	running_dir.mkdir()
+	store = FingerprintStore(str(tmp_path / 'fingerprints.json'), str(running_dir))
+	fingerprint = 'a' * 64
+	claim = store.claim('Build', fingerprint)
+	with open(claim, 'w', encoding='utf-8') as fp:
+		fp.write(f'{{"target": "Build", "host": "{store.host}", "pid": -1, "started": 0}}')
+	assert store.running(fingerprint) == []
+	assert not os.path.exists(claim)
+
+
+def test_concurrent_launchers_keep_each_others_successes(tmp_path):
+	path = str(tmp_path / 'fingerprints.json')
+	launcher_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Launcher')
+	code = ('import sys; sys.path.insert(0, sys.argv[1]); from fingerprint import FingerprintStore; '
+			'store = FingerprintStore(sys.argv[2], sys.argv[3]); '
+			'[store.record_success(f"{sys.argv[4]}{index}", "abc", index) for index in range(20)]')
+	processes = [subprocess.Popen([sys.executable, '-c', code, launcher_dir, path, str(tmp_path / 'running'), name])
+				 for name in ('Build', 'Cook', 'Package', 'Test')]
+	assert [process.wait(60) for process in processes] == [0] * 4
+	records = FingerprintStore(path, str(tmp_path / 'running')).load()
+	assert sorted(records) == sorted(f'{name}{index}' for name in ('Build', 'Cook', 'Package', 'Test')
+									 for index in range(20))
+	assert os.listdir(tmp_path) == ['fingerprints.json']
+
+
+def test_stale_lock_is_removed(tmp_path):
+	path = tmp_path / 'fingerprints.json'
+	lock = tmp_path / 'fingerprints.json.lock'
+	lock.write_text('')
+	os.utime(lock, (0, 0))
+	FingerprintStore(str(path), str(tmp_path / 'running')).record_success('Build', 'abc', 60)
+	assert FingerprintStore(str(path), str(tmp_path / 'running')).last_success('Build', 'abc') is not None
+	assert not lock.exists()
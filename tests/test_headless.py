@@ -0,0 +1,121 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import optionmodel
+from commandbuilder import CommandBuilder
+from configstore import ConfigStore
+from headless import HeadlessApp
+from project import LauncherProject
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+import generate  # noqa: E402
+
+SAVED = '[Compile]\nOption0 = Saved0\n\n[General]\nOption2 = true\n'
+
+
+@pytest.fixture
+def project(tmp_path, capsys):
+	script_dir = generate.write_project(str(tmp_path), options=6, aggregates=4, platforms=2, maps=5, sections=2,
+										depth=2)
+	project = LauncherProject(script_dir, str(tmp_path), use_cache=False)
+	with open(project.config_ini, 'w', encoding='utf-8') as fp:
+		fp.write(SAVED)
+	capsys.readouterr()
+	return project
+
+
+def window_options(project, assignments=()):
+	"""Option models loaded and bound the way the launcher window sets them up, then changed as in its widgets."""
+	models = [model for model in (optionmodel.create_option_value(elm, project.map_data)
+								  for elm in project.build_graph.options) if model]
+	config_parser = ConfigStore(project.config_ini, None).load()
+	for model in models:
+		model.load_config(config_parser)
+	project.bind_platform_option(models)
+	for assignment in assignments:
+		name, _, value = assignment.partition('=')
+		next(model for model in models if model.name == name).set_value(value)
+	return models
+
+
+def targets(project):
+	return [action.name for action in project.build_graph.actions]
+
+
+def test_commands_match_the_launcher_window(project):
+	app = HeadlessApp(project)
+	builder = CommandBuilder(project, window_options(project))
+	for target in targets(project):
+		for debug in (False, True):
+			assert app.build_command(target, debug) == builder.build(target, debug)
+	assert '-set:Option0=Saved0' in app.build_command('Action 0')
+
+
+def test_assignments_match_values_set_in_the_window(project):
+	app = HeadlessApp(project)
+	app.set_values(['Option1=Choice1_2', 'Extra=1'])
+	builder = CommandBuilder(project, window_options(project, ['Option1=Choice1_2']))
+	assert app.build_command('Action 0') == builder.build('Action 0') + ['-set:Extra=1']
+	assert app.build_command('Action 0', True) == builder.build('Action 0') + ['-set:Extra=1', '-listonly']
+
+
+def test_run_and_run_all_print_the_window_commands(project, capsys):
+	app = HeadlessApp(project)
+	builder = CommandBuilder(project, window_options(project))
+	assert app.run('Action 0', print_only=True) == 0
+	assert capsys.readouterr().out == subprocess.list2cmdline(builder.build('Action 0')) + '\n'
+	assert app.run_all(['Action 0', 'Action 1'], 2, 0, print_only=True) == 0
+	expected = []
+	for target, prerequisites in project.build_graph.schedule(['Action 0', 'Action 1']):
+		after = f" (after {', '.join(prerequisites)})" if prerequisites else ''
+		expected.append(f'{target}{after}: {subprocess.list2cmdline(builder.build(target))}')
+	assert capsys.readouterr().out.splitlines() == expected
+
+
+def test_run_matrix_prints_the_window_commands(project, capsys):
+	app = HeadlessApp(project)
+	plan = {'targets': ['Action 0'], 'set': {'Option0': 'Shared'}, 'matrix': {'Option1': ['Choice1_1', 'Choice1_3']}}
+	assert app.run_matrix(plan, 2, 0, print_only=True, assignments=['Option5=Assigned']) == 0
+	expected = ['2 combinations, 2 jobs']
+	for choice in ('Choice1_1', 'Choice1_3'):
+		builder = CommandBuilder(project, window_options(project, ['Option0=Shared', 'Option5=Assigned',
+																	f'Option1={choice}']))
+		expected.append(f'Action 0 (Option1={choice}): {subprocess.list2cmdline(builder.build("Action 0"))}')
+	assert capsys.readouterr().out.splitlines() == expected
+
+
+def test_run_all_passes_the_window_commands_to_the_jobs(project, monkeypatch, capsys):
+	# Each job prints the arguments it was started with
+	monkeypatch.setattr(project, 'command_prefix',
+						lambda target: [sys.executable, '-c', 'import sys; print(sys.argv[1:])', f'-target={target}'])
+	app = HeadlessApp(project)
+	builder = CommandBuilder(project, window_options(project))
+	assert app.run_all(['Action 0', 'Action 1'], 2, 0) == 0
+	output = capsys.readouterr().out.splitlines()
+	for target in ('Action 0', 'Action 1'):
+		assert f'[{target}] {builder.build(target)[3:]}' in output
+		assert f'{target}: succeeded (0)' in output
+
+
+def test_importing_headless_does_not_import_tkinter():
+	code = (f'import sys; sys.path.insert(0, {os.path.join(ROOT, "Launcher")!r}); import headless; '
+			'print("tkinter" in sys.modules)')
+	result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+	assert result.stdout.strip() == 'False'
+
+
+def test_matrix_jobs_are_recorded_under_their_target(project, monkeypatch, capsys):
+	monkeypatch.setattr(project, 'command_prefix', lambda target: [sys.executable, '-c', 'pass', f'-target={target}'])
+	app = HeadlessApp(project)
+	plan = {'targets': ['Action 0'], 'matrix': {'Option1': ['Choice1_1', 'Choice1_3']}}
+	assert app.run_matrix(plan, 2, 0) == 0
+	runs = app.history.recent()
+	assert [run.target for run in runs] == ['Action 0', 'Action 0']
+	# The combination is kept in the recorded command line
+	assert sorted('-set:Option1=Choice1_1' in run.command for run in runs) == [False, True]
+	assert app.history.estimate('Action 0') is not None
+	app.history.close()
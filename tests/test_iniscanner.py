@@ -0,0 +1,65 @@
+import codecs
+
+import pytest
+
+from iniscanner import IniOp, apply_ops, scan_ini
+
+INI = '''; comment
+[/Script/Game]
++Map=A
+ +Map = B
+.map=A
+-Map=Missing
+Other=ignored
+# comment
+[Skipped]
++Map=C
+'''
+
+
+def ops(*items):
+	return [IniOp('S', 'map', op, value) for op, value in items]
+
+
+def test_add_unique_and_add():
+	assert apply_ops(ops(('+', 'A'), ('+', 'A'), ('.', 'A'), ('+', 'B'))) == {'S': {'map': ['A', 'A', 'B']}}
+
+
+def test_remove_takes_out_one_occurrence():
+	values = apply_ops(ops(('.', 'A'), ('.', 'B'), ('.', 'A'), ('-', 'A'), ('-', 'C')))
+	assert values == {'S': {'map': ['B', 'A']}}
+
+
+def test_clear_and_assign():
+	assert apply_ops(ops(('+', 'A'), ('!', ''), ('+', 'B'))) == {'S': {'map': ['B']}}
+	assert apply_ops(ops(('+', 'A'), ('+', 'B'), ('', 'C'), ('+', 'C'))) == {'S': {'map': ['C']}}
+
+
+def test_later_layers_update_earlier_values():
+	values = apply_ops(ops(('+', 'A'), ('+', 'B')))
+	apply_ops(ops(('-', 'A'), ('+', 'B'), ('+', 'C')), values)
+	assert values == {'S': {'map': ['B', 'C']}}
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_scan_keeps_wanted_keys_and_sections(tmp_path, use_mmap):
+	path = tmp_path / 'Game.ini'
+	path.write_text(INI, encoding='utf-8')
+	found = scan_ini(str(path), ['Map'], ['/Script/Game'], use_mmap=use_mmap)
+	assert found == [IniOp('/Script/Game', 'map', '+', 'A'), IniOp('/Script/Game', 'map', '+', 'B'),
+					 IniOp('/Script/Game', 'map', '.', 'A'), IniOp('/Script/Game', 'map', '-', 'Missing')]
+	assert apply_ops(found) == {'/Script/Game': {'map': ['A', 'B', 'A']}}
+
+
+@pytest.mark.parametrize('bom, encoding', [(codecs.BOM_UTF8, 'utf-8'), (b'', 'utf-16')])
+def test_scan_reads_byte_order_marks(tmp_path, bom, encoding):
+	path = tmp_path / 'Game.ini'
+	path.write_bytes(bom + INI.encode(encoding))
+	found = scan_ini(str(path), ['map'])
+	assert [op.value for op in found] == ['A', 'B', 'A', 'Missing', 'C']
+
+
+def test_scan_empty_file(tmp_path):
+	path = tmp_path / 'Empty.ini'
+	path.write_bytes(b'')
+	assert scan_ini(str(path), ['map'], use_mmap=True) == []
@@ -0,0 +1,59 @@
+from logbuffer import LogBuffer
+
+
+def test_lines_split_across_writes():
+	log = LogBuffer()
+	log.write(b'first\r\nsec')
+	log.write(b'ond\nthi')
+	assert log.read(0) == (['first', 'second'], 2, 0)
+	log.flush()
+	assert log.read(2) == (['thi'], 3, 0)
+
+
+def test_multibyte_characters_split_across_writes():
+	log = LogBuffer()
+	data = 'café\n'.encode('utf-8')
+	log.write(data[:4])
+	log.write(data[4:])
+	assert log.read(0)[0] == ['café']
+
+
+def test_read_reports_lines_dropped_from_the_ring():
+	log = LogBuffer(max_lines=3)
+	log.add_lines([str(i) for i in range(5)])
+	assert log.first_seq == 2
+	assert log.read(0) == (['2', '3', '4'], 5, 2)
+	assert log.read(4) == (['4'], 5, 0)
+	assert log.read(5) == ([], 5, 0)
+
+
+def test_read_with_limit_skips_older_lines():
+	log = LogBuffer()
+	log.add_lines([str(i) for i in range(10)])
+	assert log.read(0, limit=2) == (['8', '9'], 10, 8)
+	assert log.read(9, limit=2) == (['9'], 10, 0)
+
+
+def test_long_lines_are_truncated():
+	log = LogBuffer(max_line_length=4)
+	log.write(b'abcdefgh')
+	log.write(b'\nok\n')
+	assert log.read(0)[0] == ['abcd...', '', 'ok']
+
+
+def test_listener_gets_each_batch():
+	log = LogBuffer()
+	batches = []
+	log.on_lines = batches.append
+	log.write(b'a\nb\nc')
+	log.flush()
+	assert batches == [['a', 'b'], ['c']]
+
+
+def test_clear_releases_lines_and_keeps_sequence_numbers():
+	log = LogBuffer()
+	log.add_lines(['a', 'b'])
+	log.clear()
+	assert log.read(0) == ([], 2, 2)
+	log.add_lines(['c'])
+	assert log.read(2) == (['c'], 3, 0)
@@ -0,0 +1,80 @@
+import pytest
+
+from mapconfigdata import PACKAGING_SECTION, MapIniData
+
+GAME_INI = f'''[{PACKAGING_SECTION}]
++MapsToCook=(FilePath="/Game/Maps/Town")
++MapsToCook=(FilePath="/Game/Maps/Arena")
+'''
+
+EDITOR_INI = '''[Base]
++Map=(FilePath="/Game/Maps/Town")
+
+[Combat]
++Map=(FilePath="/Game/Maps/Arena")
++Section=Base
+
+[All]
++Section=Combat
++Section=Base
+
+[Loop1]
++Map=(FilePath="/Game/Maps/One")
++Section=Loop2
+
+[Loop2]
++Map=(FilePath="/Game/Maps/Two")
++Section=Loop1
++Section=Base
+
+[Self]
++Map=(FilePath="/Game/Maps/Self")
++Section=Self
+'''
+
+
+@pytest.fixture
+def map_data(tmp_path, capsys):
+	game = tmp_path / 'DefaultGame.ini'
+	editor = tmp_path / 'DefaultEditor.ini'
+	game.write_text(GAME_INI, encoding='utf-8')
+	editor.write_text(EDITOR_INI, encoding='utf-8')
+	data = MapIniData(str(game), str(editor))
+	capsys.readouterr()
+	return data
+
+
+def test_maps_to_cook(map_data):
+	assert map_data.all_maps == ['Town', 'Arena']
+
+
+def test_linked_sections_are_merged_without_duplicates(map_data):
+	assert map_data.map_sections['Combat'] == ['Arena', 'Town']
+	assert map_data.map_sections['All'] == ['Arena', 'Town']
+
+
+def test_sections_in_a_cycle_get_the_maps_of_the_whole_cycle(map_data):
+	assert map_data.map_sections['Loop1'] == ['One', 'Two', 'Town']
+	assert map_data.map_sections['Loop2'] == ['Two', 'One', 'Town']
+	assert map_data.resolve_section('Loop2') == ['Two', 'One', 'Town']
+
+
+def test_cycles_are_reported(map_data):
+	assert map_data.map_sections['Self'] == ['Self']
+	assert sorted(map_data.cycles) == [['Loop1', 'Loop2', 'Loop1'], ['Self', 'Self']]
+
+
+def test_resolve_section_is_memoized(map_data):
+	assert map_data.resolve_section('Combat') is map_data.resolve_section('Combat')
+	assert map_data.resolve_section('Missing') == []
+
+
+def test_deep_chain_does_not_recurse(tmp_path, capsys):
+	depth = 2000
+	editor = tmp_path / 'DefaultEditor.ini'
+	editor.write_text(''.join(f'[S{i}]\n+Map=(FilePath="/Game/Maps/M{i}")\n+Section=S{i + 1}\n'
+							  for i in range(depth)), encoding='utf-8')
+	data = MapIniData(str(tmp_path / 'Missing.ini'), str(editor))
+	capsys.readouterr()
+	assert len(data.map_sections['S0']) == depth
+	assert data.cycles == []
@@ -0,0 +1,38 @@
+from mapindex import MapIndex
+
+MAPS = ['/Game/Maps/Town', 'Arena', 'arena_night', '/Game/Maps/Arena', 'Beach', 'Arena']
+
+
+def test_prefix_matches_come_first_sorted_then_substrings_in_order():
+	index = MapIndex(MAPS)
+	assert index.search('arena') == ['Arena', 'arena_night', '/Game/Maps/Arena']
+
+
+def test_search_is_case_insensitive_and_strips_the_query():
+	index = MapIndex(MAPS)
+	assert index.search('  TOWN ') == ['/Game/Maps/Town']
+
+
+def test_empty_query_returns_every_map_without_duplicates():
+	index = MapIndex(MAPS)
+	assert len(index) == 5
+	assert index.search('') == ['/Game/Maps/Town', 'Arena', 'arena_night', '/Game/Maps/Arena', 'Beach']
+	assert index.search('', limit=2) == ['/Game/Maps/Town', 'Arena']
+
+
+def test_limit_applies_across_prefix_and_substring_matches():
+	index = MapIndex(MAPS)
+	assert index.search('arena', limit=1) == ['Arena']
+	assert index.search('arena', limit=2) == ['Arena', 'arena_night']
+	assert index.search('maps', limit=1) == ['/Game/Maps/Town']
+
+
+def test_name_matching_twice_is_returned_once():
+	index = MapIndex(['aXaXa', 'Xa'])
+	assert index.search('a') == ['aXaXa', 'Xa']
+	assert index.search('xa') == ['Xa', 'aXaXa']
+
+
+def test_no_match():
+	assert MapIndex(MAPS).search('desert') == []
+	assert MapIndex([]).search('a') == []
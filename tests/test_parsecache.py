@@ -0,0 +1,68 @@
+import os
+
+from parsecache import ParseCache
+
+
+def write(path, text):
+	with open(path, 'w', encoding='utf-8') as fp:
+		fp.write(text)
+
+
+def test_hit_after_save_and_reload(tmp_path):
+	script = tmp_path / 'Script.xml'
+	write(script, '<BuildGraph/>')
+	cache_path = str(tmp_path / 'cache.json')
+	cache = ParseCache(cache_path)
+	assert cache.get(str(script)) is None
+	cache.put(str(script), {'options': ['A']})
+	cache.save()
+
+	reloaded = ParseCache(cache_path)
+	assert reloaded.get(str(script)) == {'options': ['A']}
+	assert (reloaded.hits, reloaded.misses) == (1, 0)
+
+
+def test_changed_file_misses(tmp_path):
+	script = tmp_path / 'Script.xml'
+	write(script, '<BuildGraph/>')
+	cache = ParseCache(str(tmp_path / 'cache.json'))
+	cache.put(str(script), 'old')
+	write(script, '<BuildGraph> </BuildGraph>')
+	assert cache.get(str(script)) is None
+
+
+def test_hash_mode_survives_touch(tmp_path):
+	script = tmp_path / 'Script.xml'
+	write(script, '<BuildGraph/>')
+	cache = ParseCache(str(tmp_path / 'cache.json'), use_hash=True)
+	cache.put(str(script), 'data')
+	cache.dirty = False
+	st = os.stat(script)
+	os.utime(script, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+	assert cache.get(str(script)) == 'data'
+	# The new modification time is stored so the next mtime check is current
+	assert cache.dirty
+
+
+def test_version_mismatch_and_deleted_files_are_dropped(tmp_path):
+	script = tmp_path / 'Script.xml'
+	write(script, '<BuildGraph/>')
+	cache_path = str(tmp_path / 'cache.json')
+	write(cache_path, '{"version": 0, "entries": {"x": {}}}')
+	assert ParseCache(cache_path).entries == {}
+
+	cache = ParseCache(cache_path)
+	cache.put(str(script), 'data')
+	cache.save()
+	os.remove(script)
+	cache.save()
+	assert ParseCache(cache_path).entries == {}
+
+
+def test_clear_invalidates_everything(tmp_path):
+	script = tmp_path / 'Script.xml'
+	write(script, '<BuildGraph/>')
+	cache = ParseCache(str(tmp_path / 'cache.json'))
+	cache.put(str(script), 'data')
+	cache.clear()
+	assert cache.get(str(script)) is None
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from runhistory import ETA_SAMPLES, RunHistory, format_duration, progress
+from supervisor import FAILED, SUCCEEDED
+
+COOK = ['RunUAT.bat', 'BuildGraph', '-target=Cook']
+
+
+@pytest.fixture
+def history(tmp_path):
+	history = RunHistory(str(tmp_path / 'Saved' / 'LauncherHistory.sqlite'))
+	yield history
+	history.close()
+
+
+def test_estimate_is_the_median_of_successful_runs(history):
+	assert history.estimate('Cook') is None
+	for start, duration, state in ((0, 10, SUCCEEDED), (100, 30, SUCCEEDED), (200, 500, FAILED), (300, 20, SUCCEEDED)):
+		history.record('Cook', start, start + duration, state, argv=COOK)
+	history.record('Package', 400, 1400, SUCCEEDED, argv=COOK)
+	assert history.estimate('Cook') == 20
+
+
+def test_listonly_runs_are_ignored(history):
+	history.record('Cook', 0, 600, SUCCEEDED, 0, argv=COOK)
+	history.record('Cook', 100, 101, SUCCEEDED, 0, argv=COOK + ['-listonly'])
+	history.record('Cook', 200, 202, SUCCEEDED, 0, argv=COOK + ['-listonly', '-set:Maps=Town'])
+	history.record('Cook', 300, 303, SUCCEEDED, 0)
+	assert history.estimate('Cook') == pytest.approx(301.5)
+	# Only whole arguments count
+	history.record('Cook', 400, 1000, SUCCEEDED, 0, argv=COOK + ['-set:Note=-listonly-later'])
+	history.estimates.clear()
+	assert history.estimate('Cook') == 600
+
+
+def test_only_recent_runs_count(history):
+	for index in range(ETA_SAMPLES):
+		history.record('Cook', 1000 + index, 1000 + index + 60, SUCCEEDED, argv=COOK)
+	for index in range(ETA_SAMPLES):
+		history.record('Cook', index, index + 600, SUCCEEDED, argv=COOK)
+	assert history.estimate('Cook') == 60
+
+
+def test_estimate_is_cached_until_the_target_runs_again(history):
+	history.record('Cook', 0, 10, SUCCEEDED, argv=COOK)
+	assert history.estimate('Cook') == 10
+	history.connection.execute('DELETE FROM runs')
+	assert history.estimate('Cook') == 10
+	history.record('Cook', 100, 130, SUCCEEDED, argv=COOK)
+	assert history.estimate('Cook') == 30
+
+
+def test_record_job(history):
+	job = SimpleNamespace(name='Cook (Platform=PS5)', target='Cook', started_at=None, ended_at=None,
+						  state='cancelled', returncode=None, fingerprint=None, stats=None, argv=COOK)
+	history.record_job(job)
+	assert history.recent() == []
+	job.started_at, job.ended_at, job.state, job.returncode = 50.0, 80.0, SUCCEEDED, 0
+	history.record_job(job)
+	(run,) = history.recent()
+	assert (run.target, run.duration, run.state, run.exit_code) == ('Cook', 30, SUCCEEDED, 0)
+	assert run.command == 'RunUAT.bat BuildGraph -target=Cook'
+
+
+def test_progress():
+	assert progress(30, None) == (None, None)
+	assert progress(30, 120) == (0.25, 90)
+	assert progress(150, 120) == (0.99, -30)
+	assert format_duration(725.9) == '12:05'
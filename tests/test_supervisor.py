@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+
+import pytest
+
+from supervisor import CANCELLED, FAILED, SUCCEEDED, ProcessSupervisor, QueueFull
+
+
+def python(code):
+	return [sys.executable, '-c', code]
+
+
+SLEEP = python('import time; time.sleep(30)')
+
+
+def wait_for(condition, timeout=10.0):
+	deadline = time.monotonic() + timeout
+	while not condition():
+		if time.monotonic() > deadline:
+			pytest.fail("Timed out")
+		time.sleep(0.02)
+
+
+@pytest.fixture
+def start_supervisor():
+	supervisors = []
+
+	def start(*args, **kwargs):
+		supervisor = ProcessSupervisor(*args, **kwargs)
+		supervisors.append(supervisor)
+		return supervisor
+
+	yield start
+	for supervisor in supervisors:
+		supervisor.cancel_all()
+		supervisor.wait_idle(10)
+		supervisor.shutdown()
+
+
+def test_finished_jobs_are_forgotten(start_supervisor):
+	supervisor = start_supervisor(max_jobs=1, max_queued=1)
+	jobs = []
+	for index in range(5):
+		jobs.append(supervisor.submit(f'echo {index}', python(f'print({index})')))
+		assert supervisor.wait_idle(20)
+	assert supervisor.jobs == {}
+	assert supervisor.active_jobs() == []
+	assert [job.state for job in jobs] == [SUCCEEDED] * 5
+	assert [job.log.read(0)[0] for job in jobs] == [[str(index)] for index in range(5)]
+	assert all(job.depends_on == [] for job in jobs)
+
+
+def test_queue_limit(start_supervisor):
+	supervisor = start_supervisor(max_jobs=1, max_queued=1)
+	supervisor.submit('first', SLEEP)
+	supervisor.submit('second', SLEEP)
+	with pytest.raises(QueueFull):
+		supervisor.submit('third', SLEEP)
+	supervisor.cancel_all()
+	assert supervisor.wait_idle(20)
+	with pytest.raises(QueueFull):
+		supervisor.submit_plan([('a', SLEEP, []), ('b', SLEEP, ['a']), ('c', SLEEP, ['b'])])
+	assert supervisor.active_jobs() == []
+
+
+def test_prerequisites_run_first(start_supervisor):
+	supervisor = start_supervisor(max_jobs=2)
+	first, second = supervisor.submit_plan([('first', python('import time; time.sleep(0.3)'), []),
+											('second', python('pass'), ['first'])])
+	assert supervisor.wait_idle(20)
+	assert (first.state, second.state) == (SUCCEEDED, SUCCEEDED)
+	assert second.started_at >= first.ended_at
+
+
+def test_failed_prerequisite_cancels_dependents(start_supervisor):
+	supervisor = start_supervisor()
+	first, second = supervisor.submit_plan([('first', python('raise SystemExit(3)'), []),
+											('second', python('pass'), ['first'])])
+	assert supervisor.wait_idle(20)
+	assert (first.state, first.returncode) == (FAILED, 3)
+	assert second.state == CANCELLED
+	assert second.started_at is None
+	assert second.log.read(0)[0] == [f'Not started: prerequisite #{first.id} first failed']
+
+
+def test_cancel_while_the_process_starts(start_supervisor):
+	supervisor = start_supervisor(kill_timeout=2.0)
+	loop = supervisor.loop
+	spawn = loop.subprocess_exec
+
+	async def cancel_then_spawn(*args, **kwargs):
+		# The job is running but has no process to signal yet
+		for job in supervisor.active_jobs():
+			supervisor.cancel_job(job)
+		return await spawn(*args, **kwargs)
+
+	loop.subprocess_exec = cancel_then_spawn
+	job = supervisor.submit('sleep', SLEEP)
+	assert supervisor.wait_idle(20)
+	assert job.state == CANCELLED
+	assert job.pid is not None
+	assert job.duration < 10
+
+
+def process_running(pid):
+	"""True if a process exists and is not a zombie waiting to be reaped."""
+	try:
+		with open(f'/proc/{pid}/stat') as fp:
+			return fp.read().rsplit(')', 1)[1].split()[0] != 'Z'
+	except OSError:
+		return False
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason="reads process states from /proc")
+def test_cancel_kills_the_process_tree(start_supervisor, tmp_path):
+	supervisor = start_supervisor(kill_timeout=0.5)
+	pid_file = tmp_path / 'child.pid'
+	# The job ignores SIGTERM, so only the kill that follows stops it, and it has a child of its own
+	code = ('import signal, subprocess, sys, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); '
+			'child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"]); '
+			f'open({str(pid_file)!r}, "w").write(str(child.pid)); time.sleep(30)')
+	job = supervisor.submit('tree', python(code))
+	wait_for(lambda: pid_file.exists() and pid_file.read_text())
+	child = int(pid_file.read_text())
+	supervisor.cancel(job.id)
+	assert supervisor.wait_idle(20)
+	assert job.state == CANCELLED
+	wait_for(lambda: not process_running(child))